@@ -23,19 +23,51 @@ ModularXYZ.create_custom_slider_window()
 #
 # note: PyQt and sip or pyside  libraries are necessary to run this file
 
-from PySide2.QtWidgets import QMainWindow, QSlider, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QLineEdit, QFrame, QListWidget, QAbstractItemView, QListWidgetItem
-from PySide2.QtCore import Qt, QPoint
-from PySide2.QtGui import QPainter
+from PySide2.QtWidgets import QMainWindow, QSlider, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QPushButton, QLineEdit, QFrame, QTreeView, QAbstractItemView, QCheckBox, QPlainTextEdit, QProgressBar
+from PySide2.QtCore import Qt, QPoint, QTimer, QSize
+from PySide2.QtGui import QPainter, QFontDatabase
 from shiboken2 import wrapInstance
 from maya import OpenMayaUI as omui
 import maya.cmds as cmds
-import grid_functions
-import UVboxmap
-import customboxmapuv
-import grid_slice
-import material_functions as MF
-import grid_sample 
-import math
+from material_list_model import MaterialListModel, MaterialFilterModel, decode_thumbnail
+import importlib
+import time
+import re
+import sys
+import profiling
+import thumbnail_cache
+
+# Launching the panel must not touch the scene, and Maya should not pay for the
+# toolkits (NumPy, OpenMaya) before they are used.
+# Every toolkit module is imported the first time one of its functions is called.
+STARTUP_BUDGET = 0.5  # seconds from create_custom_slider_window() until the panel is shown
+
+class LazyModule(object):
+    """Stands in for a toolkit module and imports it on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+grid_functions = LazyModule('grid_functions')
+UVboxmap = LazyModule('UVboxmap')
+customboxmapuv = LazyModule('customboxmapuv')
+grid_slice = LazyModule('grid_slice')
+uv_packer = LazyModule('uv_packer')
+texel_density = LazyModule('texel_density')
+duplicate_index = LazyModule('duplicate_index')
+grid_snap = LazyModule('grid_snap')
+spatial_index = LazyModule('spatial_index')
+task_runner = LazyModule('task_runner')
+material_dedupe = LazyModule('material_dedupe')
+material_samples = LazyModule('material_samples')
+material_report = LazyModule('material_report')
+MF = LazyModule('material_functions')
 
 def get_maya_main_window():
     main_window_ptr = omui.MQtUtil.mainWindow()
@@ -64,8 +96,8 @@ class CustomSlider(QSlider):
             painter.drawLine(startPoint, endPoint)
 
 class CustomSliderWindow(QMainWindow):
-    def __init__(self, parent=get_maya_main_window()):
-        super(CustomSliderWindow, self).__init__(parent)
+    def __init__(self, parent=None):
+        super(CustomSliderWindow, self).__init__(parent or get_maya_main_window())
         self.setWindowTitle('ModularXYZ')  # Update the window title here
         self.setGeometry(100, 100, 100, 100)
         self.gridSpacingValue = 0.125  # Default starting value
@@ -107,6 +139,8 @@ class CustomSliderWindow(QMainWindow):
         self.buttonsLayout.addWidget(self.button1)
         self.buttonsLayout.addWidget(self.button2)
         self.mainLayout.addLayout(self.buttonsLayout)
+
+        self.setupSnapRow()
         
         self.setupDivider()
         
@@ -133,19 +167,34 @@ class CustomSliderWindow(QMainWindow):
         self.row3Layout = QHBoxLayout()
         self.buttonBoxMap16X16 = QPushButton("BoxMap16X16", self)
         self.buttonOverlapClean = QPushButton("OverlapClean", self)
+        self.buttonOverlapReport = QPushButton("OverlapCheck", self)
         self.buttonBoxMap16X16.clicked.connect(self.BoxMap16X16_clicked)
         self.buttonOverlapClean.clicked.connect(self.OverlapClean_clicked)
+        self.buttonOverlapReport.clicked.connect(self.OverlapReport_clicked)
         self.row3Layout.addWidget(self.buttonBoxMap16X16)
         self.row3Layout.addWidget(self.buttonOverlapClean)
+        self.row3Layout.addWidget(self.buttonOverlapReport)
         self.mainLayout.addLayout(self.row3Layout)
         
         self.setupCustomScaleRow()
+
+        self.setupLightmapRow()
+
+        self.setupTexelDensityRow()
         
         self.setupModelingToolkitDivider()
         
         self.setupVoxelSliceRow()
+
+        self.setupDuplicatesRow()
+
+        self.setupLayoutCheckRow()
+
+        self.setupProfilingRow()
         
         self.setupSectionWithDividerAndColumns()
+
+        self.setupTaskRow()
         
     def deselectAllItems(self, event):
         self.listWindow.clearSelection()
@@ -175,6 +224,37 @@ class CustomSliderWindow(QMainWindow):
         self.update_grid_spacing_display()
         self.update_grid_size()
 
+    def setupSnapRow(self):
+        # Snaps vertices or pivots of the selection to the current grid spacing
+        snapLayout = QHBoxLayout()
+
+        snapVerticesBtn = QPushButton("Snap Verts")
+        snapVerticesBtn.clicked.connect(self.onSnapVerticesClicked)
+        snapLayout.addWidget(snapVerticesBtn)
+
+        snapPivotsBtn = QPushButton("Snap Pivots")
+        snapPivotsBtn.clicked.connect(self.onSnapPivotsClicked)
+        snapLayout.addWidget(snapPivotsBtn)
+
+        self.snapBoundaryCheck = QCheckBox('Border')
+        snapLayout.addWidget(self.snapBoundaryCheck)
+
+        self.snapToleranceInput = QLineEdit()
+        self.snapToleranceInput.setPlaceholderText("Tolerance")
+        snapLayout.addWidget(self.snapToleranceInput)
+
+        self.mainLayout.addLayout(snapLayout)
+
+    def snapTolerance(self):
+        text = self.snapToleranceInput.text()
+        return float(text) if text else None
+
+    def onSnapVerticesClicked(self):
+        grid_snap.snap_vertices_selection(self.snapBoundaryCheck.isChecked(), self.snapTolerance())
+
+    def onSnapPivotsClicked(self):
+        grid_snap.snap_pivots_selection(tolerance=self.snapTolerance())
+
     def setupDivider(self):
         # Left line
         leftLine = QFrame()
@@ -219,22 +299,25 @@ class CustomSliderWindow(QMainWindow):
         self.mainLayout.addLayout(dividerLayout)
         
     def BoxMap1X1_clicked(self):
-        UVboxmap.boxmap1X1()
+        self.runTask('BoxMap1X1', UVboxmap.boxmap_steps(1, cmds.ls(selection=True, long=True)))
 
     def BoxMap2X2_clicked(self):
-        UVboxmap.boxmap2X2()
+        self.runTask('BoxMap2X2', UVboxmap.boxmap_steps(2, cmds.ls(selection=True, long=True)))
     
     def BoxMap4X4_clicked(self):
-        UVboxmap.boxmap4X4()
+        self.runTask('BoxMap4X4', UVboxmap.boxmap_steps(4, cmds.ls(selection=True, long=True)))
     
     def BoxMap8X8_clicked(self):
-        UVboxmap.boxmap8X8()
+        self.runTask('BoxMap8X8', UVboxmap.boxmap_steps(8, cmds.ls(selection=True, long=True)))
     
     def BoxMap16X16_clicked(self):
-        UVboxmap.boxmap16X16()
+        self.runTask('BoxMap16X16', UVboxmap.boxmap_steps(16, cmds.ls(selection=True, long=True)))
 
     def OverlapClean_clicked(self):
-        UVboxmap.OverlapClean()
+        self.runTask('OverlapClean', UVboxmap.overlap_clean_steps(cmds.ls(selection=True, long=True)))
+
+    def OverlapReport_clicked(self):
+        UVboxmap.OverlapReport()
 
     def setupCustomScaleRow(self):
         # Row layout
@@ -268,33 +351,249 @@ class CustomSliderWindow(QMainWindow):
         y_val = float(self.yInput.text())
         z_val = float(self.zInput.text())
         
-        customboxmapuv.customboxmapuv(x_val, y_val, z_val)
+        self.runTask('Custom Scale', customboxmapuv.customboxmapuv_steps(x_val, y_val, z_val,
+                                                                       cmds.ls(selection=True, long=True)))
         print(f"Custom Scale button clicked with X: {x_val}, Y: {y_val}, Z: {z_val}")
 
         # Implement the desired functionality for when the button is clicked
         # This could involve reading the X, Y, Z values and applying them as needed
 
+    def setupLightmapRow(self):
+        # Packs the box mapped shells into a second, non-overlapping UV set
+        lightmapLayout = QHBoxLayout()
+
+        lightmapBtn = QPushButton("Lightmap UV")
+        lightmapBtn.clicked.connect(self.onLightmapClicked)
+        lightmapLayout.addWidget(lightmapBtn)
+
+        self.lightmapResolutionInput = QLineEdit()
+        self.lightmapResolutionInput.setPlaceholderText("Resolution 512")
+        lightmapLayout.addWidget(self.lightmapResolutionInput)
+
+        self.lightmapPaddingInput = QLineEdit()
+        self.lightmapPaddingInput.setPlaceholderText("Padding 4px")
+        lightmapLayout.addWidget(self.lightmapPaddingInput)
+
+        self.mainLayout.addLayout(lightmapLayout)
+
+    def onLightmapClicked(self):
+        resolution = int(self.lightmapResolutionInput.text() or 512)
+        padding = int(self.lightmapPaddingInput.text() or 4)
+        uv_packer.pack_lightmap_selection(resolution, padding)
+
+    def setupTexelDensityRow(self):
+        # Measures the px/m of the selection and rescales shells to a target density
+        texelDensityLayout = QHBoxLayout()
+
+        checkDensityBtn = QPushButton("Check TD")
+        checkDensityBtn.clicked.connect(self.onCheckDensityClicked)
+        texelDensityLayout.addWidget(checkDensityBtn)
+
+        setDensityBtn = QPushButton("Set TD")
+        setDensityBtn.clicked.connect(self.onSetDensityClicked)
+        texelDensityLayout.addWidget(setDensityBtn)
+
+        self.densityTargetInput = QLineEdit()
+        self.densityTargetInput.setPlaceholderText("px/m 512")
+        texelDensityLayout.addWidget(self.densityTargetInput)
+
+        self.densityResolutionInput = QLineEdit()
+        self.densityResolutionInput.setPlaceholderText("Texture 1024")
+        texelDensityLayout.addWidget(self.densityResolutionInput)
+
+        self.mainLayout.addLayout(texelDensityLayout)
+
+    def onCheckDensityClicked(self):
+        texel_density.check_selection(int(self.densityResolutionInput.text() or 1024))
+
+    def onSetDensityClicked(self):
+        target = float(self.densityTargetInput.text() or 512)
+        texel_density.normalize_selection(target, int(self.densityResolutionInput.text() or 1024))
+
     def setupVoxelSliceRow(self):
         # Row Layout for Voxel Slice
         voxelSliceLayout = QHBoxLayout()
         
         # Voxel Slice Button
         voxelSliceBtn = QPushButton('Voxel Slice')
+        voxelSliceBtn.setToolTip('Cuts the selected meshes along the grid, in the scene unit. The mesh is '
+                                 'rewritten with its UVs and materials; hard edges, colour sets and creases are lost.')
         voxelSliceBtn.clicked.connect(self.onVoxelSliceClicked)
         voxelSliceLayout.addWidget(voxelSliceBtn)
         
         # Input Slot for Voxel Slice Value
         self.voxelSliceValueInput = QLineEdit()
         voxelSliceLayout.addWidget(self.voxelSliceValueInput)
+
+        # Spread the slicing of a multi-object selection over all CPU cores
+        self.voxelSliceParallelCheck = QCheckBox('Parallel')
+        voxelSliceLayout.addWidget(self.voxelSliceParallelCheck)
+
+        # Weld near-coincident vertices and drop zero-area faces after slicing
+        self.voxelSliceWeldCheck = QCheckBox('Weld')
+        self.voxelSliceWeldCheck.setChecked(True)
+        voxelSliceLayout.addWidget(self.voxelSliceWeldCheck)
         
         # Add Row to Main Layout
         self.mainLayout.addLayout(voxelSliceLayout)
 
+    def setupDuplicatesRow(self):
+        # Copies of one kit piece are found by geometry and replaced by instances
+        duplicatesLayout = QHBoxLayout()
+
+        findDuplicatesBtn = QPushButton('Find Duplicates')
+        findDuplicatesBtn.clicked.connect(self.onFindDuplicatesClicked)
+        duplicatesLayout.addWidget(findDuplicatesBtn)
+
+        instanceDuplicatesBtn = QPushButton('Instance Duplicates')
+        instanceDuplicatesBtn.clicked.connect(self.onInstanceDuplicatesClicked)
+        duplicatesLayout.addWidget(instanceDuplicatesBtn)
+
+        self.mainLayout.addLayout(duplicatesLayout)
+
+    def onFindDuplicatesClicked(self):
+        duplicate_index.find_duplicates_selection()
+
+    def onInstanceDuplicatesClicked(self):
+        duplicate_index.instance_duplicates_selection()
+
+    def setupLayoutCheckRow(self):
+        # Overlapping pieces and free grid cells of the kit layout, from the scene spatial index
+        layoutCheckLayout = QHBoxLayout()
+
+        overlapsBtn = QPushButton('Kit Overlaps')
+        overlapsBtn.clicked.connect(self.onKitOverlapsClicked)
+        layoutCheckLayout.addWidget(overlapsBtn)
+
+        gapsBtn = QPushButton('Kit Gaps')
+        gapsBtn.clicked.connect(self.onKitGapsClicked)
+        layoutCheckLayout.addWidget(gapsBtn)
+
+        self.mainLayout.addLayout(layoutCheckLayout)
+
+    def onKitOverlapsClicked(self):
+        spatial_index.report_overlaps()
+
+    def onKitGapsClicked(self):
+        spatial_index.report_gaps()
+
+    def setupTaskRow(self):
+        # Progress of the running toolkit task, hidden while nothing runs or can be undone
+        self.taskWidget = QWidget()
+        taskLayout = QHBoxLayout(self.taskWidget)
+        taskLayout.setContentsMargins(0, 0, 0, 0)
+
+        self.taskProgress = QProgressBar()
+        self.taskProgress.setRange(0, 1000)
+        taskLayout.addWidget(self.taskProgress)
+
+        self.taskStatus = QLabel()
+        taskLayout.addWidget(self.taskStatus)
+
+        cancelBtn = QPushButton('Cancel')
+        cancelBtn.clicked.connect(self.onCancelTaskClicked)
+        taskLayout.addWidget(cancelBtn)
+
+        self.undoTaskBtn = QPushButton('Undo Task')
+        self.undoTaskBtn.clicked.connect(self.onUndoTaskClicked)
+        taskLayout.addWidget(self.undoTaskBtn)
+
+        self.taskWidget.setVisible(False)
+        self.mainLayout.addWidget(self.taskWidget)
+
+    def runTask(self, name, steps):
+        # Long operations run in steps on Maya's idle queue, a finished task is undone in one step.
+        # Handlers read the selection when clicked and hand it to the steps, a queued task
+        # may only start after the selection changed.
+        runner = task_runner.get_runner()
+        for listener in (self.onTaskProgress, profiling.get_profiler().task_changed):
+            if listener not in runner.listeners:
+                runner.listeners.append(listener)
+        return runner.submit(name, steps)
+
+    def onTaskProgress(self, task):
+        runner = task_runner.get_runner()
+        undoable = runner.last_done is not None and not runner.busy()
+        self.undoTaskBtn.setVisible(undoable)
+        self.taskWidget.setVisible(runner.busy() or undoable)
+        self.taskProgress.setValue(int(task.fraction * 1000))
+        queued = len(runner.queue)
+        self.taskStatus.setText(task.status_text() + (f" (+{queued} queued)" if queued else ''))
+
+    def onCancelTaskClicked(self):
+        task_runner.get_runner().cancel()
+
+    def onUndoTaskClicked(self):
+        runner = task_runner.get_runner()
+        task, runner.last_done = runner.last_done, None
+        if task is not None and runner.can_undo(task):
+            runner.undo(task)
+            print(f"{task.name} undone.")
+        elif task is not None:
+            cmds.warning(f"{task.name} is no longer the last edit, use Edit > Undo.")
+        self.taskWidget.setVisible(runner.busy())
+
+    def setupProfilingRow(self):
+        # Times every toolkit action while on, Stats shows the totals below the row
+        profilingLayout = QHBoxLayout()
+
+        self.profileCheck = QCheckBox('Profile')
+        self.profileCheck.toggled.connect(self.onProfileToggled)
+        profilingLayout.addWidget(self.profileCheck)
+
+        self.cProfileCheck = QCheckBox('cProfile')
+        self.cProfileCheck.toggled.connect(self.onProfileToggled)
+        profilingLayout.addWidget(self.cProfileCheck)
+
+        statsBtn = QPushButton('Stats')
+        statsBtn.clicked.connect(self.onStatsToggled)
+        profilingLayout.addWidget(statsBtn)
+
+        self.mainLayout.addLayout(profilingLayout)
+
+        self.statsView = QPlainTextEdit()
+        self.statsView.setReadOnly(True)
+        self.statsView.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.statsView.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.statsView.setVisible(False)
+        self.mainLayout.addWidget(self.statsView)
+
+    def onProfileToggled(self):
+        profiling.set_enabled(self.profileCheck.isChecked(), self.cProfileCheck.isChecked())
+
+    def onStatsToggled(self):
+        listeners = profiling.get_profiler().listeners
+        showing = not self.statsView.isVisible()
+        self.statsView.setVisible(showing)
+        if showing:
+            self.refreshStats()
+            listeners.append(self.refreshStats)
+        elif self.refreshStats in listeners:
+            listeners.remove(self.refreshStats)
+
+    def refreshStats(self, record=None):
+        self.statsView.setPlainText(profiling.get_profiler().report_text())
+
+    def closeEvent(self, event):
+        listeners = profiling.get_profiler().listeners
+        if self.refreshStats in listeners:
+            listeners.remove(self.refreshStats)
+        if 'task_runner' in sys.modules:
+            listeners = task_runner.get_runner().listeners
+            if self.onTaskProgress in listeners:
+                listeners.remove(self.onTaskProgress)
+        self.materialModel.release_thumbnails()
+        thumbnail_cache.release_cache()
+        super(CustomSliderWindow, self).closeEvent(event)
+
     def onVoxelSliceClicked(self):
         # Retrieve the grid size value from the input slot
         gridSizeValue = float(self.voxelSliceValueInput.text())
-        # Call the grid_slice function with the retrieved value
-        grid_slice.grid_slice(gridSizeValue)  # Ensure grid_slice is defined in grid_functions module
+        # Slice the selection with the retrieved value as a task
+        self.runTask('Voxel Slice', grid_slice.grid_slice_steps(gridSizeValue,
+                                                                parallel=self.voxelSliceParallelCheck.isChecked(),
+                                                                weld=self.voxelSliceWeldCheck.isChecked(),
+                                                                selection=cmds.ls(selection=True, long=True)))
 
 
     
@@ -345,131 +644,181 @@ class CustomSliderWindow(QMainWindow):
         self.assignMTLButton = QPushButton("AssignMTL")
         self.allMTLButton = QPushButton("AllMTL")
         self.onIMG2MTLButton = QPushButton("IMG2MTL")
+        # One place2dTexture drives every texture of an IMG2MTL batch
+        self.sharePlacementCheck = QCheckBox("Share placement")
         self.boxsampleButton = QPushButton("BoxSample")
         self.ballsampleButton = QPushButton("BallSample")
+        self.dupMTLButton = QPushButton("DupMTL")
+        self.mergeMTLButton = QPushButton("MergeMTL")
+        self.usageMTLButton = QPushButton("UsageMTL")
+        self.exportMTLButton = QPushButton("ExportMTL")
         self.getMTLButton.clicked.connect(self.onGetMTLClicked)
         self.assignMTLButton.clicked.connect(self.onAssignMTLClicked)
         self.allMTLButton.clicked.connect(self.onallMTLClicked)
         self.onIMG2MTLButton.clicked.connect(self.onIMG2MTLClicked)
         self.boxsampleButton.clicked.connect(self.onboxsampleClicked)
+        self.ballsampleButton.clicked.connect(self.onballsampleClicked)
+        self.dupMTLButton.clicked.connect(self.onDupMTLClicked)
+        self.mergeMTLButton.clicked.connect(self.onMergeMTLClicked)
+        self.usageMTLButton.clicked.connect(self.onUsageMTLClicked)
+        self.exportMTLButton.clicked.connect(self.onExportMTLClicked)
         # Add buttons to the column layout
         self.column1Layout.addWidget(self.getMTLButton)
         self.column1Layout.addWidget(self.assignMTLButton)
         self.column1Layout.addWidget(self.allMTLButton)
         self.column1Layout.addWidget(self.onIMG2MTLButton)
+        self.column1Layout.addWidget(self.sharePlacementCheck)
         self.column1Layout.addWidget(self.boxsampleButton)
         self.column1Layout.addWidget(self.ballsampleButton)
-
-        # Second Column with List Window
-        self.listWindow = QListWidget()
+        self.column1Layout.addWidget(self.dupMTLButton)
+        self.column1Layout.addWidget(self.mergeMTLButton)
+        self.column1Layout.addWidget(self.usageMTLButton)
+        self.column1Layout.addWidget(self.exportMTLButton)
+
+        # Second Column with filter row and List Window
+        self.column2Layout = QVBoxLayout()
+        filterLayout = QHBoxLayout()
+        self.filterInput = QLineEdit()
+        self.filterInput.setPlaceholderText("Filter")
+        self.filterRegexCheck = QCheckBox("Regex")
+        filterLayout.addWidget(self.filterInput)
+        filterLayout.addWidget(self.filterRegexCheck)
+        self.column2Layout.addLayout(filterLayout)
+
+        # Typing restarts a short timer so the filter runs once per pause, not per key
+        self.filterTimer = QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(150)
+        self.filterTimer.timeout.connect(self.applyListFilter)
+        self.filterInput.textChanged.connect(self.filterTimer.start)
+        self.filterRegexCheck.toggled.connect(self.applyListFilter)
+
+        # The list is a model/view pair: only visible rows are drawn and updates are diffs
+        self.materialModel = MaterialListModel(self)
+        self.materialModel.renameRequested.connect(self.onMaterialRenamed)
+        self.materialFilter = MaterialFilterModel(self)
+        self.materialFilter.setSourceModel(self.materialModel)
+        # A tree view without branches so the usage columns can be shown and sorted
+        self.listWindow = QTreeView()
+        self.listWindow.setModel(self.materialFilter)
+        self.listWindow.setRootIsDecorated(False)
+        self.listWindow.setUniformRowHeights(True)
+        self.listWindow.setHeaderHidden(True)
+        # No sort column until a header is clicked, the list keeps the order it was given
+        self.listWindow.header().setSortIndicator(-1, Qt.AscendingOrder)
+        self.listWindow.setSortingEnabled(True)
         self.listWindow.setSelectionMode(QAbstractItemView.MultiSelection)
+        self.listWindow.setSelectionBehavior(QAbstractItemView.SelectRows)
         # Allow editing of items
         self.listWindow.setEditTriggers(QAbstractItemView.DoubleClicked | QAbstractItemView.SelectedClicked)
-        self.listWindow.itemDoubleClicked.connect(self.onItemDoubleClicked)  # Connect to handle double click
-        self.listWindow.itemChanged.connect(self.onMaterialRenamed)  # Connect to handle item renaming(self.onItemDoubleClicked)
+        # Swatches are read for the rows on screen only, thumbnails decode on worker threads
+        self.listWindow.setIconSize(QSize(thumbnail_cache.THUMBNAIL_SIZE, thumbnail_cache.THUMBNAIL_SIZE))
+        self.materialModel.set_thumbnails(thumbnail_cache.get_cache(decode_thumbnail),
+                                          lambda names: MF.material_swatches(names))
+        self.column2Layout.addWidget(self.listWindow)
+        self.usageReport = None
 
         # Add both columns to the layout
         twoColumnsLayout.addLayout(self.column1Layout)
-        twoColumnsLayout.addWidget(self.listWindow)
+        twoColumnsLayout.addLayout(self.column2Layout)
 
         # Add the two columns layout to the main layout
         self.mainLayout.addLayout(twoColumnsLayout)
 
     # You can call this method to update the list dynamically
     def updateListWindow(self, itemsList):
-        self.listWindow.clear()  # Clear existing items
-        for itemText in itemsList:
-            self.listWindow.addItem(itemText)
-            
-    def onGetMTLClicked(self):
-        # Fetch unique materials
-        unique_materials = MF.fetch_materials_selection()
+        self.materialModel.set_materials(itemsList)
+        # Networks may have changed since the last fetch, usage columns are only shown for a report
+        self.materialModel.clear_swatches()
+        self.materialModel.clear_usage()
+        self.listWindow.setHeaderHidden(True)
+        self.listWindow.sortByColumn(-1, Qt.AscendingOrder)
 
-        # Clear the list window
-        self.listWindow.clear()
+    def applyListFilter(self):
+        valid = self.materialFilter.set_filter(self.filterInput.text(), self.filterRegexCheck.isChecked())
+        self.filterInput.setStyleSheet("" if valid else "color: red;")
 
-        # Iterate over unique materials
-        for item_text in unique_materials:
-            # Create a QListWidgetItem with the material name
-            item = QListWidgetItem(item_text)
-            print("Flags before setting:", item.flags())
+    def selectedMaterialNames(self):
+        rows = sorted(self.listWindow.selectionModel().selectedRows(), key=lambda index: index.row())
+        return [index.data(Qt.UserRole) for index in rows]
 
-            # Add the Qt.ItemIsEditable flag
-            item.setFlags(item.flags() | Qt.ItemIsEditable)
-            print("Flags after setting:", item.flags())
-            # Add the item to the list window
-            self.listWindow.addItem(item)
+    def onGetMTLClicked(self):
+        # Fetch unique materials
+        unique_materials = MF.fetch_materials_selection()
 
         # Update the list window
         self.updateListWindow(unique_materials)
 
     
     def onAssignMTLClicked(self):
-        selected_items = self.listWindow.selectedItems()
-        material_name = selected_items[0].text()
+        selected_names = self.selectedMaterialNames()
+        if not selected_names:
+            cmds.warning("No material selected in the list.")
+            return
         maya_selection = cmds.ls(selection=True)
-        shading_groups = cmds.listConnections(f"{material_name}.outColor", type='shadingEngine')
-        shading_group = shading_groups[0]
-        for obj in maya_selection:
-            cmds.sets(obj, edit=True, forceElement=shading_group)
+        MF.assign_material(selected_names[0], maya_selection)
             
             
     def onallMTLClicked(self):
         unique_materials_list = MF.list_all_materials()
-        for item in unique_materials_list:
-            self.listWindow.addItem(item)
         self.updateListWindow(unique_materials_list)
     
     def onIMG2MTLClicked(self):
-        MF.convert_images_to_shaders()
-    
-    def onMaterialRenamed(self, item):
-        new_name = item.text()
-        old_name = item.data(Qt.UserRole)  # Retrieve the original material name
-        # Perform the renaming operation using the MF module
-        MF.rename_material(old_name, new_name)
+        image_files = MF.pick_image_files()
+        if image_files:
+            self.runTask('IMG2MTL', MF.convert_images_to_shaders_steps(
+                image_files, share_placement=self.sharePlacementCheck.isChecked()))
     
-    def onItemDoubleClicked(self, item):
-        self.listWindow.editItem(item)
-        print("Item double-clicked:", item.text())  # Print the text of the double-clicked item
-        print("Item flags:", item.flags())  # Print the flags of the double-clicked item
-        print("Item is editable:", bool(item.flags() & Qt.ItemIsEditable))  # Print if the item is editable
+    def onDupMTLClicked(self):
+        # Dry run: list every material that has a copy, survivors first
+        found = material_dedupe.merge_duplicate_materials(dry_run=True)
+        names = []
+        for group in found.groups:
+            names.append(group.materials[group.survivor])
+            names.extend(group.duplicate_materials())
+        self.updateListWindow(list(dict.fromkeys(names)))
+
+    def onMergeMTLClicked(self):
+        material_dedupe.merge_duplicate_materials()
+        self.updateListWindow(MF.list_all_materials())
+
+    def onUsageMTLClicked(self):
+        # Faces, objects and area per material, of the selection or of the whole scene
+        self.usageReport = material_report.usage_report_selection()
+        self.updateListWindow([row.material for row in self.usageReport.rows])
+        self.materialModel.set_usage(self.usageReport.by_material())
+        self.listWindow.setHeaderHidden(False)
+        self.listWindow.sortByColumn(1, Qt.DescendingOrder)
+        for column in range(1, self.materialModel.columnCount()):
+            self.listWindow.resizeColumnToContents(column)
+
+    def onExportMTLClicked(self):
+        if self.usageReport is None:
+            self.onUsageMTLClicked()
+        path = cmds.fileDialog2(fileFilter='CSV (*.csv);;JSON (*.json)', dialogStyle=2, fileMode=0)
+        if path:
+            print(f"Material usage written to {self.usageReport.export(path[0])}")
+
+    def onMaterialRenamed(self, old_name, new_name):
+        # Perform the renaming operation using the MF module, Maya may adjust the name
+        actual_name = MF.rename_material(old_name, new_name)
+        self.materialModel.rename_material(old_name, actual_name)
         
     def onboxsampleClicked(self):
-        # Get selected items from the list window
-        selected_items = self.listWindow.selectedItems()
-        selected_items = list(selected_items)
-        # Count the total number of selected items
-        num_cubes = len(selected_items)
-        grid_size = math.ceil(math.sqrt(num_cubes))
-        actual_num_cubes = grid_size ** 2
-        n = 0
-        #grid_sample.create_cube_grid(total_selected)
-        for index, item in enumerate(selected_items):
-            material_name = item.text()
-            print(material_name)
-            xpos = n * 2
-            zpos = 0
-            cube = cmds.polyCube()[0]
-            cmds.move(xpos, 0, zpos, cube)
-            shading_groups = cmds.listConnections(f"{material_name}.outColor", type='shadingEngine')
-            shading_group = shading_groups[0]
-            cmds.sets(cube, edit=True, forceElement=shading_group)
-            num_cubes -= 1
-            n = n + 1
+        # One cube instanced per selected material, laid out on the grid
+        material_samples.build_sample_board(self.selectedMaterialNames(), 'cube')
+
+    def onballsampleClicked(self):
+        material_samples.build_sample_board(self.selectedMaterialNames(), 'sphere')
 
-    
-    def updateListWindow(self, itemsList):
-        self.listWindow.clear()  # Clear existing items
-        for itemText in itemsList:
-            item = QListWidgetItem(itemText)
-            item.setData(Qt.UserRole, itemText)  # Set the original material name as data
-            self.listWindow.addItem(item)
 
-               
+# Every button, slider and list handler is timed while profiling is on
+HANDLER_NAME = re.compile(r'^on\w+(Clicked|Renamed)$|_clicked$|_changed$')
+profiling.instrument_handlers(CustomSliderWindow, HANDLER_NAME.search)
 
 
 def create_custom_slider_window():
+    start = time.perf_counter()
     try:
         cmds.deleteUI('customSliderWindow', wnd=True)
     except:
@@ -478,4 +827,7 @@ def create_custom_slider_window():
     custom_slider_window.setObjectName('customSliderWindow')
     custom_slider_window.show()
 
-create_custom_slider_window()
+    startup_time = time.perf_counter() - start
+    if startup_time > STARTUP_BUDGET:
+        cmds.warning(f"ModularXYZ took {startup_time:.2f}s to start, the budget is {STARTUP_BUDGET}s.")
+    return custom_slider_window
@@ -1,81 +1,60 @@
 import maya.cmds as cmds
+import mesh_io
+import uv_overlap
+import uv_projection
+import task_runner
+from mesh_data import component_list
 
-def boxmap1X1():
-    selected_objects = cmds.ls(selection=True)
-
-    for obj in selected_objects:
-        # Apply Automatic Box Mapping with a fixed scale of 4x4 units for each projection plane
-        cmds.polyAutoProjection(obj,lm=0,cm=0,l=0,sc=1,o=1,p=6,ps=0.2,ws=1,sx=1,sy=1,sz=1,ch=False) 
-
-        print(f"4x4 box map UV applied to {obj}. UVs may extend beyond 0-1 space.")
+def boxmap(size):
+    # Apply Automatic Box Mapping with a fixed scale of size x size units for each projection plane
+    task_runner.run_blocking(boxmap_steps(size))
 
-boxmap1X1()
+def boxmap_steps(size, selection=None):
+    # Step generator of boxmap for the panel task runner, selection is read when the task starts when None
+    for shape in (yield from uv_projection.box_map_selection_steps((size, size, size), selection=selection)):
+        print(f"{size}x{size} box map UV applied to {shape}. UVs may extend beyond 0-1 space.")
 
+def boxmap1X1():
+    boxmap(1)
 
 def boxmap2X2():
-    selected_objects = cmds.ls(selection=True)
-
-    for obj in selected_objects:
-        # Apply Automatic Box Mapping with a fixed scale of 4x4 units for each projection plane
-        cmds.polyAutoProjection(obj,lm=0,cm=0,l=0,sc=1,o=1,p=6,ps=0.2,ws=1,sx=2,sy=2,sz=2,ch=False) 
-
-        print(f"4x4 box map UV applied to {obj}. UVs may extend beyond 0-1 space.")
-
-boxmap2X2()
-
+    boxmap(2)
 
 def boxmap4X4():
-    selected_objects = cmds.ls(selection=True)
-
-    for obj in selected_objects:
-        # Apply Automatic Box Mapping with a fixed scale of 4x4 units for each projection plane
-        cmds.polyAutoProjection(obj,lm=0,cm=0,l=0,sc=1,o=1,p=6,ps=0.2,ws=1,sx=4,sy=4,sz=4,ch=False) 
-
-        print(f"4x4 box map UV applied to {obj}. UVs may extend beyond 0-1 space.")
-
-boxmap4X4()
+    boxmap(4)
 
 def boxmap8X8():
-    selected_objects = cmds.ls(selection=True)
-
-    for obj in selected_objects:
-        # Apply Automatic Box Mapping with a fixed scale of 4x4 units for each projection plane
-        cmds.polyAutoProjection(obj,lm=0,cm=0,l=0,sc=1,o=1,p=6,ps=0.2,ws=1,sx=8,sy=8,sz=8,ch=False) 
-
-        print(f"4x4 box map UV applied to {obj}. UVs may extend beyond 0-1 space.")
-
-boxmap8X8()
+    boxmap(8)
 
 def boxmap16X16():
-    selected_objects = cmds.ls(selection=True)
-
-    for obj in selected_objects:
-        # Apply Automatic Box Mapping with a fixed scale of 4x4 units for each projection plane
-        cmds.polyAutoProjection(obj,lm=0,cm=0,l=0,sc=1,o=1,p=6,ps=0.2,ws=1,sx=16,sy=16,sz=16,ch=False) 
-
-        print(f"4x4 box map UV applied to {obj}. UVs may extend beyond 0-1 space.")
-
-boxmap16X16()
+    boxmap(16)
 
 def OverlapClean():
-    selected_objects = cmds.ls(selection=True, type='transform')   
-    
-    # Store the current selection to reselect after operation
-    original_selection = cmds.ls(sl=True)
-    
-    for obj in selected_objects:
-        # Get all shapes of the current object
-        shapes = cmds.listRelatives(obj, children=True, shapes=True) or []
-        
-        for shape in shapes:
-            # Check if the shape has UVs
-            if cmds.polyEvaluate(shape, uv=True) > 0:
-                # Layout UVs without scaling
-                cmds.polyLayoutUV(shape, scale=0, layout=2)  # scale 0 turns off scaling, layout 2 for no overlap
+    # Only the shells that overlap another shell are laid out, clean meshes are left untouched
+    task_runner.run_blocking(overlap_clean_steps())
+
+def overlap_clean_steps(selection=None):
+    # Step generator of OverlapClean, the overlap search of every mesh runs on a worker thread
+    original_selection = cmds.ls(sl=True, long=True) if selection is None else selection
+
+    shapes = mesh_io.selected_mesh_shapes(original_selection)
+    cleaned = 0
+    for i, shape in enumerate(shapes):
+        data = mesh_io.read_uv_set(shape)
+        if data is not None and len(data.us):
+            result = yield task_runner.Compute(uv_overlap.find_shell_overlaps, data.us, data.vs, data.uv_counts,
+                                               data.uv_ids)
+            if result.pairs:
+                # scale 0 turns off scaling, layout 2 for no overlap
+                cmds.polyLayoutUV(component_list(shape, result.offending_faces()), scale=0, layout=2)
+                cleaned += 1
+        yield i + 1, len(shapes)
 
     # Reselect originally selected objects
     cmds.select(original_selection, replace=True)
 
-    print("UV layout applied to selected objects without scaling.")
+    print(f"UV layout applied without scaling to the overlapping shells of {cleaned} objects.")
 
-OverlapClean()
+def OverlapReport():
+    # Prints and selects the faces of overlapping shells without changing any UV
+    return uv_overlap.report_overlaps(select=True)
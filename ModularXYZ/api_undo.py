@@ -0,0 +1,59 @@
+import os
+import sys
+import types
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+# Undo for edits made through the Python API. MFnMesh writes do not go through the
+# command engine, so Maya has nothing to undo. commit() hands an (undo, redo) pair to
+# a tiny plugin command which keeps it on the undo queue like any other command.
+# This file is both the module the toolkits import and the plugin Maya loads; the
+# plugin copy and the imported copy share the pending pair through one module kept
+# in sys.modules.
+
+COMMAND_NAME = 'modularXYZApiUndo'
+PLUGIN_NAME = os.path.splitext(os.path.basename(__file__))[0]
+
+_shared = sys.modules.setdefault('_modularxyz_api_undo', types.ModuleType('_modularxyz_api_undo'))
+
+def maya_useNewAPI():
+    """Tells Maya the plugin uses maya.api.OpenMaya."""
+
+class ApiUndoCommand(om2.MPxCommand):
+    """Owns one (undo, redo) pair, the edit itself is already done when the command runs."""
+
+    def doIt(self, args):
+        self.undo, self.redo = _shared.pending
+        _shared.pending = None
+
+    def undoIt(self):
+        self.undo()
+
+    def redoIt(self):
+        self.redo()
+
+    def isUndoable(self):
+        return True
+
+def initializePlugin(plugin):
+    om2.MFnPlugin(plugin, 'ModularXYZ', '1.0').registerCommand(COMMAND_NAME, ApiUndoCommand)
+
+def uninitializePlugin(plugin):
+    om2.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+def undo_enabled():
+    return bool(cmds.undoInfo(query=True, state=True))
+
+def commit(undo, redo):
+    """
+    Puts an API edit that has just been made on the undo queue as one command.
+
+    :param undo: Called without arguments to take the edit back.
+    :param redo: Called without arguments to make the edit again after an undo.
+    """
+    if not undo_enabled():
+        return
+    if not cmds.pluginInfo(PLUGIN_NAME, query=True, loaded=True):
+        cmds.loadPlugin(os.path.abspath(__file__), quiet=True)
+    _shared.pending = (undo, redo)
+    getattr(cmds, COMMAND_NAME)()
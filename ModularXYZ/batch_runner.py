@@ -0,0 +1,342 @@
+# Headless batch runner for the ModularXYZ toolkits, run with mayapy:
+#
+#     mayapy batch_runner.py --pipeline slice=0.25 boxmap=4 lightmap=512 materials \
+#         --select "name:SM_*" --exclude "name:*_LOD*" --workers 4 --log library.jsonl "assets/**/*.mb"
+#
+# Every scene is opened in a worker process (each worker starts maya.standalone once),
+# the objects picked by the selection rules are selected and the pipeline steps run in
+# order on that selection. Scenes changed by a step are saved in place or into
+# --output-dir. One JSON line per scene, with the timing and result of every step, is
+# appended to the log as soon as the scene is done. With --resume, scenes whose last
+# log line says 'ok' for the same pipeline are skipped, so a run that stopped halfway
+# picks up where it left off. A worker that crashes breaks the whole pool: every
+# worker reports the scene it starts, so only the scenes that were running are charged
+# an attempt, the ones still queued go to the new pool as they were. Charged scenes
+# are run again one at a time, so a second crash is theirs alone and they are logged
+# as crashed.
+
+import os
+import sys
+import glob
+import json
+import time
+import fnmatch
+import argparse
+import traceback
+import multiprocessing
+import contextlib
+import io
+from concurrent.futures import as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import worker_pool
+
+OUTPUT_LINES = 50  # Printed lines of a scene kept in its log record
+MAX_ATTEMPTS = 2  # Broken pools a scene may be running in before it is logged as crashed
+
+_started_scenes = None  # Queue a worker puts every scene it starts on, set by initialize_worker
+
+# --- pipeline steps ----------------------------------------------------------------
+# A step takes the selected transforms and its argument (None when not given) and
+# returns something JSON serializable.
+
+def step_slice(objects, grid_size):
+    import grid_slice
+    grid_slice.grid_slice(float(grid_size or 1.0))
+    return {'objects': len(objects)}
+
+def step_boxmap(objects, scale):
+    import uv_projection
+    scale = float(scale or 1.0)
+    return {'mapped': len(uv_projection.box_map_selection((scale, scale, scale), incremental=False))}
+
+def step_overlap_clean(objects, argument):
+    import UVboxmap
+    UVboxmap.OverlapClean()
+    return {}
+
+def step_lightmap(objects, resolution):
+    import uv_packer
+    return {'packed': len(uv_packer.pack_lightmap_selection(int(resolution or 512)))}
+
+def step_texel_density(objects, resolution):
+    import texel_density
+    report = texel_density.check_selection(int(resolution or 1024))
+    return {key: report[key] for key in ('min', 'median', 'mean', 'max')} if report else {}
+
+def step_snap(objects, spacing):
+    import grid_snap
+    import mesh_io
+    shapes = mesh_io.selected_world_shapes()
+    return {'moved': grid_snap.snap_meshes(shapes, float(spacing) if spacing else None)}
+
+def step_instance_duplicates(objects, argument):
+    import duplicate_index
+    return {'replaced': duplicate_index.instance_duplicates_selection()}
+
+def step_materials(objects, argument):
+    import material_index
+    return {'materials': material_index.materials_of_selection()}
+
+def step_usage(objects, argument):
+    import material_report
+    report = material_report.usage_report(material_report.selection_shapes() if objects else [])
+    return {'faces': report.faces, 'unassigned_faces': report.unassigned_faces,
+            'materials': [row.as_dict() for row in report.rows]}
+
+# name -> (function, changes the scene)
+STEPS = {
+    'slice': (step_slice, True),
+    'boxmap': (step_boxmap, True),
+    'overlap_clean': (step_overlap_clean, True),
+    'lightmap': (step_lightmap, True),
+    'texel_density': (step_texel_density, False),
+    'snap': (step_snap, True),
+    'instance_duplicates': (step_instance_duplicates, True),
+    'materials': (step_materials, False),
+    'usage': (step_usage, False),
+}
+
+def parse_pipeline(specs):
+    """Turns ['slice=0.25', 'materials'] into [('slice', '0.25'), ('materials', None)]."""
+    pipeline = []
+    for spec in specs:
+        name, _, argument = spec.partition('=')
+        if name not in STEPS:
+            raise ValueError(f"Unknown step '{name}', expected one of {', '.join(STEPS)}")
+        pipeline.append((name, argument or None))
+    return pipeline
+
+# --- selection rules ---------------------------------------------------------------
+
+RULE_KINDS = ('all', 'name', 'set', 'layer')
+
+def check_rules(rules):
+    for rule in rules:
+        if rule.partition(':')[0] not in RULE_KINDS:
+            raise ValueError(f"Unknown selection rule '{rule}', expected all, name:<glob>, set:<set> "
+                             f"or layer:<layer>")
+
+def select_objects(rules, excludes=()):
+    """
+    Selects the mesh transforms matching any rule and no exclude rule.
+
+    Rules are 'all', 'name:<glob>' on the short transform name, 'set:<object set>' and
+    'layer:<display layer>'.
+
+    :return: The selected transforms, long names, sorted.
+    """
+    import maya.cmds as cmds
+    shapes = cmds.ls(type='mesh', noIntermediate=True, long=True) or []
+    transforms = sorted(set(cmds.listRelatives(shapes, parent=True, fullPath=True) or []))
+    selected = set()
+    for rule in rules or ['all']:
+        selected |= _rule_matches(cmds, rule, transforms)
+    for rule in excludes:
+        selected -= _rule_matches(cmds, rule, transforms)
+    selected = sorted(selected)
+    if selected:
+        cmds.select(selected, replace=True)
+    else:
+        cmds.select(clear=True)
+    return selected
+
+def _rule_matches(cmds, rule, transforms):
+    kind, _, value = rule.partition(':')
+    if kind == 'all':
+        return set(transforms)
+    if kind == 'name':
+        return {transform for transform in transforms if fnmatch.fnmatchcase(transform.rsplit('|', 1)[-1], value)}
+    if not cmds.objExists(value):
+        return set()
+    if kind == 'set':
+        members = cmds.sets(value, query=True)
+    else:
+        members = cmds.editDisplayLayerMembers(value, query=True, fullNames=True)
+    members = set(cmds.ls(members or [], long=True) or [])
+    return {transform for transform in transforms if transform in members}
+
+# --- one scene, inside a worker ----------------------------------------------------
+
+def initialize_worker(script_dir, started_scenes=None):
+    """Pool initializer: makes the toolkit importable and starts Maya once per worker."""
+    global _started_scenes
+    _started_scenes = started_scenes
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    import atexit
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    atexit.register(maya.standalone.uninitialize)
+
+def process_scene(scene_path, pipeline, rules, excludes=(), output_dir=None, save=True):
+    """
+    Opens a scene, selects the objects and runs the pipeline steps on them.
+
+    :return: The log record of the scene, failures are recorded instead of raised.
+    """
+    if _started_scenes is not None:
+        # A simple queue writes right away, the marker survives a crash on the next line
+        _started_scenes.put(scene_path)
+    import maya.cmds as cmds
+    record = {'scene': scene_path, 'pipeline': [list(step) for step in pipeline], 'status': 'ok', 'steps': [],
+              'worker': os.getpid(), 'started': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            step_start = time.perf_counter()
+            cmds.file(scene_path, open=True, force=True)
+            record['open_seconds'] = round(time.perf_counter() - step_start, 4)
+            objects = select_objects(rules, excludes)
+            record['objects'] = len(objects)
+            changed = False
+            for name, argument in pipeline:
+                function, changes_scene = STEPS[name]
+                step_start = time.perf_counter()
+                result = function(objects, argument)
+                record['steps'].append({'step': name, 'seconds': round(time.perf_counter() - step_start, 4),
+                                        'result': result})
+                changed = changed or changes_scene
+                # Steps may change or clear the selection, the next one starts from the rules again
+                objects = select_objects(rules, excludes)
+            if changed and save:
+                step_start = time.perf_counter()
+                if output_dir:
+                    cmds.file(rename=os.path.join(output_dir, os.path.basename(scene_path)))
+                cmds.file(save=True, force=True)
+                record['save_seconds'] = round(time.perf_counter() - step_start, 4)
+    except Exception as error:
+        record['status'] = 'failed'
+        record['error'] = f"{type(error).__name__}: {error}"
+        record['traceback'] = traceback.format_exc()
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    record['output'] = output.getvalue().splitlines()[-OUTPUT_LINES:]
+    return record
+
+# --- driver --------------------------------------------------------------------------
+
+def expand_scenes(patterns):
+    """Returns the scene files matching the paths or globs ('**' recurses), in order and without repeats."""
+    scenes = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        scenes.extend(os.path.abspath(match) for match in matches if os.path.isfile(match))
+    return list(dict.fromkeys(scenes))
+
+def completed_scenes(log_path, pipeline):
+    """Returns the scenes whose last record in the log is 'ok' for this pipeline."""
+    if not log_path or not os.path.exists(log_path):
+        return set()
+    pipeline = [list(step) for step in pipeline]
+    last = {}
+    with open(log_path, encoding='utf-8') as log:
+        for line in log:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by a crash
+            last[record.get('scene')] = record
+    return {scene for scene, record in last.items() if record.get('status') == 'ok' and
+            record.get('pipeline') == pipeline}
+
+def run_batch(scenes, pipeline, rules=None, excludes=(), workers=None, log_path=None, resume=False,
+              output_dir=None, save=True):
+    """
+    Runs the pipeline over the scenes in a pool of Maya worker processes.
+
+    :return: The records of the scenes processed in this run.
+    """
+    if resume:
+        done = completed_scenes(log_path, pipeline)
+        skipped = [scene for scene in scenes if scene in done]
+        scenes = [scene for scene in scenes if scene not in done]
+        if skipped:
+            print(f"Resuming: {len(skipped)} scenes already done.")
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    records = []
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    started_scenes = multiprocessing.get_context('spawn').SimpleQueue()
+    log = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    def report(record):
+        records.append(record)
+        if log:
+            log.write(json.dumps(record, default=str) + '\n')
+            log.flush()
+        print(f"[{len(records)}/{len(scenes)}] {record['status']:7} {record.get('seconds', 0):8.2f}s  "
+              f"{record['scene']}" + (f"  {record['error']}" if 'error' in record else ''))
+
+    try:
+        pending, attempts, idle_breaks = list(scenes), {}, 0
+        while pending:
+            lost = []
+            suspects = [scene for scene in pending if attempts.get(scene)]
+            batch = suspects or pending
+            pool_size = 1 if suspects else worker_pool.worker_count(len(batch), workers)
+            with worker_pool.create_process_pool(pool_size, initialize_worker, (script_dir, started_scenes)) as pool:
+                futures = {pool.submit(process_scene, scene, pipeline, rules, excludes, output_dir, save): scene
+                           for scene in batch}
+                for future in as_completed(futures):
+                    try:
+                        report(future.result())
+                    except BrokenProcessPool:
+                        lost.append(futures[future])
+            started = set()
+            while not started_scenes.empty():
+                started.add(started_scenes.get())
+            # Only the scenes that were running when the pool broke can have crashed it
+            running = [scene for scene in lost if scene in started]
+            idle_breaks = 0 if running else idle_breaks + bool(lost)
+            submitted = set(batch)
+            pending = [scene for scene in pending if scene not in submitted]
+            for scene in lost:
+                if scene in started:
+                    attempts[scene] = attempts.get(scene, 0) + 1
+                if attempts.get(scene, 0) >= MAX_ATTEMPTS or idle_breaks >= MAX_ATTEMPTS:
+                    error = (f"The worker process died {MAX_ATTEMPTS} times on this scene."
+                             if attempts.get(scene, 0) >= MAX_ATTEMPTS else
+                             'The worker processes died before running this scene.')
+                    report({'scene': scene, 'pipeline': [list(step) for step in pipeline],
+                            'status': 'crashed', 'error': error})
+                else:
+                    pending.append(scene)
+    finally:
+        if log:
+            log.close()
+
+    failed = [record for record in records if record['status'] != 'ok']
+    print(f"{len(records) - len(failed)} scenes ok, {len(failed)} failed.")
+    return records
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Run ModularXYZ operations over many Maya scenes.')
+    parser.add_argument('scenes', nargs='+', help='Maya scene files or globs, ** recurses')
+    parser.add_argument('--pipeline', nargs='+', required=True,
+                        help=f"steps in order, step or step=argument, from: {', '.join(STEPS)}")
+    parser.add_argument('--select', nargs='*', default=['all'],
+                        help="rules picking the objects: all, name:<glob>, set:<set>, layer:<layer>")
+    parser.add_argument('--exclude', nargs='*', default=[], help='rules of objects to leave out')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--log', default='batch_log.jsonl', help='JSON Lines log, appended to')
+    parser.add_argument('--resume', action='store_true', help='skip the scenes the log has as done')
+    parser.add_argument('--output-dir', default=None, help='save changed scenes here instead of in place')
+    parser.add_argument('--no-save', action='store_true', help='never save, for reports')
+    options = parser.parse_args(args)
+
+    scenes = expand_scenes(options.scenes)
+    if not scenes:
+        parser.error('No scene file matches.')
+    try:
+        pipeline = parse_pipeline(options.pipeline)
+        check_rules(options.select + options.exclude)
+    except ValueError as error:
+        parser.error(str(error))
+    records = run_batch(scenes, pipeline, options.select, options.exclude, options.workers, options.log,
+                        options.resume, options.output_dir, not options.no_save)
+    return 0 if all(record['status'] == 'ok' for record in records) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
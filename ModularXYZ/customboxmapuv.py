@@ -1,11 +1,17 @@
 from maya import cmds
+import uv_projection
+import task_runner
 
 def customboxmapuv(x_sides, y_sides, z_sides):
-    selected_objects = cmds.ls(selection=True)
+    task_runner.run_blocking(customboxmapuv_steps(x_sides, y_sides, z_sides))
+
+def customboxmapuv_steps(x_sides, y_sides, z_sides, selection=None):
+    # Step generator of customboxmapuv for the panel task runner, selection is read when the task starts when None
+    selected_objects = cmds.ls(selection=True, long=True) if selection is None else selection
     if not selected_objects:
         cmds.error("Please select at least one object.")
         return
     
-    for obj in selected_objects:
-        cmds.polyAutoProjection(obj, lm=0, cm=0, l=0, sc=1, o=1, p=6, ps=0.2, ws=1, ch=False, sx=x_sides, sy=y_sides, sz=z_sides)
-        print(f"Auto Project UV applied to {obj} with X: {x_sides}, Y: {y_sides}, Z: {z_sides} sides.")
+    for shape in (yield from uv_projection.box_map_selection_steps((x_sides, y_sides, z_sides),
+                                                                   selection=selected_objects)):
+        print(f"Auto Project UV applied to {shape} with X: {x_sides}, Y: {y_sides}, Z: {z_sides} sides.")
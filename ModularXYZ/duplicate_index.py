@@ -0,0 +1,132 @@
+import hashlib
+import numpy as np
+import maya.cmds as cmds
+import mesh_io
+
+# Duplicate detection for modular kits. Every mesh gets a key made of its topology,
+# its object space points moved to their centroid and quantized to a tolerance, and
+# (optionally) its per-face shading groups. Meshes with the same key are copies of one
+# piece and can be replaced by instances of a single master shape, after which the
+# UV operations see one mesh per piece (see mesh_io.unique_shapes). World space edits
+# such as Voxel Slice skip instanced meshes (see mesh_io.selected_world_shapes).
+# Only translation is normalized: copies that were rotated or scaled and then had
+# their transforms frozen are not matched.
+
+DEFAULT_TOLERANCE = 1e-3  # Centimeters
+
+def geometry_key(mesh, tolerance=DEFAULT_TOLERANCE, shading=None):
+    """
+    Returns the duplicate key of a MeshData read in object space.
+
+    :param shading: Optional (shading groups, face indices) that copies must share too.
+    """
+    points = np.frombuffer(mesh.points, dtype=np.float64).reshape(-1, 3)
+    centered = points - points.mean(axis=0) if len(points) else points
+    quantized = np.round(centered / tolerance).astype(np.int64)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(mesh.counts)
+    digest.update(mesh.connects)
+    digest.update(quantized.tobytes())
+    if shading is not None:
+        shading_groups, face_indices = shading
+        digest.update('|'.join(shading_groups).encode())
+        digest.update(np.asarray(face_indices, dtype=np.int32).tobytes())
+    return mesh.num_vertices, mesh.num_faces, digest.hexdigest()
+
+class DuplicateIndex(object):
+    """
+    Groups mesh shapes by duplicate key.
+
+    :param shapes: Mesh shapes, instances of one shape are indexed once.
+    :param tolerance: Distance under which two points count as equal.
+    :param match_shading: Copies must also have the same per-face shading groups.
+    """
+
+    def __init__(self, shapes, tolerance=DEFAULT_TOLERANCE, match_shading=True):
+        self.tolerance = tolerance
+        self.groups = {}
+        self.centroids = {}
+        for shape in mesh_io.unique_shapes(shapes):
+            mesh = mesh_io.read_mesh(shape, world_space=False, with_uvs=False)
+            shading = mesh_io.read_face_shading(shape) if match_shading else None
+            self.groups.setdefault(geometry_key(mesh, tolerance, shading), []).append(shape)
+            points = np.frombuffer(mesh.points, dtype=np.float64).reshape(-1, 3)
+            self.centroids[shape] = points.mean(axis=0) if len(points) else np.zeros(3)
+
+    def duplicate_groups(self):
+        """Returns [(master, [copies])] for every piece that has copies, master is the first shape found."""
+        return [(shapes[0], shapes[1:]) for shapes in self.groups.values() if len(shapes) > 1]
+
+    def unique_count(self):
+        return len(self.groups)
+
+def instance_duplicates(index):
+    """
+    Replaces every copy by an instance of its master.
+
+    The copy keeps its transform, name and place in the hierarchy: the master shape
+    is added under it as an instance and gets the shading of the copy, see
+    instance_copy. UVs of the copies are replaced by the ones of the master. Copies
+    whose transform has other children are left alone. Everything is one undo step.
+
+    :return: Number of shapes replaced.
+    """
+    replaced = 0
+    cmds.undoInfo(openChunk=True, chunkName='instanceDuplicates')
+    try:
+        for master, copies in index.duplicate_groups():
+            for copy in copies:
+                if instance_copy(master, copy, index.centroids[master], index.centroids[copy], index.tolerance):
+                    replaced += 1
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    return replaced
+
+def instance_copy(master, copy, master_centroid, copy_centroid, tolerance=DEFAULT_TOLERANCE):
+    """
+    Replaces the shape copy by an instance of master, returns the instance path.
+
+    The transform of the copy is not touched. When the points of the copy sit away from
+    the ones of the master in object space (copies with frozen transforms), the instance
+    goes under a new child transform translated by that offset, so nothing moves in the
+    world and the copy's transform stays on the grid. Returns None, with a warning, when
+    the transform has other children than the copy.
+    """
+    transform = cmds.listRelatives(copy, parent=True, fullPath=True)[0]
+    children = cmds.listRelatives(transform, children=True, fullPath=True) or []
+    if len(children) != 1:
+        cmds.warning(f"{transform} has other children than {copy}, it is not instanced.")
+        return None
+    offset = np.asarray(copy_centroid) - np.asarray(master_centroid)
+    shading_groups, face_indices = mesh_io.read_face_shading(copy)
+
+    cmds.delete(copy)
+    parent = transform
+    if np.abs(offset).max() > tolerance:
+        parent = cmds.group(empty=True, parent=transform, name=transform.split('|')[-1] + 'Offset')
+        # Object space points are in centimeters, setAttr takes the scene unit
+        cmds.setAttr(parent + '.translate', *(mesh_io.internal_to_ui(float(value)) for value in offset))
+    instance = cmds.parent(master, parent, add=True, shape=True)[0]
+    if len(shading_groups) == 1 and min(face_indices, default=0) == 0:
+        cmds.sets(instance, edit=True, forceElement=shading_groups[0])
+    else:
+        mesh_io.write_face_shading(instance, shading_groups, face_indices)
+    return instance
+
+def find_duplicates_selection(tolerance=DEFAULT_TOLERANCE, match_shading=True):
+    """Prints the copies among the selected meshes and returns the DuplicateIndex."""
+    shapes = mesh_io.selected_mesh_shapes()
+    index = DuplicateIndex(shapes, tolerance, match_shading)
+    groups = index.duplicate_groups()
+    for master, copies in groups:
+        print(f"{master}: {len(copies)} copies")
+    copy_count = sum(len(copies) for _, copies in groups)
+    print(f"{len(shapes)} meshes, {index.unique_count()} unique pieces, {copy_count} copies can be instanced.")
+    return index
+
+def instance_duplicates_selection(tolerance=DEFAULT_TOLERANCE, match_shading=True):
+    """Replaces the copies among the selected meshes by instances of one master per piece."""
+    index = DuplicateIndex(mesh_io.selected_mesh_shapes(), tolerance, match_shading)
+    replaced = instance_duplicates(index)
+    print(f"{replaced} copies replaced by instances of {len(index.duplicate_groups())} master meshes.")
+    return replaced
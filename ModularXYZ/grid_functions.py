@@ -9,6 +9,10 @@ def grid_size_control(length, width):
     cmds.grid(size=length)
     # In Maya, the grid size command sets both the length and width to the same value.
 
+def current_spacing():
+    """Returns the 'grid lines every' value."""
+    return cmds.grid(query=True, spacing=True)
+
 def grid_down():
     """Divides the 'grid lines every' value by 2, making the grid lines closer."""
     current_spacing = cmds.grid(query=True, spacing=True)
@@ -1,44 +1,153 @@
+import time
 import maya.cmds as cmds
-import math  # Import math library for ceiling function
+from itertools import repeat
+import mesh_io
+import slice_engine
+import worker_pool
+import task_runner
 
-def grid_slice(grid_size=1.0):
-    selected_objects = cmds.ls(selection=True, long=True, type='transform')
+WELD_RATIO = 1e-4  # Default weld tolerance as a fraction of the grid size
 
+def grid_slice(grid_size=1.0, parallel=False, max_workers=None, weld=True, weld_tolerance=None):
+    """
+    Slices every selected mesh by the world grid.
+
+    :param grid_size: Distance between two cut planes, in the scene linear unit like the grid.
+    :param parallel: Run the plane math of all objects in a process pool.
+    :param max_workers: Upper bound of worker processes, defaults to all cores but one.
+    :param weld: Weld near-coincident vertices and remove zero-area faces after slicing.
+    :param weld_tolerance: Weld distance in the scene linear unit, grid_size * WELD_RATIO by default.
+    """
+    task_runner.run_blocking(grid_slice_steps(grid_size, parallel, max_workers, weld, weld_tolerance))
+
+def grid_slice_steps(grid_size=1.0, parallel=False, max_workers=None, weld=True, weld_tolerance=None,
+                     selection=None):
+    """
+    Step generator of grid_slice for task_runner, one step per mesh read and written.
+
+    The plane math runs on a worker thread, with parallel that thread hands all meshes
+    to the process pool at once. selection is read when the task starts when None.
+    """
+    object_names = selected_slice_objects(selection)
+    cut_size, weld_tolerance = internal_distances(grid_size, weld, weld_tolerance)
+
+    if parallel and len(object_names) > 1:
+        jobs = []
+        for i, object_name in enumerate(object_names):
+            jobs.append(read_slice_job(object_name))
+            yield i + 1, 2 * len(object_names)
+        results = yield task_runner.Compute(slice_in_process_pool, [job.mesh for job in jobs], cut_size,
+                                            max_workers, weld_tolerance)
+        for i, (job, result) in enumerate(zip(jobs, results)):
+            write_slice_result(job, result)
+            print_slice_report(job, result, grid_size)
+            yield len(jobs) + i + 1, 2 * len(jobs)
+    else:
+        for i, object_name in enumerate(object_names):
+            job = read_slice_job(object_name)
+            result = yield task_runner.Compute(slice_engine.slice_mesh, job.mesh, cut_size,
+                                               weld_tolerance=weld_tolerance)
+            write_slice_result(job, result)
+            print_slice_report(job, result, grid_size)
+            yield i + 1, len(object_names)
+
+def selected_slice_objects(selection=None):
+    """Returns the selected mesh transforms, instanced meshes are skipped with a warning."""
+    if selection is None:
+        selected_objects = cmds.ls(selection=True, long=True, type='transform')
+    else:
+        selected_objects = cmds.ls(selection, long=True, type='transform') if selection else []
+
+    object_names = []
     for object_name in selected_objects:
         shapes = cmds.listRelatives(object_name, shapes=True)
         if shapes and cmds.objectType(shapes[0], isType='mesh'):
-            slice_mesh_by_grid(object_name, grid_size)
-
-def slice_mesh_by_grid(object_name, grid_size=1.0):
-    bbox = cmds.exactWorldBoundingBox(object_name)
-    min_x, min_y, min_z, max_x, max_y, max_z = bbox
-
-    # Function to align min values with the grid
-    align_with_grid = lambda min_val: math.ceil(min_val / grid_size) * grid_size
-
-    # Adjusted min values to be grid-aligned
-    min_x_aligned, min_y_aligned, min_z_aligned = map(align_with_grid, (min_x, min_y, min_z))
-    max_x_aligned, max_y_aligned, max_z_aligned = map(align_with_grid, (max_x, max_y, max_z))
-    # Iterate over each axis and perform slicing
-    for axis, (min_val, max_val) in enumerate([(min_x_aligned, max_x_aligned), (min_y_aligned, max_y_aligned), (min_z_aligned, max_z_aligned)]):
-        num_cuts = int((max_val - min_val) / grid_size)
-        for i in range(num_cuts):
-            cut_position = min_val + i * grid_size
-            # Define cut plane rotation for each axis
-            if axis == 0:  # X-axis
-                cut_plane_rotate = [0, 90, 0]
-                cut_plane_center = [cut_position, 0, 0]
-            elif axis == 1:  # Y-axis
-                cut_plane_rotate = [90, 0, 0]
-                cut_plane_center = [0, cut_position, 0]
-            else:  # Z-axis
-                cut_plane_rotate = [0, 0, 0]  # No rotation needed for Z-axis cuts
-                cut_plane_center = [0, 0, cut_position]
-            
-            # Perform the cut with updated rotation and center
-            cmds.polyCut(object_name, cutPlaneCenter=cut_plane_center, cutPlaneRotate=cut_plane_rotate)
-
-    print(f"Mesh '{object_name}' sliced by grid of size {grid_size}.")
-
-# Example usage
-grid_slice(1)
+            object_names.append(object_name)
+
+    # The cuts follow the world grid, they would be wrong for the other instances of a shape
+    shape_objects = {mesh_io.get_mesh_shape(object_name): object_name for object_name in object_names}
+    single, instanced = mesh_io.split_instanced(list(shape_objects))
+    mesh_io.warn_instanced(instanced)
+    single = set(single)
+    return [object_name for shape, object_name in shape_objects.items() if shape in single]
+
+def internal_distances(grid_size, weld=True, weld_tolerance=None):
+    """
+    Returns the cut size and weld tolerance (None without weld) in centimeters.
+
+    The grid and the UI use the scene linear unit, mesh points are read in centimeters.
+    """
+    if not weld:
+        return mesh_io.ui_to_internal(grid_size), None
+    if weld_tolerance is None:
+        weld_tolerance = grid_size * WELD_RATIO
+    return mesh_io.ui_to_internal(grid_size), mesh_io.ui_to_internal(weld_tolerance)
+
+def slice_mesh_by_grid(object_name, grid_size=1.0, weld_tolerance=None):
+    """
+    Slices a mesh by the world grid on all three axes.
+
+    The mesh is read once, cut by every lattice plane in a single pass, optionally
+    welded, and written back as one mesh edit. UV sets and per-face shading groups
+    are carried over.
+    """
+    job = read_slice_job(object_name)
+    cut_size, weld_tolerance = internal_distances(grid_size, weld_tolerance is not None, weld_tolerance)
+    result = slice_engine.slice_mesh(job.mesh, cut_size, weld_tolerance=weld_tolerance)
+    write_slice_result(job, result)
+    print_slice_report(job, result, grid_size)
+
+def slice_meshes_parallel(object_names, grid_size=1.0, max_workers=None, weld_tolerance=None):
+    """
+    Slices several meshes with the plane math spread over a process pool.
+
+    Meshes are exported and written back on the calling (main) thread, only the
+    slice_engine call runs in the workers, so the result matches slice_mesh_by_grid.
+    """
+    jobs = [read_slice_job(object_name) for object_name in object_names]
+    cut_size, weld_tolerance = internal_distances(grid_size, weld_tolerance is not None, weld_tolerance)
+    results = slice_in_process_pool([job.mesh for job in jobs], cut_size, max_workers, weld_tolerance)
+    for job, result in zip(jobs, results):
+        write_slice_result(job, result)
+        print_slice_report(job, result, grid_size)
+
+def slice_in_process_pool(meshes, grid_size=1.0, max_workers=None, weld_tolerance=None):
+    """Runs slice_engine.slice_mesh over the meshes in a process pool, returns the results in order. Sizes in centimeters."""
+    workers = worker_pool.worker_count(len(meshes), max_workers)
+    with worker_pool.create_process_pool(workers) as pool:
+        return list(pool.map(slice_engine.slice_mesh, meshes, repeat(grid_size), repeat(None), repeat(weld_tolerance)))
+
+class SliceJob(object):
+    """Everything read from the scene before a mesh is sliced, and how long reading took."""
+
+    def __init__(self, object_name, shape, mesh, shading_groups, face_shading, read_time=0.0):
+        self.object_name = object_name
+        self.shape = shape
+        self.mesh = mesh
+        self.shading_groups = shading_groups
+        self.face_shading = face_shading
+        self.read_time = read_time
+
+def read_slice_job(object_name):
+    start = time.perf_counter()
+    shape = mesh_io.get_mesh_shape(object_name)
+    mesh_io.bake_history(shape)
+    shading_groups, face_shading = mesh_io.read_face_shading(shape)
+    mesh = mesh_io.read_mesh(shape)
+    return SliceJob(object_name, shape, mesh, shading_groups, face_shading, time.perf_counter() - start)
+
+def write_slice_result(job, result):
+    start = time.perf_counter()
+    if result.mesh.num_faces == job.mesh.num_faces and not result.welded_vertices:
+        return
+    mesh_io.write_mesh(job.shape, result.mesh)
+    face_shading = [job.face_shading[face] for face in result.face_sources]
+    mesh_io.write_face_shading(job.shape, job.shading_groups, face_shading)
+    result.timings['write'] = time.perf_counter() - start
+
+def print_slice_report(job, result, grid_size):
+    stages = [('read', job.read_time)] + list(result.timings.items())
+    print(f"Mesh '{job.object_name}' sliced by grid of size {grid_size}: " +
+          ', '.join(f"{stage} {seconds:.3f}s" for stage, seconds in stages))
+    if 'weld' in result.timings:
+        print(f"  {result.welded_vertices} vertices welded, {result.removed_faces} degenerate faces removed.")
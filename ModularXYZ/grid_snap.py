@@ -0,0 +1,137 @@
+import time
+import numpy as np
+import maya.cmds as cmds
+import mesh_io
+import grid_functions
+
+# Snapping to the viewport grid set by the Grid sliders. The spacing is read with
+# grid_functions.current_spacing, the points of every mesh are read in one query,
+# rounded to the grid in NumPy and written back in one edit per mesh. Snapping happens in world space, the
+# grid origin is the world origin. The grid spacing is in the scene linear unit, the
+# points are read in centimeters; snap_meshes converts the spacing first.
+
+def snap_values(values, spacing, tolerance=None):
+    """
+    Rounds values to the nearest multiple of spacing.
+
+    :param tolerance: Only values closer than this to a grid line are moved, None moves all.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    snapped = np.round(values / spacing) * spacing
+    if tolerance is not None:
+        snapped = np.where(np.abs(snapped - values) <= tolerance, snapped, values)
+    return snapped
+
+def boundary_vertices(counts, connects, num_vertices):
+    """Returns a boolean mask of the vertices on an edge used by a single face."""
+    counts = np.asarray(counts, dtype=np.int64)
+    connects = np.asarray(connects, dtype=np.int64)
+    mask = np.zeros(num_vertices, dtype=bool)
+    if not len(connects):
+        return mask
+    starts = np.cumsum(counts) - counts
+    following = np.arange(len(connects)) + 1
+    used = counts > 0
+    following[(starts + counts - 1)[used]] = starts[used]
+    # Every edge as one sorted int key, an edge seen once is on the boundary
+    low = np.minimum(connects, connects[following])
+    high = np.maximum(connects, connects[following])
+    keys = np.sort(low * num_vertices + high)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    starts = np.flatnonzero(first)
+    single = keys[starts[np.diff(np.append(starts, len(keys))) == 1]]
+    mask[single // num_vertices] = True
+    mask[single % num_vertices] = True
+    return mask
+
+def snap_mesh(shape, spacing, boundary_only=False, tolerance=None):
+    """
+    Snaps the vertices of a mesh shape to the grid, the mesh is only written when a point moved.
+
+    :param spacing: Grid spacing in centimeters, like the points.
+    :param tolerance: Largest move in centimeters, None moves every vertex.
+    :return: Number of vertices moved.
+    """
+    points = mesh_io.read_point_array(shape)
+    if boundary_only:
+        counts, connects = mesh_io.read_topology(shape)
+        mask = boundary_vertices(counts, connects, len(points))
+        snapped = points.copy()
+        snapped[mask] = snap_values(points[mask], spacing, tolerance)
+    else:
+        snapped = snap_values(points, spacing, tolerance)
+    moved = int(np.count_nonzero(np.any(snapped != points, axis=1)))
+    if moved:
+        mesh_io.write_point_array(shape, snapped)
+    return moved
+
+def snap_meshes(shapes, spacing=None, boundary_only=False, tolerance=None):
+    """
+    Snaps the vertices of every shape, returns the total number of vertices moved.
+
+    :param spacing: Grid spacing in the scene linear unit, the current grid when None.
+    :param tolerance: Largest move in the scene linear unit, None moves every vertex.
+    """
+    spacing = mesh_io.ui_to_internal(spacing or grid_functions.current_spacing())
+    if tolerance is not None:
+        tolerance = mesh_io.ui_to_internal(tolerance)
+    return sum(snap_mesh(shape, spacing, boundary_only, tolerance) for shape in shapes)
+
+def snap_pivots(transforms, spacing=None, move_objects=True, tolerance=None):
+    """
+    Snaps the world rotate pivot of every transform to the grid.
+
+    :param move_objects: Move the objects so their pivot lands on the grid, otherwise
+        only the pivot is moved and the geometry stays in place.
+    :return: The transforms that changed.
+    """
+    spacing = spacing or grid_functions.current_spacing()
+    if not transforms:
+        return []
+    pivots = np.array([cmds.xform(transform, query=True, worldSpace=True, rotatePivot=True)
+                       for transform in transforms], dtype=np.float64)
+    snapped = snap_values(pivots, spacing, tolerance)
+    changed = []
+    for transform, pivot, target in zip(transforms, pivots, snapped):
+        if np.array_equal(pivot, target):
+            continue
+        if move_objects:
+            offset = target - pivot
+            cmds.move(offset[0], offset[1], offset[2], transform, relative=True, worldSpace=True)
+        else:
+            cmds.xform(transform, worldSpace=True, pivots=target.tolist())
+        changed.append(transform)
+    return changed
+
+def snap_vertices_selection(boundary_only=False, tolerance=None):
+    """Snaps the vertices of the selected meshes to the current grid, as one undo step."""
+    start = time.perf_counter()
+    spacing = grid_functions.current_spacing()
+    shapes = mesh_io.selected_world_shapes()
+    if not shapes:
+        cmds.warning("Select the meshes to snap.")
+        return 0
+    cmds.undoInfo(openChunk=True, chunkName='snapVertices')
+    try:
+        moved = snap_meshes(shapes, spacing, boundary_only, tolerance)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    print(f"{moved} vertices of {len(shapes)} meshes snapped to the {spacing} grid "
+          f"in {time.perf_counter() - start:.3f}s.")
+    return moved
+
+def snap_pivots_selection(move_objects=True, tolerance=None):
+    """Snaps the pivots of the selected objects to the current grid."""
+    spacing = grid_functions.current_spacing()
+    transforms = cmds.ls(selection=True, type='transform', long=True) or []
+    if not transforms:
+        cmds.warning("Select the objects to snap.")
+        return []
+    cmds.undoInfo(openChunk=True, chunkName='snapPivots')
+    try:
+        changed = snap_pivots(transforms, spacing, move_objects, tolerance)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    print(f"{len(changed)} of {len(transforms)} pivots snapped to the {spacing} grid.")
+    return changed
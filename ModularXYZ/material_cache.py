@@ -0,0 +1,202 @@
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+
+# In-memory index of material <-> shadingEngine <-> shape assignments for the
+# Shader Toolkit. It is built once per scene and kept current by Maya callbacks:
+#   - material <-> shading group links are updated from the surfaceShader connection,
+#   - the shading groups of a shape are read lazily and dropped when one of its
+#     instObjGroups connections to a shading group changes,
+#   - node add/remove/rename patch the index in place,
+#   - scene open, new, import and reference loads mark it for a full rebuild.
+
+class MaterialCache(object):
+
+    def __init__(self):
+        self.valid = False
+        self.materials = {}            # material -> list of shading groups, insertion ordered
+        self.group_material = {}       # shading group -> material on its surfaceShader
+        self.shape_groups = {}         # long shape name -> shading groups, filled lazily
+        self.counters = {'hits': 0, 'misses': 0, 'rebuilds': 0, 'invalidations': 0}
+        self._material_types = {}
+        self._callback_ids = []
+
+    # --- queries -------------------------------------------------------------
+
+    def all_materials(self):
+        self._ensure_valid()
+        return list(self.materials)
+
+    def shading_groups(self, material):
+        """Returns the shading groups using the material as surface shader."""
+        self._ensure_valid()
+        return list(self.materials.get(material, []))
+
+    def material_of_shading_group(self, shading_group):
+        self._ensure_valid()
+        return self.group_material.get(shading_group)
+
+    def shading_groups_of_shape(self, shape):
+        """Returns the shading groups a shape is assigned to, the shape is given by its long name."""
+        self._ensure_valid()
+        if shape not in self.shape_groups:
+            self.counters['misses'] += 1
+            groups = cmds.listConnections(shape, type='shadingEngine') or []
+            self.shape_groups[shape] = list(dict.fromkeys(groups))
+        return self.shape_groups[shape]
+
+    def stats(self):
+        """Returns the hit, miss, rebuild and invalidation counters and the index size."""
+        stats = dict(self.counters)
+        stats['materials'] = len(self.materials)
+        stats['shading_groups'] = len(self.group_material)
+        return stats
+
+    # --- building ------------------------------------------------------------
+
+    def _ensure_valid(self):
+        if self.valid:
+            self.counters['hits'] += 1
+        else:
+            self.rebuild()
+
+    def rebuild(self):
+        self.counters['rebuilds'] += 1
+        self.materials = dict.fromkeys(cmds.ls(materials=True) or [])
+        for material in self.materials:
+            self.materials[material] = []
+        self.group_material = dict.fromkeys(cmds.ls(type='shadingEngine') or [])
+        self.shape_groups = {}
+
+        plugs = [f"{shading_group}.surfaceShader" for shading_group in self.group_material]
+        pairs = (cmds.listConnections(plugs, source=True, destination=False, connections=True) or []) if plugs else []
+        for plug, material in zip(pairs[0::2], pairs[1::2]):
+            self._link(plug.split('.', 1)[0], material)
+        self.valid = True
+
+    def invalidate(self, *args):
+        if self.valid:
+            self.counters['invalidations'] += 1
+        self.valid = False
+
+    def _link(self, shading_group, material):
+        self.group_material[shading_group] = material
+        groups = self.materials.setdefault(material, [])
+        if shading_group not in groups:
+            groups.append(shading_group)
+
+    def _unlink(self, shading_group, material):
+        if self.group_material.get(shading_group) == material:
+            self.group_material[shading_group] = None
+        if shading_group in self.materials.get(material, []):
+            self.materials[material].remove(shading_group)
+
+    def _is_material_type(self, type_name):
+        if type_name not in self._material_types:
+            classification = om2.MFnDependencyNode.classification(type_name) or ''
+            self._material_types[type_name] = 'shader/surface' in classification
+        return self._material_types[type_name]
+
+    # --- callbacks -----------------------------------------------------------
+
+    def install_callbacks(self):
+        if self._callback_ids:
+            return
+        null_object = om2.MObject.kNullObj
+        self._callback_ids = [
+            om2.MDGMessage.addNodeAddedCallback(self._on_node_added, 'dependNode'),
+            om2.MDGMessage.addNodeRemovedCallback(self._on_node_removed, 'dependNode'),
+            om2.MDGMessage.addConnectionCallback(self._on_connection),
+            om2.MNodeMessage.addNameChangedCallback(null_object, self._on_renamed),
+        ]
+        for message in (om2.MSceneMessage.kAfterOpen, om2.MSceneMessage.kAfterNew,
+                        om2.MSceneMessage.kAfterImport, om2.MSceneMessage.kAfterCreateReference,
+                        om2.MSceneMessage.kAfterLoadReference, om2.MSceneMessage.kAfterUnloadReference):
+            self._callback_ids.append(om2.MSceneMessage.addCallback(message, self.invalidate))
+
+    def remove_callbacks(self):
+        if self._callback_ids:
+            om2.MMessage.removeCallbacks(self._callback_ids)
+        self._callback_ids = []
+
+    def _on_node_added(self, node, client_data):
+        if not self.valid:
+            return
+        node_fn = om2.MFnDependencyNode(node)
+        if node.hasFn(om2.MFn.kShadingEngine):
+            self.group_material.setdefault(node_fn.name(), None)
+        elif self._is_material_type(node_fn.typeName):
+            self.materials.setdefault(node_fn.name(), [])
+
+    def _on_node_removed(self, node, client_data):
+        if not self.valid:
+            return
+        name = om2.MFnDependencyNode(node).name()
+        if node.hasFn(om2.MFn.kShadingEngine):
+            self._unlink(name, self.group_material.pop(name, None))
+            self.shape_groups.clear()
+        elif name in self.materials:
+            for shading_group in self.materials.pop(name):
+                self.group_material[shading_group] = None
+        elif node.hasFn(om2.MFn.kMesh):
+            self.shape_groups.clear()
+
+    def _on_renamed(self, node, previous_name, client_data):
+        if not self.valid or not previous_name:
+            return
+        name = om2.MFnDependencyNode(node).name()
+        if previous_name in self.group_material:
+            material = self.group_material.pop(previous_name)
+            self.group_material[name] = material
+            if material is not None:
+                groups = self.materials[material]
+                groups[groups.index(previous_name)] = name
+            self.shape_groups.clear()
+        elif previous_name in self.materials:
+            # Rebuild the dict so the renamed material keeps its position in the list
+            self.materials = {name if material == previous_name else material: groups
+                              for material, groups in self.materials.items()}
+            for shading_group in self.materials[name]:
+                self.group_material[shading_group] = name
+        elif node.hasFn(om2.MFn.kDagNode):
+            # Shape keys are long DAG names, renaming a parent changes them too
+            self.shape_groups.clear()
+
+    def _on_connection(self, source_plug, destination_plug, made, client_data):
+        if not self.valid or not destination_plug.node().hasFn(om2.MFn.kShadingEngine):
+            return
+        shading_group = om2.MFnDependencyNode(destination_plug.node()).name()
+        attribute = destination_plug.partialName(useLongNames=True)
+        if attribute == 'surfaceShader':
+            material = om2.MFnDependencyNode(source_plug.node()).name()
+            if made:
+                self._link(shading_group, material)
+            else:
+                self._unlink(shading_group, material)
+        elif attribute.startswith('dagSetMembers') and source_plug.node().hasFn(om2.MFn.kDagNode):
+            dag_fn = om2.MFnDagNode(source_plug.node())
+            for dag_path in dag_fn.getAllPaths():
+                if self.shape_groups.pop(dag_path.fullPathName(), None) is not None:
+                    self.counters['invalidations'] += 1
+
+
+_cache = None
+
+def get_cache():
+    """Returns the scene material cache, creating it and its callbacks on first use."""
+    global _cache
+    if _cache is None:
+        _cache = MaterialCache()
+        _cache.install_callbacks()
+    return _cache
+
+def release_cache():
+    """Removes the callbacks and drops the cache."""
+    global _cache
+    if _cache is not None:
+        _cache.remove_callbacks()
+        _cache = None
+
+def print_stats():
+    stats = get_cache().stats()
+    print(', '.join(f"{key}: {value}" for key, value in stats.items()))
+    return stats
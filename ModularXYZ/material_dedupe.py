@@ -0,0 +1,348 @@
+import os
+import time
+import hashlib
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+import material_cache
+import texture_import
+
+# Finds shader networks that are copies of each other (IMG2MTL runs, imported kits)
+# and merges them. The upstream network of every shading group is walked once, one
+# listConnections call per depth level for the whole scene. Every node then gets a
+# canonical hash of its type, its unconnected attribute values (read through the
+# API, texture paths normalized) and the hashes of its inputs. Node names never enter the hash, so
+# identical networks get identical hashes whatever they are called. Merging moves the
+# members of every copy to one survivor with a single sets edit per group and deletes
+# the copies' nodes no remaining network uses.
+
+SHADING_GROUP_INPUTS = ('surfaceShader', 'volumeShader', 'displacementShader')
+
+_SURFACE = ['color', 'transparency', 'ambientColor', 'incandescence', 'diffuse', 'translucence', 'translucenceDepth',
+            'translucenceFocus', 'glowIntensity', 'matteOpacityMode', 'matteOpacity', 'refractions',
+            'refractiveIndex']
+_SPECULAR = ['specularColor', 'reflectivity', 'reflectedColor']
+_STANDARD = ['base', 'baseColor', 'diffuseRoughness', 'metalness', 'specular', 'specularColor', 'specularRoughness',
+             'specularIOR', 'specularAnisotropy', 'transmission', 'transmissionColor', 'subsurface',
+             'subsurfaceColor', 'coat', 'coatColor', 'coatRoughness', 'sheen', 'sheenColor', 'emission',
+             'emissionColor', 'opacity', 'thinWalled']
+# Attributes that make up the look of the common shading node types. Other types
+# fall back to all of their settable scalar attributes.
+NETWORK_ATTRIBUTES = {
+    'lambert': _SURFACE,
+    'blinn': _SURFACE + _SPECULAR + ['eccentricity', 'specularRollOff'],
+    'phong': _SURFACE + _SPECULAR + ['cosinePower'],
+    'phongE': _SURFACE + _SPECULAR + ['roughness', 'highlightSize', 'whiteness'],
+    'surfaceShader': ['outColor', 'outTransparency', 'outGlowColor', 'outMatteOpacity'],
+    'standardSurface': _STANDARD,
+    'aiStandardSurface': _STANDARD,
+    'file': ['fileTextureName', 'colorSpace', 'ignoreColorSpaceFileRules', 'uvTilingMode', 'useFrameExtension',
+             'alphaIsLuminance', 'alphaGain', 'alphaOffset', 'colorGain', 'colorOffset', 'defaultColor', 'invert',
+             'filterType', 'filter', 'filterOffset'],
+    'place2dTexture': ['coverage', 'translateFrame', 'rotateFrame', 'mirrorU', 'mirrorV', 'stagger', 'wrapU',
+                       'wrapV', 'repeatUV', 'offset', 'rotateUV', 'noiseUV'],
+    'bump2d': ['bumpDepth', 'bumpInterp', 'bumpFilter', 'bumpFilterOffset'],
+    'shadingEngine': [],
+}
+PATH_ATTRIBUTES = {'fileTextureName'}
+_CHILD_SUFFIXES = ('R', 'G', 'B', 'X', 'Y', 'Z', 'U', 'V')
+
+# Downstream nodes that do not keep an otherwise unused network node alive
+BOOKKEEPING_TYPES = {'materialInfo', 'partition', 'lightLinker', 'defaultShaderList', 'defaultTextureList',
+                     'defaultRenderUtilityList', 'nodeGraphEditorInfo', 'hyperLayout', 'hyperView',
+                     'colorManagementGlobals'}
+
+class ShaderNetworks(object):
+    """The upstream networks of a set of shading groups and materials, read from the scene once."""
+
+    def __init__(self, shading_groups, materials=()):
+        self.inputs = {}      # node -> [(attribute, source node, source attribute)]
+        self.types = {}
+        self.dag_nodes = set()
+        self._hashes = {True: {}, False: {}}
+        self._type_attributes = {}
+        self._walk(shading_groups, materials)
+
+    def _walk(self, shading_groups, materials):
+        # Shading groups are only followed through their shader inputs, not their set members
+        frontier = [f"{shading_group}.{attribute}" for shading_group in shading_groups
+                    for attribute in SHADING_GROUP_INPUTS] + list(materials)
+        seen = set(shading_groups) | set(materials)
+        self._read_types(list(seen))
+        while frontier:
+            pairs = cmds.listConnections(frontier, source=True, destination=False, connections=True, plugs=True,
+                                         skipConversionNodes=False) or []
+            new_nodes = []
+            for plug, source in zip(pairs[0::2], pairs[1::2]):
+                node, attribute = plug.split('.', 1)
+                source_node, source_attribute = source.split('.', 1)
+                self.inputs.setdefault(node, []).append((attribute, source_node, source_attribute))
+                if source_node not in seen:
+                    seen.add(source_node)
+                    new_nodes.append(source_node)
+            self._read_types(new_nodes)
+            # DAG nodes (placement locators, cameras) end the walk, they are scene objects, not shading
+            frontier = [node for node in new_nodes if node not in self.dag_nodes]
+
+    def _read_types(self, nodes):
+        if not nodes:
+            return
+        listing = cmds.ls(nodes, showType=True) or []
+        self.types.update(zip(listing[0::2], listing[1::2]))
+        self.dag_nodes.update(cmds.ls(nodes, type='dagNode') or [])
+
+    def upstream(self, roots):
+        """Returns the roots and every node upstream of them."""
+        nodes, stack = set(), list(roots)
+        while stack:
+            node = stack.pop()
+            if node not in nodes:
+                nodes.add(node)
+                stack.extend(source for _, source, _ in self.inputs.get(node, []))
+        return nodes
+
+    # --- hashing -----------------------------------------------------------------
+
+    def node_hash(self, node, with_values=True):
+        """
+        Canonical hash of a node and everything upstream of it.
+
+        Without values only the node types, connections and texture paths are hashed,
+        which needs a fraction of the attribute reads.
+        """
+        hashes = self._hashes[with_values]
+        if node in hashes:
+            return hashes[node] or 'cycle'
+        hashes[node] = None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.types.get(node, '').encode())
+        inputs = sorted(self.inputs.get(node, []))
+        if node in self.dag_nodes:
+            # Networks only match when they use the same scene object
+            digest.update((cmds.ls(node, long=True) or [node])[0].encode())
+        else:
+            driven = _driven_attributes(attribute for attribute, _, _ in inputs)
+            attributes = self.attributes(node)
+            if not with_values:
+                attributes = [attribute for attribute in attributes if attribute in PATH_ATTRIBUTES]
+            attributes = [attribute for attribute in attributes if attribute not in driven]
+            for attribute, value in zip(attributes, self.attribute_values(node, attributes)):
+                digest.update(f"{attribute}={value!r};".encode())
+        for attribute, source, source_attribute in inputs:
+            digest.update(f"{attribute}<{source_attribute}:{self.node_hash(source, with_values)};".encode())
+        hashes[node] = digest.hexdigest()
+        return hashes[node]
+
+    def attributes(self, node):
+        node_type = self.types.get(node)
+        if node_type in NETWORK_ATTRIBUTES:
+            return NETWORK_ATTRIBUTES[node_type]
+        if node_type not in self._type_attributes:
+            self._type_attributes[node_type] = sorted(cmds.listAttr(node, settable=True, scalar=True) or [])
+        return self._type_attributes[node_type]
+
+    def attribute_values(self, node, attributes):
+        """Reads the attributes of a node through one function set, None for the ones it does not have."""
+        if not attributes:
+            return []
+        selection = om2.MSelectionList()
+        try:
+            selection.add(node)
+            depend_node = om2.MFnDependencyNode(selection.getDependNode(0))
+        except RuntimeError:
+            return [None] * len(attributes)
+        values = []
+        for attribute in attributes:
+            try:
+                value = _plug_value(depend_node.findPlug(attribute, False))
+            except RuntimeError:
+                value = None
+            if attribute in PATH_ATTRIBUTES and value:
+                if not os.path.isabs(value):
+                    value = cmds.workspace(expandName=value)
+                value = texture_import.normalize_path(value)
+            values.append(value)
+        return values
+
+def _plug_value(plug):
+    """The value of a plug, a tuple for compounds, None for attribute types that are not read."""
+    if plug.isCompound:
+        return tuple(_plug_value(plug.child(index)) for index in range(plug.numChildren()))
+    attribute = plug.attribute()
+    if attribute.hasFn(om2.MFn.kNumericAttribute):
+        numeric_type = om2.MFnNumericAttribute(attribute).numericType()
+        if numeric_type == om2.MFnNumericData.kBoolean:
+            return plug.asBool()
+        if numeric_type in (om2.MFnNumericData.kFloat, om2.MFnNumericData.kDouble):
+            return plug.asDouble()
+        return plug.asInt()
+    if attribute.hasFn(om2.MFn.kTypedAttribute):
+        if om2.MFnTypedAttribute(attribute).attrType() == om2.MFnData.kString:
+            return plug.asString()
+        return None
+    if attribute.hasFn(om2.MFn.kEnumAttribute):
+        return plug.asInt()
+    if attribute.hasFn(om2.MFn.kUnitAttribute):
+        return plug.asDouble()
+    return None
+
+def _driven_attributes(connected):
+    """The connected attributes plus the parents of connected RGB/XYZ/UV children."""
+    driven = set()
+    for name in connected:
+        driven.add(name)
+        if name[-1:] in _CHILD_SUFFIXES:
+            driven.add(name[:-1])
+    return driven
+
+class DuplicateGroup(object):
+    """Identical networks: the survivor and the copies that merge into it, all shading groups or all materials."""
+
+    def __init__(self, survivor, duplicates, materials):
+        self.survivor = survivor
+        self.duplicates = duplicates
+        self.materials = materials  # root -> material name
+
+    def duplicate_materials(self):
+        return [self.materials[duplicate] for duplicate in self.duplicates]
+
+class DuplicateNetworks(object):
+    """The duplicate groups of a scene, the networks they were found in and how long each stage took."""
+
+    def __init__(self, groups, networks, roots, timings):
+        self.groups = groups
+        self.networks = networks
+        self.roots = roots
+        self.timings = timings
+
+    def duplicate_count(self):
+        return sum(len(group.duplicates) for group in self.groups)
+
+def find_duplicate_networks(materials=None):
+    """
+    Groups the shader networks of the scene by their canonical hash.
+
+    Shading groups are compared with their whole input network, materials without a
+    shading group on their own. Default and referenced nodes can survive but are
+    never merged away; otherwise the first material in scene order survives.
+
+    :param materials: Materials to look at, all materials of the scene by default.
+    :return: DuplicateNetworks
+    """
+    timings = {}
+    start = time.perf_counter()
+    cache = material_cache.get_cache()
+    materials = cache.all_materials() if materials is None else materials
+    root_material = {}
+    shading_groups, loose_materials = [], []
+    for material in materials:
+        groups = cache.shading_groups(material)
+        for shading_group in groups:
+            root_material.setdefault(shading_group, material)
+        shading_groups.extend(groups)
+        if not groups:
+            loose_materials.append(material)
+            root_material[material] = material
+    shading_groups = list(dict.fromkeys(shading_groups))
+    roots = shading_groups + loose_materials
+    networks = ShaderNetworks(shading_groups, loose_materials)
+    timings['walk'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Attribute values are only read for the networks whose layout and textures match another one
+    by_layout = {}
+    for root in roots:
+        by_layout.setdefault((root in loose_materials, networks.node_hash(root, with_values=False)), []).append(root)
+    by_hash = {}
+    for layout, candidates in by_layout.items():
+        for root in candidates if len(candidates) > 1 else []:
+            by_hash.setdefault((layout, networks.node_hash(root)), []).append(root)
+    locked = set(cmds.ls(roots, defaultNodes=True) or []) | set(cmds.ls(roots, referencedNodes=True) or [])
+    groups = []
+    for members in by_hash.values():
+        if len(members) < 2:
+            continue
+        survivor = next((member for member in members if member in locked), members[0])
+        duplicates = [member for member in members if member != survivor and member not in locked]
+        if duplicates:
+            groups.append(DuplicateGroup(survivor, duplicates, {member: root_material[member] for member in members}))
+    timings['hash'] = time.perf_counter() - start
+    return DuplicateNetworks(groups, networks, roots, timings)
+
+def unused_network_nodes(found):
+    """
+    Returns the nodes of the merged-away networks that no other network or scene node uses.
+
+    Nodes shared with a kept network stay, and so does anything with a downstream
+    connection outside the merged-away networks, except for Maya's bookkeeping nodes.
+    """
+    networks = found.networks
+    merged = {duplicate for group in found.groups for duplicate in group.duplicates}
+    kept = networks.upstream(root for root in found.roots if root not in merged)
+    doomed = networks.upstream(merged) - kept - networks.dag_nodes
+    doomed -= set(cmds.ls(list(doomed), defaultNodes=True) or [])
+    doomed -= set(cmds.ls(list(doomed), referencedNodes=True) or [])
+    if not doomed:
+        return []
+    pairs = cmds.listConnections(list(doomed), source=False, destination=True, connections=True) or []
+    outputs = list(zip([plug.split('.', 1)[0] for plug in pairs[0::2]], pairs[1::2]))
+    listing = cmds.ls(list({target for _, target in outputs}), showType=True) or []
+    target_types = dict(zip(listing[0::2], listing[1::2]))
+    # Anything used from outside keeps its whole upstream alive, repeat until nothing changes
+    changed = True
+    while changed:
+        changed = False
+        for node, target in outputs:
+            if node in doomed and target not in doomed and target_types.get(target) not in BOOKKEEPING_TYPES:
+                doomed -= networks.upstream([node])
+                changed = True
+    return sorted(doomed)
+
+def merge_duplicate_networks(found, delete_unused=True):
+    """
+    Moves the members of every copy to its survivor and deletes the unused copies, in one undo step.
+
+    :param found: DuplicateNetworks from find_duplicate_networks.
+    :return: The deleted nodes.
+    """
+    deleted = []
+    cmds.undoInfo(openChunk=True, chunkName='mergeMaterials')
+    cmds.refresh(suspend=True)
+    try:
+        for group in found.groups:
+            members = []
+            for duplicate in group.duplicates:
+                if cmds.objectType(duplicate) == 'shadingEngine':
+                    members.extend(cmds.sets(duplicate, query=True) or [])
+            if members:
+                cmds.sets(members, edit=True, forceElement=group.survivor)
+        if delete_unused:
+            deleted = unused_network_nodes(found)
+            if deleted:
+                cmds.delete(deleted)
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+    return deleted
+
+def merge_duplicate_materials(dry_run=False):
+    """
+    Finds identical shader networks in the scene and merges them, or only reports them with dry_run.
+
+    :return: The DuplicateNetworks found.
+    """
+    found = find_duplicate_networks()
+    for group in found.groups:
+        names = group.duplicate_materials()
+        print(f"{group.materials[group.survivor]} <- {len(names)} copies: {', '.join(names[:10])}"
+              f"{' ...' if len(names) > 10 else ''}")
+    if dry_run or not found.groups:
+        print(f"{found.duplicate_count()} duplicate shader networks in {len(found.groups)} groups"
+              f"{', nothing merged (dry run)' if dry_run else ''}.")
+    else:
+        start = time.perf_counter()
+        deleted = merge_duplicate_networks(found)
+        found.timings['merge'] = time.perf_counter() - start
+        print(f"Merged {found.duplicate_count()} duplicate shader networks into {len(found.groups)}, "
+              f"{len(deleted)} unused nodes deleted.")
+    print(', '.join(f"{stage}: {seconds:.3f}s" for stage, seconds in found.timings.items()))
+    return found
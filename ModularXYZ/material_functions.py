@@ -1,63 +1,60 @@
 import maya.cmds as cmds
 import os
+import material_index
+import material_cache
+import texture_import
+import task_runner
+from mesh_data import range_components
+from texture_import import create_lambert_shader_with_texture  # Lives with the batch import that also uses it
 
 def process_materials(selection, unique_materials, is_component=False):
     """
     Processes the given selection to find and add materials to the unique_materials set.
-    
+
     :param selection: The selected object or component in Maya.
     :param unique_materials: A set to store unique material names.
     :param is_component: A boolean indicating if the selection is a component (e.g., face).
     """
+    cache = material_cache.get_cache()
     if is_component:
         shading_groups = cmds.listSets(type=1, object=selection) or []
     else:
-        shapes = cmds.listRelatives(selection, children=True, shapes=True) or []
+        shapes = cmds.listRelatives(selection, children=True, shapes=True, fullPath=True) or []
         shading_groups = []
         for shape in shapes:
-            shading_groups.extend(cmds.listConnections(shape, type='shadingEngine') or [])
-    
+            shading_groups.extend(cache.shading_groups_of_shape(shape))
+
     for sg in shading_groups:
-        materials = cmds.ls(cmds.listConnections(sg), materials=True)
-        for mat in materials:
-            unique_materials.add(mat)
+        material = cache.material_of_shading_group(sg)
+        if material:
+            unique_materials.add(material)
 
 def fetch_materials_selection():
     """
     Fetches materials from the current selection or component selection in Maya, ensuring uniqueness.
+    Face selections are matched against the face ranges of each shading group, see material_index.
     :return: A list of unique material names.
     """
-    selection = cmds.ls(selection=True, objectsOnly=True)
-    component_selection = cmds.ls(selection=True, flatten=True, objectsOnly=False)
-    if not selection and not component_selection:
+    if not cmds.ls(selection=True):
         print("No objects or components selected.")
         return []
-    
-    unique_materials = set()
-    
-    for obj in selection:
-        process_materials(obj, unique_materials)
-    
-    for comp in component_selection:
-        if '.f[' in comp:
-            process_materials(comp, unique_materials, is_component=True)
-
-    unique_materials_list = list(unique_materials)
-    
+
+    unique_materials_list = material_index.materials_of_selection()
+
     if unique_materials_list:
         print(f"Unique Materials: {', '.join(unique_materials_list)}")
     else:
         print("No materials found.")
-    
+
     return unique_materials_list
 
 def assign_material_to_selection(self):
-    selected_items = self.listWindow.selectedItems()
-    if not selected_items:
+    selected_names = self.selectedMaterialNames()
+    if not selected_names:
         cmds.warning("No material selected in the list.")
         return
 
-    material_name = selected_items[0].text()  # Assuming single selection for simplicity
+    material_name = selected_names[0]  # Assuming single selection for simplicity
 
     # Get Maya selection
     maya_selection = cmds.ls(selection=True)
@@ -66,65 +63,164 @@ def assign_material_to_selection(self):
         return
 
     # Find shading group associated with the material
-    shading_groups = cmds.listConnections(f"{material_name}.outColor", type='shadingEngine')
-    if not shading_groups:
+    shading_group = get_shading_group(material_name)
+    if not shading_group:
         cmds.warning(f"No shading group found for material: {material_name}")
         return
 
-    shading_group = shading_groups[0]  # Assuming the first shading group is the target
+    # Assign the shading group to all selected objects in one membership edit
+    assign_materials({shading_group: maya_selection})
+
+    print(f"Assigned {material_name} to selected objects.")
+
+def collapse_targets(targets, resolver=None):
+    """
+    Collapses objects and face components into as few set members as possible.
+
+    Faces of one mesh become compact ranges on its shape ('pCubeShape1.f[0:99]'),
+    a whole mesh replaces its faces, anything else (other components, non-mesh
+    objects) is kept as given.
+    """
+    resolver = resolver or material_index.ShapeResolver()
+    face_targets, other_targets = [], []
+    for target in targets:
+        node = target.split('.', 1)[0]
+        if resolver.shapes(node) and (target == node or '.f[' in target):
+            face_targets.append(target)
+        else:
+            other_targets.append(target)
+
+    members = []
+    for shape, ranges in material_index.collect_face_ranges(face_targets, resolver).items():
+        if ranges is material_index.WHOLE:
+            members.append(shape)
+        else:
+            members.extend(range_components(shape, ranges))
+    return members + other_targets
+
+def assign_materials(assignments):
+    """
+    Assigns many materials to many targets with one membership edit per shading group.
+
+    Viewport refresh is suspended and the whole assignment is one undo step. When a
+    target appears under several materials the last one wins.
+
+    :param assignments: {material or shading group: [objects and/or components]}
+    :return: {shading group: number of members assigned}
+    """
+    resolver = material_index.ShapeResolver()
+    memberships = {}
+    for name, targets in assignments.items():
+        if not cmds.objExists(name):
+            cmds.warning(f"Material not found: {name}")
+            continue
+        if cmds.objectType(name) == 'shadingEngine':
+            shading_group = name
+        else:
+            shading_group = get_shading_group(name)
+        if not shading_group:
+            cmds.warning(f"No shading group found for material: {name}")
+            continue
+        memberships.setdefault(shading_group, []).extend(targets)
+
+    assigned = {}
+    cmds.undoInfo(openChunk=True, chunkName='assignMaterials')
+    cmds.refresh(suspend=True)
+    try:
+        for shading_group, targets in memberships.items():
+            members = collapse_targets(targets, resolver)
+            if members:
+                cmds.sets(members, edit=True, forceElement=shading_group)
+            assigned[shading_group] = len(members)
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+    return assigned
 
-    # Assign the shading group to each selected object
-    for obj in maya_selection:
-        cmds.sets(obj, edit=True, forceElement=shading_group)
+def assign_material(material_name, targets):
+    """Assigns one material (or shading group) to the targets, see assign_materials."""
+    return assign_materials({material_name: targets})
 
-    cmds.inform(f"Assigned {material_name} to selected objects.")
-    
 def list_all_materials():
     # List all materials in the scene
-    all_materials = cmds.ls(materials=True)
+    all_materials = material_cache.get_cache().all_materials()
     return all_materials
 
-def create_lambert_shader_with_texture(image_path):
-    # Create Lambert shader
-    shader = cmds.shadingNode('lambert', asShader=True, name='lambert')
-    
-    # Create file texture node
-    file_texture = cmds.shadingNode('file', asTexture=True, name='fileTextureNode')
-    # Set file texture attributes
-    cmds.setAttr(file_texture + '.fileTextureName', image_path, type='string')
-    
-    # Create 2D texture placement node
-    place2dTexture = cmds.shadingNode('place2dTexture', asUtility=True, name='place2dTextureNode')
-    # Connect 2D texture placement attributes to file texture node
-    attributes = ['coverage', 'translateFrame', 'rotateFrame', 'mirrorU', 'mirrorV', 'stagger', 'wrapU', 'wrapV', 'repeatUV', 'offset', 'rotateUV', 'noiseUV', 'vertexUvOne', 'vertexUvTwo', 'vertexUvThree', 'vertexCameraOne']
-    for attr in attributes:
-        cmds.connectAttr(place2dTexture + '.' + attr, file_texture + '.' + attr, force=True)
-    
-    cmds.connectAttr(place2dTexture + '.outUV', file_texture + '.uvCoord', force=True)
-    cmds.connectAttr(place2dTexture + '.outUvFilterSize', file_texture + '.uvFilterSize', force=True)
-    
-    # Connect file texture to Lambert shader's color attribute
-    cmds.connectAttr(file_texture + '.outColor', shader + '.color', force=True)
-
-    # Create shading group for the Lambert shader
-    shading_group = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name='lambertShadingGroup')
-    
-    # Connect the Lambert shader to the shading group
-    cmds.connectAttr(shader + '.outColor', shading_group + '.surfaceShader', force=True)
-
-    return shader, shading_group
-
-def convert_images_to_shaders():
+def rename_material(old_name, new_name):
+    """Renames a material and returns the name Maya gave it."""
+    if not cmds.objExists(old_name):
+        cmds.warning(f"Material not found: {old_name}")
+        return old_name
+    return cmds.rename(old_name, new_name)
+
+def get_shading_group(material_name):
+    """Returns the first shading group using the material as surface shader, or None."""
+    shading_groups = material_cache.get_cache().shading_groups(material_name)
+    return shading_groups[0] if shading_groups else None
+
+# Inputs read for the list swatch, first found wins: Maya, Arnold and Stingray color inputs
+SWATCH_ATTRIBUTES = ['color', 'baseColor', 'TEX_color_map', 'base_color']
+
+def material_swatches(materials):
+    """
+    Returns what the Shader Toolkit list shows next to each material: the path of the
+    file texture on its color input, else its flat color as an (r, g, b) tuple, else None.
+    Texture paths relative to the project are expanded against the current workspace.
+    """
+    swatches = dict.fromkeys(materials)
+    existing = set(cmds.ls(materials) or []) if materials else set()
+    materials = [material for material in materials if material in existing]
+    if not materials:
+        return swatches
+    textures = {}
+    pairs = cmds.listConnections(materials, source=True, destination=False, type='file', connections=True) or []
+    for plug, file_node in zip(pairs[0::2], pairs[1::2]):
+        material, _, attribute = plug.partition('.')
+        if attribute in SWATCH_ATTRIBUTES:
+            rank = SWATCH_ATTRIBUTES.index(attribute)
+            if rank < textures.get(material, (len(SWATCH_ATTRIBUTES), None))[0]:
+                textures[material] = (rank, file_node)
+    for material in materials:
+        if material in textures:
+            path = cmds.getAttr(textures[material][1] + '.fileTextureName') or None
+            # sourceimages/brick.png is read by Maya from the project, the list reads files from disk
+            if path and not os.path.isabs(path):
+                path = cmds.workspace(expandName=path)
+            swatches[material] = path
+            continue
+        for attribute in SWATCH_ATTRIBUTES:
+            if cmds.objExists(f"{material}.{attribute}"):
+                color = cmds.getAttr(f"{material}.{attribute}")
+                swatches[material] = tuple(color[0]) if color else None
+                break
+    return swatches
+
+def convert_images_to_shaders(share_placement=False):
+    """
+    Creates a Lambert network for each picked image, see texture_import.import_images.
+
+    Images already used in the scene and duplicates within the batch are skipped.
+    """
+    image_files = pick_image_files()
+    if image_files:
+        task_runner.run_blocking(convert_images_to_shaders_steps(image_files, share_placement), undo_name='IMG2MTL')
+
+def pick_image_files():
     # Prompt the user to select image files
     image_files = cmds.fileDialog2(fileFilter='Image Files (*.png *.jpg *.jpeg *.bmp *.tiff *.exr *.tif);;', dialogStyle=2, fm=4)
     if not image_files:
         print("No image files selected.")
-        return
-    
-    # Create Lambert shader for each selected image
-    for image_file in image_files:
-        shader, shading_group = create_lambert_shader_with_texture(image_file)
-        print(f"Created Lambert shader with texture: {shader}, and its shading group: {shading_group}")
+    return image_files or []
 
-# You can call convert_images_to_shaders() to start the process
-convert_images_to_shaders() 
\ No newline at end of file
+def convert_images_to_shaders_steps(image_files, share_placement=False):
+    """Step generator of convert_images_to_shaders for the panel task runner."""
+    # Create Lambert shader for each new image
+    created, skipped, notes, timings = yield from texture_import.import_images_steps(image_files,
+                                                                                     share_placement=share_placement)
+    for image_file, shader, shading_group in created:
+        print(f"Created Lambert shader with texture: {shader}, and its shading group: {shading_group}")
+        for note in notes.get(image_file, []):
+            print(f"  {image_file}: {note}")
+    for image_file, reason in skipped:
+        print(f"Skipped {image_file}: {reason}")
+    print(', '.join(f"{stage}: {seconds:.3f}s" for stage, seconds in timings.items()))
@@ -0,0 +1,135 @@
+import re
+import maya.cmds as cmds
+import material_cache
+
+# Shading group membership as face ranges. Shading group members and the selection
+# are both read unflattened ('pCube1.f[0:499]'), so a material lookup costs one query
+# per shading group and a range intersection instead of one listSets call per face.
+
+_FACE_COMPONENT = re.compile(r'^(?P<node>.+)\.f\[(?P<start>\d+)(?::(?P<end>\d+))?\]$')
+
+WHOLE = None  # ranges value of a whole object member
+
+def intersect_ranges(ranges_a, ranges_b):
+    """True when two sorted lists of inclusive (start, end) ranges overlap."""
+    if ranges_a is WHOLE or ranges_b is WHOLE:
+        return True
+    i = j = 0
+    while i < len(ranges_a) and j < len(ranges_b):
+        start_a, end_a = ranges_a[i]
+        start_b, end_b = ranges_b[j]
+        if start_a <= end_b and start_b <= end_a:
+            return True
+        if end_a < end_b:
+            i += 1
+        else:
+            j += 1
+    return False
+
+def merge_ranges(ranges):
+    """Sorts inclusive ranges and merges the touching ones."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+class ShapeResolver(object):
+    """Resolves transform and shape names to long mesh shape names, one query per distinct node."""
+
+    def __init__(self):
+        self._shapes = {}
+
+    def shapes(self, node):
+        if node not in self._shapes:
+            if cmds.objectType(node, isType='mesh'):
+                self._shapes[node] = cmds.ls(node, long=True) or []
+            else:
+                self._shapes[node] = cmds.listRelatives(node, shapes=True, noIntermediate=True,
+                                                        fullPath=True, type='mesh') or []
+        return self._shapes[node]
+
+    def add_shapes(self, shapes):
+        """
+        Registers long mesh shape names, so members naming them or their transforms need
+        no query. Short names are registered when they are unique among the given nodes.
+        """
+        owners = {}
+        for shape in shapes:
+            transform = shape.rsplit('|', 1)[0]
+            self._shapes.setdefault(shape, [shape])
+            transform_shapes = self._shapes.setdefault(transform, [])
+            if shape not in transform_shapes:
+                transform_shapes.append(shape)
+            for name in (shape, transform):
+                owners.setdefault(name.rsplit('|', 1)[-1], set()).add(name)
+        for short_name, names in owners.items():
+            if len(names) == 1 and short_name not in self._shapes:
+                self._shapes[short_name] = self._shapes[next(iter(names))]
+
+def collect_face_ranges(members, resolver):
+    """
+    Turns unflattened set members or selection items into {shape: ranges}.
+
+    Whole objects get WHOLE, face components get merged (start, end) ranges and any
+    other component (vertices, edges, uvs) is ignored.
+    """
+    face_ranges = {}
+    for member in members:
+        if '.' in member.rsplit('|', 1)[-1]:
+            match = _FACE_COMPONENT.match(member)
+            if not match:
+                continue
+            start = int(match.group('start'))
+            end = int(match.group('end') or start)
+            for shape in resolver.shapes(match.group('node')):
+                if face_ranges.get(shape, []) is not WHOLE:
+                    face_ranges.setdefault(shape, []).append((start, end))
+        else:
+            for shape in resolver.shapes(member):
+                face_ranges[shape] = WHOLE
+    return {shape: ranges if ranges is WHOLE else merge_ranges(ranges) for shape, ranges in face_ranges.items()}
+
+class ShadingIndex(object):
+    """
+    Index of shape -> shading group -> face ranges for a set of mesh shapes.
+
+    :param shapes: Long names of the mesh shapes to index.
+    """
+
+    def __init__(self, shapes, resolver=None):
+        self.resolver = resolver or ShapeResolver()
+        self.ranges = {shape: {} for shape in shapes}
+        cache = material_cache.get_cache()
+        shading_groups = set()
+        for shape in shapes:
+            shading_groups.update(cache.shading_groups_of_shape(shape))
+        for shading_group in shading_groups:
+            members = cmds.sets(shading_group, query=True) or []
+            for shape, ranges in collect_face_ranges(members, self.resolver).items():
+                if shape in self.ranges:
+                    self.ranges[shape][shading_group] = ranges
+
+    def shading_groups_touching(self, face_ranges):
+        """Returns the shading groups assigned to any face of {shape: ranges}."""
+        shading_groups = set()
+        for shape, ranges in face_ranges.items():
+            for shading_group, group_ranges in self.ranges.get(shape, {}).items():
+                if intersect_ranges(ranges, group_ranges):
+                    shading_groups.add(shading_group)
+        return shading_groups
+
+def materials_of_shading_groups(shading_groups):
+    """Returns the unique materials connected to the given shading groups."""
+    cache = material_cache.get_cache()
+    materials = [cache.material_of_shading_group(shading_group) for shading_group in shading_groups]
+    return list(dict.fromkeys(material for material in materials if material))
+
+def materials_of_selection():
+    """Returns the materials touching the selected objects and faces."""
+    resolver = ShapeResolver()
+    face_ranges = collect_face_ranges(cmds.ls(selection=True, long=True) or [], resolver)
+    index = ShadingIndex(list(face_ranges), resolver)
+    return materials_of_shading_groups(index.shading_groups_touching(face_ranges))
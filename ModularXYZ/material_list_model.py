@@ -0,0 +1,240 @@
+from PySide2.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QRegularExpression, Signal
+from PySide2.QtGui import QImage, QColor
+from mesh_data import compact_ranges
+from thumbnail_cache import THUMBNAIL_SIZE
+
+# Model behind the Shader Toolkit list. The view only asks for the rows inside its
+# viewport, so no per-row widget item exists, and the list is updated by diff
+# (remove / insert / rename) instead of being cleared and refilled.
+# Swatches follow the same rule: what a material shows (texture or flat color) is read
+# from the scene for a block of rows the first time one of them is drawn, and texture
+# thumbnails come from a thumbnail_cache.ThumbnailCache, which decodes off the main thread.
+# After a usage report the model grows the Faces, Objects and Area columns, sorted by
+# the filter model on SORT_ROLE so numbers sort as numbers.
+
+RESOLVE_BLOCK = 64  # Rows whose swatch is read from the scene in one call
+USAGE_COLUMNS = ['Faces', 'Objects', 'Area']
+SORT_ROLE = Qt.UserRole + 1
+
+def decode_thumbnail(path, size):
+    """Reads an image as size x size RGBA bytes, cropped to a square. Safe on worker threads."""
+    image = QImage(path)
+    if image.isNull():
+        return None
+    image = image.scaled(size, size, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+    image = image.copy((image.width() - size) // 2, (image.height() - size) // 2, size, size)
+    return bytes(image.convertToFormat(QImage.Format_RGBA8888).constBits())
+
+class MaterialListModel(QAbstractTableModel):
+    """Material names of the Shader Toolkit list, and their usage once a report was run."""
+
+    # Emitted with (old name, requested name) when a row is edited in the view
+    renameRequested = Signal(str, str)
+    # Emitted from a worker thread with the texture path, delivered on the main thread
+    thumbnailLoaded = Signal(str)
+
+    def __init__(self, parent=None):
+        super(MaterialListModel, self).__init__(parent)
+        self._names = []
+        self._rows = {}
+        self._thumbnails = None
+        self._swatch_resolver = None
+        self._swatches = {}  # name -> texture path, (r, g, b) or None
+        self._texture_names = {}  # texture path -> names showing it
+        self._usage = None  # name -> material_report.MaterialUsage
+        self.thumbnailLoaded.connect(self._on_thumbnail_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 1 if self._usage is None else 1 + len(USAGE_COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation != Qt.Horizontal or role != Qt.DisplayRole:
+            return None
+        return (['Material'] + USAGE_COLUMNS)[section]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.column() > 0:
+            return self._usage_data(index, role)
+        if role in (Qt.DisplayRole, Qt.EditRole, Qt.UserRole, SORT_ROLE):
+            return self._names[index.row()]
+        if role == Qt.DecorationRole and self._thumbnails is not None:
+            return self._swatch(index.row())
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        if index.column() > 0:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        old_name = self._names[index.row()]
+        if value and value != old_name:
+            self.renameRequested.emit(old_name, value)
+        return True
+
+    def names(self):
+        return list(self._names)
+
+    # --- usage -------------------------------------------------------------------
+
+    def set_usage(self, usage):
+        """Shows the usage columns, usage maps names to material_report.MaterialUsage rows."""
+        if self._usage is None:
+            self.beginInsertColumns(QModelIndex(), 1, len(USAGE_COLUMNS))
+            self._usage = dict(usage)
+            self.endInsertColumns()
+        else:
+            self._usage = dict(usage)
+            if self._names:
+                self.dataChanged.emit(self.index(0, 1), self.index(len(self._names) - 1, len(USAGE_COLUMNS)))
+
+    def clear_usage(self):
+        if self._usage is not None:
+            self.beginRemoveColumns(QModelIndex(), 1, len(USAGE_COLUMNS))
+            self._usage = None
+            self.endRemoveColumns()
+
+    def _usage_data(self, index, role):
+        usage = self._usage.get(self._names[index.row()])
+        if usage is None or role not in (Qt.DisplayRole, SORT_ROLE, Qt.TextAlignmentRole):
+            return None
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        value = (usage.faces, usage.objects, usage.area)[index.column() - 1]
+        if role == SORT_ROLE:
+            return value
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    # --- swatches ----------------------------------------------------------------
+
+    def set_thumbnails(self, cache, resolver):
+        """
+        Shows a swatch on every row.
+
+        :param cache: The ThumbnailCache texture thumbnails come from.
+        :param resolver: Called with a list of material names, returns a dict from name
+            to texture path, (r, g, b) color or None, see material_functions.material_swatches.
+        """
+        self.release_thumbnails()
+        self._thumbnails = cache
+        self._swatch_resolver = resolver
+        cache.listeners.append(self._thumbnail_listener)
+        self.clear_swatches()
+
+    def release_thumbnails(self):
+        if self._thumbnails is not None and self._thumbnail_listener in self._thumbnails.listeners:
+            self._thumbnails.listeners.remove(self._thumbnail_listener)
+        self._thumbnails = None
+
+    def clear_swatches(self):
+        """Forgets which texture or color every material shows, they are read again when drawn."""
+        self._swatches = {}
+        self._texture_names = {}
+        if self._names:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self._names) - 1, 0), [Qt.DecorationRole])
+
+    def _swatch(self, row):
+        name = self._names[row]
+        if name not in self._swatches:
+            self._resolve_swatches(row)
+        source = self._swatches.get(name)
+        if isinstance(source, tuple):
+            return QColor.fromRgbF(*[min(max(channel, 0.0), 1.0) for channel in source[:3]])
+        if not source:
+            return None
+        data = self._thumbnails.get(source)
+        if not data:
+            return None  # Still loading, or not an image Qt can read
+        return QImage(data, THUMBNAIL_SIZE, THUMBNAIL_SIZE, QImage.Format_RGBA8888).copy()
+
+    def _resolve_swatches(self, row):
+        names = [name for name in self._names[row:row + RESOLVE_BLOCK] if name not in self._swatches]
+        for name, source in self._swatch_resolver(names).items():
+            self._swatches[name] = source
+            if isinstance(source, str):
+                self._texture_names.setdefault(source, set()).add(name)
+
+    def _thumbnail_listener(self, path):
+        self.thumbnailLoaded.emit(path)
+
+    def _on_thumbnail_loaded(self, path):
+        for name in self._texture_names.get(path, ()):
+            row = self._rows.get(name)
+            if row is not None:
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def set_materials(self, names):
+        """
+        Updates the list to the given names by diff.
+
+        Rows of names that are gone are removed in contiguous blocks, new names are
+        appended in one insert, and rows that stay keep their position and selection.
+        """
+        names = list(dict.fromkeys(names))
+        wanted = set(names)
+        removed_rows = [row for row, name in enumerate(self._names) if name not in wanted]
+        for start, end in reversed(compact_ranges(removed_rows)):
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self._names[start:end + 1]
+            self.endRemoveRows()
+
+        existing = set(self._names)
+        added = [name for name in names if name not in existing]
+        if added:
+            first = len(self._names)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._names.extend(added)
+            self.endInsertRows()
+        self._rows = {name: row for row, name in enumerate(self._names)}
+
+    def rename_material(self, old_name, new_name):
+        """Renames one row in place."""
+        row = self._rows.pop(old_name, None)
+        if row is None:
+            return
+        source = self._swatches.pop(old_name, None)
+        if isinstance(source, str):
+            self._texture_names.get(source, set()).discard(old_name)
+        if self._usage is not None and old_name in self._usage:
+            self._usage[new_name] = self._usage.pop(old_name)
+        self._names[row] = new_name
+        self._rows[new_name] = row
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    def remove_materials(self, names):
+        names = set(names)
+        self.set_materials([name for name in self._names if name not in names])
+
+
+class MaterialFilterModel(QSortFilterProxyModel):
+    """Case insensitive substring or regular expression filter over a MaterialListModel, sorts on SORT_ROLE."""
+
+    def __init__(self, parent=None):
+        super(MaterialFilterModel, self).__init__(parent)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setFilterRole(Qt.DisplayRole)
+        self.setFilterKeyColumn(0)
+        self.setSortRole(SORT_ROLE)
+
+    def set_filter(self, text, regex=False):
+        """Applies the filter, returns False (and keeps the last filter) for an invalid regex."""
+        if not regex:
+            self.setFilterFixedString(text)
+            return True
+        expression = QRegularExpression(text, QRegularExpression.CaseInsensitiveOption)
+        if not expression.isValid():
+            return False
+        self.setFilterRegularExpression(expression)
+        return True
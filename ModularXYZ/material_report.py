@@ -0,0 +1,169 @@
+import os
+import csv
+import json
+import time
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+import material_cache
+import material_index
+import mesh_io
+from mesh_cleanup import face_normals
+
+# Material usage report: how many faces, mesh instances and how much world space area
+# every material covers, to find the materials worth merging or atlasing.
+# Shading group members are read once per shading group as face ranges and resolved
+# to shapes without a query per member (see material_index.ShapeResolver.add_shapes).
+# Every mesh is read once, its face areas go into a running sum, so the area of a
+# range of faces is the difference of two entries of that sum. Points are read in
+# centimeters, areas are reported in the scene unit squared.
+
+COLUMNS = ['material', 'faces', 'objects', 'area', 'shading_groups']
+
+class MaterialUsage(object):
+    """What one material covers."""
+
+    def __init__(self, material):
+        self.material = material
+        self.shading_groups = []
+        self.faces = 0
+        self.objects = 0  # Mesh instances with at least one face of the material
+        self.area = 0.0  # World space, in scene units squared
+
+    def as_dict(self):
+        return {'material': self.material, 'faces': self.faces, 'objects': self.objects,
+                'area': round(self.area, 6), 'shading_groups': list(self.shading_groups)}
+
+class UsageReport(object):
+    """MaterialUsage rows, most faces first, and the totals of the meshes counted."""
+
+    def __init__(self, rows, meshes, faces, unassigned_faces, seconds):
+        self.rows = rows
+        self.meshes = meshes
+        self.faces = faces
+        self.unassigned_faces = unassigned_faces
+        self.seconds = seconds
+
+    def by_material(self):
+        return {row.material: row for row in self.rows}
+
+    def sorted_rows(self, column='faces', descending=True):
+        if column not in COLUMNS[:4]:
+            raise ValueError(f"Unknown column '{column}', expected one of {', '.join(COLUMNS[:4])}")
+        return sorted(self.rows, key=lambda row: getattr(row, column), reverse=descending)
+
+    def report_text(self, column='faces', limit=20):
+        lines = [f"{'material':<40}{'faces':>10}{'objects':>9}{'area':>14}"]
+        for row in self.sorted_rows(column)[:limit]:
+            lines.append(f"{row.material[-40:]:<40}{row.faces:>10}{row.objects:>9}{row.area:>14.3f}")
+        lines.append(f"{len(self.rows)} materials over {self.meshes} meshes, {self.faces} faces "
+                     f"({self.unassigned_faces} without material), {self.seconds:.2f}s")
+        return '\n'.join(lines)
+
+    def export(self, path):
+        """Writes the rows to a .json file, or to CSV for any other extension."""
+        if os.path.splitext(path)[1].lower() == '.json':
+            with open(path, 'w', encoding='utf-8') as report_file:
+                json.dump({'meshes': self.meshes, 'faces': self.faces, 'unassigned_faces': self.unassigned_faces,
+                           'materials': [row.as_dict() for row in self.rows]}, report_file, indent=1)
+            return path
+        with open(path, 'w', encoding='utf-8', newline='') as report_file:
+            writer = csv.writer(report_file)
+            writer.writerow(COLUMNS)
+            for row in self.rows:
+                values = row.as_dict()
+                values['shading_groups'] = ' '.join(values['shading_groups'])
+                writer.writerow([values[column] for column in COLUMNS])
+        return path
+
+class _MeshFaces(object):
+    """
+    Face count of a mesh and, when areas are wanted, the running sum of its face areas.
+
+    :param area_scale: Factor from square centimeters to the unit the areas are summed in.
+    """
+
+    def __init__(self, shape, with_area, area_scale=1.0):
+        if with_area:
+            points = mesh_io.read_point_array(shape, world_space=True)
+            counts, connects = mesh_io.read_topology(shape)
+            areas = np.linalg.norm(face_normals(points, counts, connects), axis=1) * (area_scale / 2.0) \
+                if len(counts) else []
+            self.count = len(counts)
+            self.area_sum = np.concatenate([[0.0], np.cumsum(areas)])
+        else:
+            self.count = om2.MFnMesh(mesh_io.get_dag_path(shape)).numPolygons
+            self.area_sum = None
+
+    def measure(self, ranges):
+        """Returns (faces, area) of WHOLE or of inclusive (start, end) face ranges."""
+        if ranges is material_index.WHOLE or not self.count:
+            return self.count, self.area_sum[-1] if self.area_sum is not None else 0.0
+        ranges = np.minimum(np.array(ranges, dtype=np.int64).reshape(-1, 2), self.count - 1)
+        ranges = ranges[ranges[:, 0] <= ranges[:, 1]]
+        faces = int((ranges[:, 1] - ranges[:, 0] + 1).sum())
+        if self.area_sum is None:
+            return faces, 0.0
+        return faces, float((self.area_sum[ranges[:, 1] + 1] - self.area_sum[ranges[:, 0]]).sum())
+
+def usage_report(shapes=None, with_area=True):
+    """
+    Counts the faces, mesh instances and world space area of every material.
+
+    Areas are in the scene linear unit squared, square meters in a scene set to meters.
+
+    :param shapes: Long names of the mesh shapes to count, every mesh of the scene when
+        None. With the whole scene, materials nothing uses are listed with zeros.
+    :param with_area: Also read the points of every mesh and sum the face areas.
+    :return: A UsageReport.
+    """
+    start = time.perf_counter()
+    # Every path of an instanced mesh is a draw of its own
+    scene_shapes = cmds.ls(dag=True, allPaths=True, type='mesh', noIntermediate=True, long=True) or []
+    scope = set(scene_shapes if shapes is None else shapes)
+    resolver = material_index.ShapeResolver()
+    resolver.add_shapes(scene_shapes)
+    cache = material_cache.get_cache()
+    area_scale = mesh_io.internal_to_ui(1.0) ** 2 if with_area else 1.0
+
+    rows = []
+    meshes = {}
+    assigned = {}  # shape -> faces with a shading group
+    for material in cache.all_materials():
+        row = MaterialUsage(material)
+        row.shading_groups = cache.shading_groups(material)
+        objects = set()
+        for shading_group in row.shading_groups:
+            members = cmds.sets(shading_group, query=True) or []
+            for shape, ranges in material_index.collect_face_ranges(members, resolver).items():
+                if shape not in scope:
+                    continue
+                if shape not in meshes:
+                    meshes[shape] = _MeshFaces(shape, with_area, area_scale)
+                faces, area = meshes[shape].measure(ranges)
+                row.faces += faces
+                row.area += area
+                assigned[shape] = assigned.get(shape, 0) + faces
+                objects.add(shape)
+        row.objects = len(objects)
+        if shapes is None or row.faces:
+            rows.append(row)
+
+    faces = sum(mesh.count for mesh in meshes.values())
+    for shape in scope.difference(meshes):
+        faces += om2.MFnMesh(mesh_io.get_dag_path(shape)).numPolygons
+    unassigned = faces - sum(min(count, meshes[shape].count) for shape, count in assigned.items())
+    rows.sort(key=lambda row: row.faces, reverse=True)
+    return UsageReport(rows, len(scope), faces, unassigned, time.perf_counter() - start)
+
+def selection_shapes():
+    """Returns every mesh instance under the selection, components count their whole mesh."""
+    objects = cmds.ls(selection=True, objectsOnly=True, long=True) or []
+    return cmds.ls(objects, dag=True, type='mesh', noIntermediate=True, long=True) or []
+
+def usage_report_selection(with_area=True):
+    """Reports the selected meshes, or the whole scene when nothing is selected, and prints the top rows."""
+    shapes = selection_shapes() if cmds.ls(selection=True) else None
+    report = usage_report(shapes, with_area)
+    print(report.report_text())
+    return report
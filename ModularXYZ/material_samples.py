@@ -0,0 +1,133 @@
+import json
+import math
+import maya.cmds as cmds
+import grid_functions
+import material_cache
+
+# Sample board for BoxSample / BallSample. One source cube or sphere lives hidden under
+# the board group; every material gets an instance of it, so a board of 1000 materials
+# is one mesh. Samples sit on a square grid whose pitch is a multiple of the current
+# grid spacing and are assigned per instance, one membership edit per shading group.
+# The board remembers its samples in a JSON string attribute; building it again only
+# adds the missing materials, removes the ones no longer wanted and moves the rest.
+
+BOARD_NAME = 'ModularXYZ_samples'
+BOARD_ATTRIBUTE = 'modularSamples'  # {'shape': ..., 'source': path, 'samples': {material: [path, x, z]}}
+SAMPLE_SIZE = 1.0
+SAMPLE_GAP = 1.0  # Smallest free space between two samples
+SHAPES = ('cube', 'sphere')
+
+def sample_pitch(spacing, size=SAMPLE_SIZE):
+    """Distance between two sample centers: the smallest multiple of the grid spacing leaving SAMPLE_GAP free."""
+    wanted = size + SAMPLE_GAP
+    if not spacing or spacing <= 0:
+        return wanted
+    return spacing * max(1, math.ceil(wanted / spacing - 1e-9))
+
+def grid_positions(count, pitch):
+    """Returns the (x, z) of count cells filled row by row on a square grid starting at the origin."""
+    columns = max(1, math.ceil(math.sqrt(count)))
+    return [((index % columns) * pitch, (index // columns) * pitch) for index in range(count)]
+
+def read_board(board=BOARD_NAME):
+    """Returns the saved state of a sample board, or None when there is no usable board."""
+    if not cmds.objExists(f"{board}.{BOARD_ATTRIBUTE}"):
+        return None
+    try:
+        state = json.loads(cmds.getAttr(f"{board}.{BOARD_ATTRIBUTE}") or '')
+    except ValueError:
+        return None
+    if state.get('shape') not in SHAPES or not cmds.objExists(state.get('source') or ''):
+        return None
+    return state
+
+def create_board(shape, board=BOARD_NAME):
+    """Creates the board group and its hidden source mesh, returns the state of the empty board."""
+    board = cmds.group(empty=True, world=True, name=board)
+    cmds.addAttr(board, longName=BOARD_ATTRIBUTE, dataType='string')
+    if shape == 'cube':
+        source = cmds.polyCube(width=SAMPLE_SIZE, height=SAMPLE_SIZE, depth=SAMPLE_SIZE, name='sampleCube')[0]
+    else:
+        source = cmds.polySphere(radius=SAMPLE_SIZE / 2.0, name='sampleSphere')[0]
+    cmds.delete(source, constructionHistory=True)
+    source = cmds.parent(source, board)[0]
+    cmds.setAttr(source + '.visibility', False)
+    return {'board': board, 'shape': shape, 'source': f"|{board}|{source.split('|')[-1]}", 'samples': {}}
+
+def build_sample_board(materials, shape='cube', spacing=None, board=BOARD_NAME):
+    """
+    Shows the materials on instances of one cube or sphere laid out on a square grid.
+
+    An existing board of the same shape is updated in place: samples of materials no
+    longer given are deleted, the others keep their instance and are only moved when
+    their cell changed. A board of the other shape is rebuilt. One undo step.
+
+    :param spacing: Grid spacing the samples align to, the current Maya grid when None.
+    :return: {material: sample transform path}
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown sample shape '{shape}', expected one of {', '.join(SHAPES)}")
+    materials = list(dict.fromkeys(materials))
+    pitch = sample_pitch(grid_functions.current_spacing() if spacing is None else spacing)
+    cache = material_cache.get_cache()
+
+    cmds.undoInfo(openChunk=True, chunkName='sampleBoard')
+    cmds.refresh(suspend=True)
+    try:
+        state = read_board(board)
+        if state is None or state['shape'] != shape:
+            if cmds.objExists(f"{board}.{BOARD_ATTRIBUTE}"):
+                cmds.delete(board)
+            elif cmds.objExists(board):
+                # Only a node made by create_board is ours to delete
+                cmds.error(f"'{board}' exists and is not a sample board, rename it or pick another board name.")
+            state = create_board(shape, board)
+            board = state['board']
+        samples = state['samples']
+
+        # Samples deleted by hand are made again, samples of dropped materials go
+        paths = [sample[0] for sample in samples.values()]
+        alive = set(cmds.ls(paths, long=True) or []) if paths else set()
+        wanted = set(materials)
+        doomed = [sample[0] for material, sample in samples.items() if material not in wanted and sample[0] in alive]
+        if doomed:
+            cmds.delete(doomed)
+        samples = {material: sample for material, sample in samples.items()
+                   if material in wanted and sample[0] in alive}
+
+        # Instancing copies the source transform, it is shown while the new samples are made
+        added = [material for material in materials if material not in samples]
+        if added:
+            cmds.setAttr(state['source'] + '.visibility', True)
+            for material in added:
+                name = cmds.instance(state['source'], name=f"{material.replace(':', '_')}_sample")[0]
+                samples[material] = [f"|{board}|{name.split('|')[-1]}", None, None]
+            cmds.setAttr(state['source'] + '.visibility', False)
+
+        moved = 0
+        for material, (x, z) in zip(materials, grid_positions(len(materials), pitch)):
+            sample = samples[material]
+            if sample[1:] != [x, z]:
+                cmds.move(x, SAMPLE_SIZE / 2.0, z, sample[0])
+                sample[1:] = [x, z]
+                moved += 1
+
+        memberships = {}
+        for material in added:
+            shading_groups = cache.shading_groups(material)
+            if shading_groups:
+                memberships.setdefault(shading_groups[0], []).append(samples[material][0])
+            else:
+                cmds.warning(f"No shading group found for material: {material}")
+        for shading_group, members in memberships.items():
+            cmds.sets(members, edit=True, forceElement=shading_group)
+
+        state['samples'] = {material: samples[material] for material in materials}
+        cmds.setAttr(f"{board}.{BOARD_ATTRIBUTE}", json.dumps({key: state[key] for key in
+                                                               ('shape', 'source', 'samples')}), type='string')
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+    print(f"Sample board: {len(materials)} {shape} samples, {len(added)} new, {len(doomed)} removed, "
+          f"{moved} moved, pitch {pitch:g}.")
+    return {material: sample[0] for material, sample in state['samples'].items()}
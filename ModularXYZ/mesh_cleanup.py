@@ -0,0 +1,243 @@
+import numpy as np
+from mesh_data import MeshData, UVSetData
+
+# Post-slice cleanup engine for Voxel Slice. Vertices closer than a tolerance are
+# welded through a hashed grid: every vertex is only compared with the vertices of
+# its own and the neighbouring cells. Faces are then rebuilt on the welded ids in one
+# vectorized pass, dropping collapsed corners and faces left with no area. The few
+# faces pinched onto one vertex twice are split into simple loops, and faces repeating
+# an earlier face in the same winding are removed; the back of a double sided card stays.
+# No maya import here, the engine also runs inside worker processes.
+
+MAX_CELLS_PER_AXIS = 1 << 20  # Keeps the linear cell keys inside int64
+
+def connected_components(count, a, b):
+    """Labels the components of a graph given as edge arrays, labels are 0..n-1."""
+    parent = np.arange(count)
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        linked = root_a != root_b
+        if not linked.any():
+            break
+        # Hook the larger root under the smaller one, then flatten the trees
+        np.minimum.at(parent, np.maximum(root_a, root_b)[linked], np.minimum(root_a, root_b)[linked])
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    return np.unique(parent, return_inverse=True)[1].reshape(-1)
+
+def face_normals(points, counts, connects):
+    """
+    Returns the area weighted normal of every face (Newell's method).
+
+    The length of a normal is twice the area of its face.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    connects = np.asarray(connects, dtype=np.int64)
+    starts = np.cumsum(counts) - counts
+    corners = points[connects]
+    following = np.arange(len(connects)) + 1
+    following[starts + counts - 1] = starts
+    return np.add.reduceat(np.cross(corners, corners[following]), starts, axis=0)
+
+def close_pairs(points, tolerance):
+    """
+    Returns the (M, 2) index pairs of points closer than the tolerance.
+
+    Points are hashed into cells at least tolerance wide, a pair can only come from
+    the same cell or from one of the 13 neighbour cells ahead of it.
+    """
+    if len(points) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    low = points.min(axis=0)
+    cell_size = max(tolerance, float((points.max(axis=0) - low).max()) / MAX_CELLS_PER_AXIS, 1e-12)
+    cells = np.floor((points - low) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    # Shifting every key by the same offset keeps the queries sorted, which makes
+    # searchsorted walk the keys in order
+    pairs = []
+    offsets = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+    for offset in offsets[13:]:
+        target = sorted_keys + (offset[0] * dims[1] + offset[1]) * dims[2] + offset[2]
+        starts = np.searchsorted(sorted_keys, target, side='left')
+        counts = np.searchsorted(sorted_keys, target, side='right') - starts
+        if not counts.any():
+            continue
+        first = order[np.repeat(np.arange(len(points)), counts)]
+        second = order[np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) +
+                       np.repeat(starts, counts)]
+        if offset == (0, 0, 0):
+            keep = first < second
+            first, second = first[keep], second[keep]
+        close = np.einsum('ij,ij->i', points[first] - points[second], points[first] - points[second]) <= \
+            tolerance * tolerance
+        pairs.append(np.stack([first[close], second[close]], axis=1))
+    return np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.int64)
+
+def weld_map(points, tolerance):
+    """
+    Returns the welded id of every vertex and the number of welded vertices.
+
+    Chains of close vertices weld into one, every group keeps the position of its
+    lowest vertex id.
+    """
+    pairs = close_pairs(points, tolerance)
+    if not len(pairs):
+        return np.arange(len(points)), len(points)
+    labels = connected_components(len(points), pairs[:, 0], pairs[:, 1])
+    return labels, int(labels.max()) + 1
+
+def simple_loops(corners, vertices):
+    """Cuts a loop of corners at every vertex it visits twice, returns the loops of 3 corners or more."""
+    seen = {}
+    for position, corner in enumerate(corners):
+        vertex = vertices[corner]
+        if vertex in seen:
+            first = seen[vertex]
+            return (simple_loops(corners[first:position], vertices) +
+                    simple_loops(corners[:first] + corners[position:], vertices))
+        seen[vertex] = position
+    return [corners] if len(corners) >= 3 else []
+
+def split_pinched_faces(corners, faces, vertices):
+    """
+    Splits the faces that visit a vertex more than once into simple loops.
+
+    :param corners: Corner ids grouped by face, faces in ascending order.
+    :param faces: Face of every corner id in corners.
+    :param vertices: Vertex of every corner id.
+    :return: (corners, face of every loop, corner count of every loop), the loops of a
+        face stay together and in face order.
+    """
+    loop_faces, loop_counts = np.unique(faces, return_counts=True)
+    order = np.lexsort((vertices[corners], faces))
+    sorted_faces, sorted_vertices = faces[order], vertices[corners][order]
+    repeated = (sorted_faces[1:] == sorted_faces[:-1]) & (sorted_vertices[1:] == sorted_vertices[:-1])
+    pinched = np.unique(sorted_faces[1:][repeated])
+    if not len(pinched):
+        return corners, loop_faces, loop_counts
+
+    simple = ~np.isin(loop_faces, pinched)
+    in_pinched = np.isin(faces, pinched)
+    loops = [(face, loop) for face, loop_corners in
+             zip(pinched, np.split(corners[in_pinched], np.cumsum(loop_counts[~simple])[:-1]))
+             for loop in simple_loops(loop_corners.tolist(), vertices)]
+    loop_faces = np.concatenate([loop_faces[simple], np.array([face for face, _ in loops], dtype=np.int64)])
+    loop_counts = np.concatenate([loop_counts[simple], np.array([len(loop) for _, loop in loops], dtype=np.int64)])
+    loop_corners = np.concatenate([corners[~in_pinched],
+                                   np.array([corner for _, loop in loops for corner in loop], dtype=np.int64)])
+
+    # Back in face order, every loop moves as a block of corners
+    order = np.argsort(loop_faces, kind='stable')
+    counts = loop_counts[order]
+    gather = np.repeat((np.cumsum(loop_counts) - loop_counts)[order] - (np.cumsum(counts) - counts), counts) + \
+        np.arange(counts.sum())
+    return loop_corners[gather], loop_faces[order], counts
+
+def duplicate_faces(counts, connects):
+    """
+    Returns a mask of the faces repeating an earlier face: the same vertices in the same
+    cyclic order, whatever corner they start at.
+
+    A face on the same vertices in the opposite winding is the back of a double sided
+    card and is not a duplicate.
+    """
+    duplicate = np.zeros(len(counts), dtype=bool)
+    if not len(counts):
+        return duplicate
+    starts = np.cumsum(counts) - counts
+    for count in np.unique(counts).tolist():
+        faces = np.flatnonzero(counts == count)
+        rows = connects[(starts[faces][:, None] + np.arange(count)).ravel()].reshape(-1, count)
+        # Every face starts at its lowest vertex id, keeping its winding
+        shift = rows.argmin(axis=1)
+        rows = rows[np.arange(len(faces))[:, None], (shift[:, None] + np.arange(count)) % count]
+        first = np.unique(rows, axis=0, return_index=True)[1]
+        duplicate[faces] = True
+        duplicate[faces[first]] = False
+    return duplicate
+
+class CleanupResult(object):
+    """The cleaned mesh, the source face of every kept face and what was removed."""
+
+    def __init__(self, mesh, face_sources, welded_vertices, removed_faces):
+        self.mesh = mesh
+        self.face_sources = face_sources
+        self.welded_vertices = welded_vertices
+        self.removed_faces = removed_faces
+
+def weld_mesh(mesh, tolerance, area_tolerance=None):
+    """
+    Welds the vertices of a MeshData closer than the tolerance and removes degenerate faces.
+
+    A face loses the corners that weld onto the corner before them; a face that still
+    visits a vertex twice is split there into simple loops. Faces and loops left with
+    fewer than 3 corners or with an area under area_tolerance (tolerance squared by
+    default) are removed, so are repeats of an earlier face in the same winding. UV ids
+    follow the kept corners, vertices no face uses any more are dropped.
+
+    :return: A CleanupResult, face_sources index the faces of the input mesh, a split
+        face appears once per loop.
+    """
+    if area_tolerance is None:
+        area_tolerance = tolerance * tolerance
+    points = np.frombuffer(mesh.points, dtype=np.float64).reshape(-1, 3)
+    counts = np.asarray(mesh.counts, dtype=np.int64)
+    connects = np.asarray(mesh.connects, dtype=np.int64)
+    labels, label_count = weld_map(points, tolerance)
+    welded = labels[connects]
+
+    # A corner collapses when it lands on the welded vertex of the corner before it
+    starts = np.cumsum(counts) - counts
+    previous = np.arange(len(connects)) - 1
+    previous[starts] = starts + counts - 1
+    corner_face = np.repeat(np.arange(len(counts)), counts)
+    corners = np.flatnonzero(welded != welded[previous])
+    corners, face_sources, new_counts = split_pinched_faces(corners, corner_face[corners], welded)
+    # Faces left with fewer than 3 corners are dropped
+    face_ok = new_counts >= 3
+
+    # Positions of the welded vertices: the lowest original id of every group
+    first_vertex = np.full(label_count, len(points), dtype=np.int64)
+    np.minimum.at(first_vertex, labels, np.arange(len(points)))
+    welded_points = points[first_vertex]
+
+    loop_of = np.repeat(np.arange(len(new_counts)), new_counts)
+    kept = face_ok[loop_of]
+    areas = np.linalg.norm(face_normals(welded_points, new_counts[face_ok], welded[corners[kept]]), axis=1) / 2.0 \
+        if face_ok.any() else np.zeros(0)
+    face_ok[np.flatnonzero(face_ok)[areas <= area_tolerance]] = False
+    kept = face_ok[loop_of]
+    face_ok[np.flatnonzero(face_ok)[duplicate_faces(new_counts[face_ok], welded[corners[kept]])]] = False
+    kept = face_ok[loop_of]
+    corners = corners[kept]
+
+    # Drop the vertices no kept face uses and renumber the rest
+    used = np.zeros(label_count, dtype=bool)
+    used[welded[corners]] = True
+    new_ids = np.cumsum(used) - 1
+    new_connects = new_ids[welded[corners]]
+
+    face_sources = face_sources[face_ok]
+    new_counts = new_counts[face_ok]
+    uv_sets = []
+    for uv_set in mesh.uv_sets:
+        uv_counts = np.asarray(uv_set.uv_counts, dtype=np.int64)
+        uv_ids = np.asarray(uv_set.uv_ids, dtype=np.int64)
+        # Faces with a full uv assignment keep the uvs of their kept corners
+        mapped = uv_counts == counts
+        uv_starts = np.cumsum(uv_counts) - uv_counts
+        corner_uv_index = np.repeat(uv_starts - starts, counts) + np.arange(len(connects))
+        new_uv_counts = np.where(mapped[face_sources], new_counts, 0)
+        uv_sets.append(UVSetData(uv_set.name, uv_set.us, uv_set.vs, new_uv_counts.tolist(),
+                                 uv_ids[corner_uv_index[corners[mapped[corner_face[corners]]]]].tolist()))
+
+    cleaned = MeshData(welded_points[used].ravel().tolist(), new_counts.tolist(), new_connects.tolist(), uv_sets)
+    return CleanupResult(cleaned, face_sources, len(points) - label_count,
+                         int(len(counts) - len(np.unique(face_sources))))
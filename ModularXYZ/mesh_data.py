@@ -0,0 +1,73 @@
+from array import array
+
+# Plain mesh snapshots shared by the ModularXYZ engines.
+# Nothing in here imports maya, so the data can be pickled into worker processes.
+
+class UVSetData(object):
+    """Flat copy of one UV set: uv values plus the per-face uv assignment."""
+
+    def __init__(self, name, us, vs, uv_counts, uv_ids):
+        self.name = name
+        self.us = array('d', us)
+        self.vs = array('d', vs)
+        self.uv_counts = array('i', uv_counts)
+        self.uv_ids = array('i', uv_ids)
+
+
+class MeshData(object):
+    """
+    Flat copy of a polygon mesh.
+
+    :param points: Flat x, y, z values, three per vertex.
+    :param counts: Vertex count of every face.
+    :param connects: Vertex ids of every face, face after face.
+    :param uv_sets: List of UVSetData, may be empty.
+    """
+
+    def __init__(self, points, counts, connects, uv_sets=None):
+        self.points = array('d', points)
+        self.counts = array('i', counts)
+        self.connects = array('i', connects)
+        self.uv_sets = list(uv_sets or [])
+
+    @property
+    def num_vertices(self):
+        return len(self.points) // 3
+
+    @property
+    def num_faces(self):
+        return len(self.counts)
+
+    def bounding_box(self):
+        """Returns min_x, min_y, min_z, max_x, max_y, max_z like exactWorldBoundingBox."""
+        pts = self.points
+        if not pts:
+            return [0.0] * 6
+        xs, ys, zs = pts[0::3], pts[1::3], pts[2::3]
+        return [min(xs), min(ys), min(zs), max(xs), max(ys), max(zs)]
+
+
+def compact_ranges(indices):
+    """Collapses integer indices into sorted, inclusive (start, end) ranges."""
+    ranges = []
+    for index in sorted(set(indices)):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return [(start, end) for start, end in ranges]
+
+
+def component_list(node, indices, component='f'):
+    """Builds compact component strings such as 'pCube1.f[0:5]' for the given indices."""
+    return range_components(node, compact_ranges(indices), component)
+
+def range_components(node, ranges, component='f'):
+    """Builds component strings for inclusive (start, end) ranges."""
+    components = []
+    for start, end in ranges:
+        if start == end:
+            components.append(f"{node}.{component}[{start}]")
+        else:
+            components.append(f"{node}.{component}[{start}:{end}]")
+    return components
@@ -0,0 +1,84 @@
+import hashlib
+import numpy as np
+import maya.api.OpenMaya as om2
+
+# Dirty tracking for operations that rewrite a mesh from its own geometry, such as
+# the box map. A fingerprint is the topology counts plus a hash of the point and
+# face buffers; the store remembers, per shape, the fingerprint and settings of the
+# last run and the hash of the UVs it wrote. A mesh whose geometry, settings and UVs
+# are all unchanged can be skipped. The store lives for the session and is dropped
+# whenever a scene is opened or created.
+
+def geometry_fingerprint(mesh):
+    """Returns (vertex count, face count, corner count, digest of points, counts and connects) of a MeshData."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(mesh.points)
+    digest.update(mesh.counts)
+    digest.update(mesh.connects)
+    return mesh.num_vertices, mesh.num_faces, len(mesh.connects), digest.hexdigest()
+
+def uv_fingerprint(uv_set):
+    """
+    Returns a digest of a UVSetData.
+
+    Values are hashed as 32 bit floats, the precision Maya stores UVs with, so UVs
+    read back from a mesh match the ones that were written.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(uv_set.name.encode())
+    digest.update(np.asarray(uv_set.us, dtype=np.float32).tobytes())
+    digest.update(np.asarray(uv_set.vs, dtype=np.float32).tobytes())
+    digest.update(np.asarray(uv_set.uv_counts, dtype=np.int32).tobytes())
+    digest.update(np.asarray(uv_set.uv_ids, dtype=np.int32).tobytes())
+    return digest.hexdigest()
+
+class FingerprintStore(object):
+    """Last geometry fingerprint, settings and result fingerprint per (operation, shape)."""
+
+    def __init__(self):
+        self.entries = {}
+        self._callback_ids = []
+
+    def is_current(self, operation, shape, fingerprint, settings, result_fingerprint):
+        return self.entries.get((operation, shape)) == (fingerprint, settings, result_fingerprint)
+
+    def record(self, operation, shape, fingerprint, settings, result_fingerprint):
+        self.entries[(operation, shape)] = (fingerprint, settings, result_fingerprint)
+
+    def forget(self, shape=None):
+        """Drops the entries of one shape, or all of them."""
+        if shape is None:
+            self.entries.clear()
+        else:
+            self.entries = {key: value for key, value in self.entries.items() if key[1] != shape}
+
+    def install_callbacks(self):
+        if self._callback_ids:
+            return
+        for message in (om2.MSceneMessage.kAfterOpen, om2.MSceneMessage.kAfterNew):
+            self._callback_ids.append(om2.MSceneMessage.addCallback(message, self._on_scene_changed))
+
+    def remove_callbacks(self):
+        if self._callback_ids:
+            om2.MMessage.removeCallbacks(self._callback_ids)
+        self._callback_ids = []
+
+    def _on_scene_changed(self, *args):
+        self.forget()
+
+
+_store = None
+
+def get_store():
+    """Returns the session fingerprint store, creating it and its callbacks on first use."""
+    global _store
+    if _store is None:
+        _store = FingerprintStore()
+        _store.install_callbacks()
+    return _store
+
+def release_store():
+    global _store
+    if _store is not None:
+        _store.remove_callbacks()
+        _store = None
@@ -0,0 +1,274 @@
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+import api_undo
+from mesh_data import MeshData, UVSetData, component_list
+
+# Bulk mesh reads and writes. Every read is one API query per array instead of
+# one cmds call per component, and every write replaces the mesh in one edit.
+# API writes are put on the undo queue through api_undo, with a copy of the mesh
+# from before and after the edit. Points read through the API are in centimeters
+# whatever the scene unit, distances typed in the UI go through ui_to_internal.
+
+def get_dag_path(node):
+    selection_list = om2.MSelectionList()
+    selection_list.add(node)
+    return selection_list.getDagPath(0)
+
+def selected_mesh_shapes(selection=None):
+    """
+    Returns the mesh shapes under the current selection, components select their whole mesh.
+
+    Instances of one shape are returned once, so every unique mesh is processed once.
+
+    :param selection: Names selected earlier, as cmds.ls(selection=True) gave them, the
+        current selection when None.
+    """
+    if selection is None:
+        objects = cmds.ls(selection=True, objectsOnly=True, long=True) or []
+    else:
+        # ls of an empty list would list the whole scene
+        objects = cmds.ls(selection, objectsOnly=True, long=True) or [] if selection else []
+    shapes = cmds.ls(objects, dag=True, type='mesh', noIntermediate=True, long=True) or []
+    return unique_shapes(list(dict.fromkeys(shapes)))
+
+def selected_world_shapes():
+    """
+    Returns the selected mesh shapes whose points can be edited in world space.
+
+    An instanced shape shares its points between several placements, so a world space
+    edit made through one of them is wrong for the others. Those are left out with a
+    warning instead of being deduplicated like in selected_mesh_shapes.
+    """
+    objects = cmds.ls(selection=True, objectsOnly=True, long=True) or []
+    shapes = cmds.ls(objects, dag=True, type='mesh', noIntermediate=True, long=True) or []
+    single, instanced = split_instanced(list(dict.fromkeys(shapes)))
+    warn_instanced(instanced)
+    return single
+
+def split_instanced(shapes):
+    """Returns (shapes with a single DAG path, instanced shapes)."""
+    single, instanced = [], []
+    for shape in shapes:
+        (instanced if get_dag_path(shape).isInstanced() else single).append(shape)
+    return single, instanced
+
+def warn_instanced(instanced):
+    if instanced:
+        names = unique_shapes(instanced)
+        cmds.warning(f"Skipped {len(names)} instanced meshes, a world space edit would be wrong for their other "
+                     f"instances: {', '.join(names[:10])}{' ...' if len(names) > 10 else ''}")
+
+def unique_shapes(shapes):
+    """Keeps the first DAG path of every mesh node, the other paths are instances of the same shape."""
+    if not shapes:
+        return []
+    paths = {}
+    for shape, uuid in zip(shapes, cmds.ls(shapes, uuid=True) or []):
+        paths.setdefault(uuid, shape)
+    return list(paths.values())
+
+def ui_to_internal(distance):
+    """Converts a distance in the scene linear unit (grid spacing, UI fields) to centimeters."""
+    return om2.MDistance.uiToInternal(distance)
+
+def internal_to_ui(distance):
+    """Converts a distance in centimeters, as read through the API, to the scene linear unit."""
+    return om2.MDistance.internalToUI(distance)
+
+def get_mesh_shape(object_name):
+    """Returns the first non-intermediate mesh shape of a transform (or the shape itself)."""
+    if cmds.objectType(object_name, isType='mesh'):
+        return object_name
+    shapes = cmds.listRelatives(object_name, shapes=True, noIntermediate=True, fullPath=True, type='mesh') or []
+    return shapes[0] if shapes else None
+
+def bake_history(shape, history=None):
+    """
+    Deletes construction history so a direct mesh edit is not overwritten by upstream nodes.
+
+    :param history: The upstream nodes when the caller already listed them, see read_history.
+    """
+    if history is None:
+        history = cmds.listHistory(shape, pruneDagObjects=True)
+    if history:
+        cmds.delete(shape, constructionHistory=True)
+
+def read_history(shape):
+    """Returns the upstream nodes of a mesh shape and whether one of them is a deformer (skin, blend shape...)."""
+    history = cmds.listHistory(shape, pruneDagObjects=True) or []
+    return history, bool(history and cmds.ls(history, type='geometryFilter'))
+
+def read_mesh(shape, world_space=True, with_uvs=True):
+    """
+    Reads points, topology and UV sets of a mesh shape into a MeshData.
+
+    :param shape: The mesh shape.
+    :param world_space: Read the points in world space instead of object space.
+    :param with_uvs: Also read every UV set.
+    """
+    mesh_fn = om2.MFnMesh(get_dag_path(shape))
+    points = _flat_points(mesh_fn, world_space)
+    counts, connects = mesh_fn.getVertices()
+
+    uv_sets = []
+    if with_uvs:
+        for uv_set in mesh_fn.getUVSetNames():
+            us, vs = mesh_fn.getUVs(uv_set)
+            uv_counts, uv_ids = mesh_fn.getAssignedUVs(uv_set)
+            uv_sets.append(UVSetData(uv_set, us, vs, uv_counts, uv_ids))
+
+    return MeshData(points, counts, connects, uv_sets)
+
+def read_uv_set(shape, uv_set=None):
+    """Reads one UV set (the current one by default) into a UVSetData, None when the mesh has no such set."""
+    mesh_fn = om2.MFnMesh(get_dag_path(shape))
+    uv_set = uv_set or mesh_fn.currentUVSetName()
+    if uv_set not in mesh_fn.getUVSetNames():
+        return None
+    us, vs = mesh_fn.getUVs(uv_set)
+    uv_counts, uv_ids = mesh_fn.getAssignedUVs(uv_set)
+    return UVSetData(uv_set, us, vs, uv_counts, uv_ids)
+
+def read_points(shape, world_space=True):
+    """Reads only the points of a mesh shape as a flat x, y, z list."""
+    return _flat_points(om2.MFnMesh(get_dag_path(shape)), world_space)
+
+def read_point_array(shape, world_space=True):
+    """Reads the points of a mesh shape as an (N, 3) float64 array in one API query."""
+    space = om2.MSpace.kWorld if world_space else om2.MSpace.kObject
+    points = np.array(om2.MFnMesh(get_dag_path(shape)).getPoints(space), dtype=np.float64)
+    return points[:, :3] if len(points) else np.zeros((0, 3))
+
+def read_topology(shape):
+    """Returns the face vertex counts and vertex ids of a mesh shape as int64 arrays."""
+    counts, connects = om2.MFnMesh(get_dag_path(shape)).getVertices()
+    return np.array(counts, dtype=np.int64), np.array(connects, dtype=np.int64)
+
+def write_point_array(shape, points, world_space=True):
+    """Sets every point of a mesh shape from an (N, 3) array in one undoable API edit, topology is unchanged."""
+    space = om2.MSpace.kWorld if world_space else om2.MSpace.kObject
+    dag_path = get_dag_path(shape)
+    mesh_fn = om2.MFnMesh(dag_path)
+    before = mesh_fn.getPoints(om2.MSpace.kObject) if api_undo.undo_enabled() else None
+    mesh_fn.setPoints(om2.MPointArray(np.asarray(points).tolist()), space)
+    if before is not None:
+        after = mesh_fn.getPoints(om2.MSpace.kObject)
+        api_undo.commit(lambda: _set_points(dag_path, before), lambda: _set_points(dag_path, after))
+
+def _set_points(dag_path, points):
+    mesh_fn = om2.MFnMesh(dag_path)
+    mesh_fn.setPoints(points, om2.MSpace.kObject)
+    mesh_fn.updateSurface()
+
+def _flat_points(mesh_fn, world_space):
+    space = om2.MSpace.kWorld if world_space else om2.MSpace.kObject
+    points = []
+    for point in mesh_fn.getPoints(space):
+        points.extend((point.x, point.y, point.z))
+    return points
+
+def _snapshot(dag_path):
+    # The whole mesh, normals, colour sets and creases included
+    data = om2.MFnMeshData().create()
+    om2.MFnMesh().copy(dag_path.node(), data)
+    return data
+
+def _restore(dag_path, snapshot):
+    mesh_fn = om2.MFnMesh(dag_path)
+    mesh_fn.copyInPlace(snapshot)
+    mesh_fn.updateSurface()
+
+def undoable_edit(shape, edit):
+    """Runs edit(mesh_fn), an API edit of a mesh shape, and puts it on the undo queue as one step."""
+    dag_path = get_dag_path(shape)
+    before = _snapshot(dag_path) if api_undo.undo_enabled() else None
+    result = edit(om2.MFnMesh(dag_path))
+    if before is not None:
+        after = _snapshot(dag_path)
+        api_undo.commit(lambda: _restore(dag_path, before), lambda: _restore(dag_path, after))
+    return result
+
+def write_mesh(shape, mesh, world_space=True):
+    """
+    Replaces the geometry of a mesh shape with a MeshData in a single undoable edit.
+
+    Points given in world space are moved back into the object space of the shape.
+    The UV sets of the MeshData are written back by name. Only points, faces and UVs
+    are written: hard edges, colour sets and creases of the old mesh are lost, with
+    a warning when the mesh had colour sets or creases.
+    """
+    dropped = dropped_mesh_data(shape)
+    if dropped:
+        cmds.warning(f"{shape}: {' and '.join(dropped)} are not kept by the mesh rewrite.")
+    undoable_edit(shape, lambda mesh_fn: _write_mesh(mesh_fn, mesh, world_space))
+
+def dropped_mesh_data(shape):
+    """Names what a write_mesh of the shape would lose besides edge smoothing: colour sets and creases."""
+    mesh_fn = om2.MFnMesh(get_dag_path(shape))
+    dropped = []
+    if mesh_fn.numColorSets:
+        dropped.append('colour sets')
+    try:
+        creased = len(mesh_fn.getCreaseEdges()[0]) or len(mesh_fn.getCreaseVertices()[0])
+    except RuntimeError:  # Raised by meshes without creases
+        creased = False
+    if creased:
+        dropped.append('creases')
+    return dropped
+
+def _write_mesh(mesh_fn, mesh, world_space):
+    dag_path = mesh_fn.dagPath()
+    pts = mesh.points
+    points = om2.MPointArray()
+    if world_space:
+        inverse = dag_path.inclusiveMatrixInverse()
+        for i in range(0, len(pts), 3):
+            points.append(om2.MPoint(pts[i], pts[i + 1], pts[i + 2]) * inverse)
+    else:
+        for i in range(0, len(pts), 3):
+            points.append(om2.MPoint(pts[i], pts[i + 1], pts[i + 2]))
+
+    mesh_fn.createInPlace(points, om2.MIntArray(mesh.counts), om2.MIntArray(mesh.connects))
+    _write_uvs(mesh_fn, mesh.uv_sets)
+    mesh_fn.updateSurface()
+
+def current_uv_set(shape):
+    """Returns the name of the current UV set, 'map1' for a mesh without UV sets."""
+    return om2.MFnMesh(get_dag_path(shape)).currentUVSetName() or 'map1'
+
+def write_uvs(shape, uv_sets):
+    """Writes UVSetData values and assignments back to a mesh shape, one bulk set per UV set, as one undo step."""
+    undoable_edit(shape, lambda mesh_fn: _write_uvs(mesh_fn, uv_sets))
+
+def _write_uvs(mesh_fn, uv_sets):
+    existing = set(mesh_fn.getUVSetNames())
+    for uv_set in uv_sets:
+        if uv_set.name not in existing:
+            mesh_fn.createUVSet(uv_set.name)
+        mesh_fn.clearUVs(uv_set.name)
+        mesh_fn.setUVs(om2.MFloatArray(uv_set.us), om2.MFloatArray(uv_set.vs), uv_set.name)
+        mesh_fn.assignUVs(om2.MIntArray(uv_set.uv_counts), om2.MIntArray(uv_set.uv_ids), uv_set.name)
+
+def read_face_shading(shape):
+    """
+    Returns the shading groups of a mesh shape and the index of the group used by each face.
+
+    A face index of -1 means the face has no shading group.
+    """
+    dag_path = get_dag_path(shape)
+    shaders, face_indices = om2.MFnMesh(dag_path).getConnectedShaders(dag_path.instanceNumber())
+    shading_groups = [om2.MFnDependencyNode(shader).name() for shader in shaders]
+    return shading_groups, list(face_indices)
+
+def write_face_shading(shape, shading_groups, face_indices):
+    """Re-assigns per-face shading groups with one membership edit per shading group."""
+    if not shading_groups or (len(shading_groups) == 1 and min(face_indices, default=0) == 0):
+        # One shading group on every face is an object level assignment and survives mesh edits
+        return
+    faces_by_group = {}
+    for face, group_index in enumerate(face_indices):
+        if group_index >= 0:
+            faces_by_group.setdefault(group_index, []).append(face)
+    for group_index, faces in faces_by_group.items():
+        cmds.sets(component_list(shape, faces), edit=True, forceElement=shading_groups[group_index])
@@ -0,0 +1,231 @@
+import os
+import io
+import json
+import time
+import types
+import logging
+import cProfile
+import pstats
+import functools
+import importlib
+from collections import deque
+from logging.handlers import RotatingFileHandler
+import maya.cmds as cmds
+
+# Timing instrumentation for the toolkit actions. While profiling is on, every function
+# of the action modules is wrapped and every maya.cmds command is counted; turning it
+# off puts the original functions back, so nothing is paid when it is off. Panel
+# handlers are wrapped once when the panel class is defined and only check a flag.
+# Every call records its wall time, the commands it issued and the selection size it
+# started with; the outermost call can also run under cProfile. Panel tasks run on the
+# idle queue after their handler returned, they are recorded from start to finish as
+# 'task.<name>' through the task runner listeners. Records go to the in-panel stats
+# view and to a rotating JSON Lines log.
+
+INSTRUMENTED_MODULES = ['grid_slice', 'UVboxmap', 'customboxmapuv', 'material_functions', 'grid_functions',
+                        'grid_snap', 'uv_packer', 'texel_density', 'duplicate_index', 'spatial_index',
+                        'material_samples', 'material_report']
+MAX_RECORDS = 500
+LOG_MAX_BYTES = 1 << 20
+LOG_BACKUPS = 5
+PROFILE_LINES = 25
+
+def default_log_path():
+    """The profile log lives in the Maya user folder unless MODULARXYZ_PROFILE_LOG points elsewhere."""
+    path = os.environ.get('MODULARXYZ_PROFILE_LOG')
+    if path:
+        return path
+    return os.path.join(cmds.internalVar(userAppDir=True), 'ModularXYZ', 'logs', 'profile.jsonl')
+
+class Profiler(object):
+
+    def __init__(self):
+        self.enabled = False
+        self.capture_profile = False
+        self.records = deque(maxlen=MAX_RECORDS)
+        self.totals = {}  # name -> {'calls', 'seconds', 'max', 'commands'}
+        self.listeners = []
+        self.command_count = 0
+        self.log_path = None
+        self._depth = 0
+        self._tasks = {}  # task id -> (command count, selection size) when it started
+        self._original_functions = []  # (owner, attribute, original)
+        self._logger = None
+
+    # --- switching ---------------------------------------------------------------
+
+    def enable(self, capture_profile=False, log_path=None):
+        self.capture_profile = capture_profile
+        if self.enabled:
+            return
+        self._open_log(log_path or default_log_path())
+        self._patch_commands()
+        for module_name in INSTRUMENTED_MODULES:
+            self._patch_module(importlib.import_module(module_name))
+        self.enabled = True
+
+    def disable(self):
+        for owner, attribute, original in reversed(self._original_functions):
+            setattr(owner, attribute, original)
+        self._original_functions = []
+        self.enabled = False
+        if self._logger:
+            for handler in list(self._logger.handlers):
+                handler.close()
+                self._logger.removeHandler(handler)
+            self._logger = None
+
+    def clear(self):
+        self.records.clear()
+        self.totals = {}
+
+    # --- recording ---------------------------------------------------------------
+
+    def call(self, name, function, args, kwargs):
+        """Runs function and records it, the outermost call is profiled when capture_profile is on."""
+        selection = len(self._ls(selection=True) or [])
+        commands = self.command_count
+        profile = cProfile.Profile() if self.capture_profile and self._depth == 0 else None
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            if profile:
+                return profile.runcall(function, *args, **kwargs)
+            return function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            self._depth -= 1
+            self._record(name, seconds, self.command_count - commands, selection, profile)
+
+    def task_changed(self, task):
+        """Task runner listener: records a task as one call from its start to its end."""
+        if task.state == 'running':
+            if self.enabled and task.id not in self._tasks:
+                self._tasks[task.id] = (self.command_count, len(self._ls(selection=True) or []))
+        elif task.id in self._tasks:
+            commands, selection = self._tasks.pop(task.id)
+            if self.enabled:
+                self._record(f"task.{task.name}", task.elapsed, self.command_count - commands, selection, None)
+
+    def _record(self, name, seconds, commands, selection, profile):
+        record = {'name': name, 'seconds': round(seconds, 6), 'commands': commands, 'selection': selection,
+                  'depth': self._depth, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        if profile:
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            record['profile'] = text.getvalue()
+        self.records.append(record)
+        totals = self.totals.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max': 0.0, 'commands': 0})
+        totals['calls'] += 1
+        totals['seconds'] += seconds
+        totals['max'] = max(totals['max'], seconds)
+        totals['commands'] += commands
+        if self._logger:
+            self._logger.info(json.dumps(record))
+        if self._depth == 0:
+            for listener in list(self.listeners):
+                listener(record)
+
+    # --- reports -----------------------------------------------------------------
+
+    def stats_rows(self, sort='seconds'):
+        """Returns (name, calls, total seconds, max seconds, commands) rows, largest sort column first."""
+        rows = [(name, totals['calls'], totals['seconds'], totals['max'], totals['commands'])
+                for name, totals in self.totals.items()]
+        column = {'name': 0, 'calls': 1, 'seconds': 2, 'max': 3, 'commands': 4}[sort]
+        return sorted(rows, key=lambda row: row[column], reverse=column != 0)
+
+    def report_text(self, sort='seconds', limit=30):
+        lines = [f"{'action':<44}{'calls':>6}{'total s':>10}{'max s':>9}{'cmds':>8}"]
+        for name, calls, seconds, longest, commands in self.stats_rows(sort)[:limit]:
+            lines.append(f"{name[-44:]:<44}{calls:>6}{seconds:>10.3f}{longest:>9.3f}{commands:>8}")
+        last = next((record for record in reversed(self.records) if 'profile' in record), None)
+        if last:
+            lines += ['', f"cProfile of {last['name']}:", last['profile']]
+        return '\n'.join(lines)
+
+    # --- patching ----------------------------------------------------------------
+
+    def _patch_commands(self):
+        self._ls = cmds.ls
+        for attribute in dir(cmds):
+            original = getattr(cmds, attribute)
+            if attribute.startswith('_') or not callable(original) or isinstance(original, type):
+                continue
+            setattr(cmds, attribute, self._counted(original))
+            self._original_functions.append((cmds, attribute, original))
+
+    def _counted(self, command):
+        @functools.wraps(command)
+        def counted(*args, **kwargs):
+            self.command_count += 1
+            return command(*args, **kwargs)
+        return counted
+
+    def _patch_module(self, module):
+        for attribute, original in list(vars(module).items()):
+            if not isinstance(original, types.FunctionType) or original.__module__ != module.__name__:
+                continue
+            setattr(module, attribute, self._timed(f"{module.__name__}.{attribute}", original))
+            self._original_functions.append((module, attribute, original))
+
+    def _timed(self, name, function):
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            return self.call(name, function, args, kwargs)
+        return timed
+
+    def _open_log(self, path):
+        self.log_path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._logger = logging.getLogger('ModularXYZ.profile')
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._logger.addHandler(handler)
+
+    def _ls(self, *args, **kwargs):
+        return cmds.ls(*args, **kwargs)
+
+
+_profiler = Profiler()
+
+def get_profiler():
+    return _profiler
+
+def instrument_handler(class_name, method):
+    """
+    Wraps a panel handler so it is recorded while profiling is on.
+
+    Qt passes signal arguments the handler may not take (clicked sends checked), the
+    wrapper only forwards as many positional arguments as the handler accepts.
+    """
+    name = f"{class_name}.{method.__name__}"
+    argument_count = method.__code__.co_argcount
+
+    @functools.wraps(method)
+    def handler(*args):
+        args = args[:argument_count]
+        if not _profiler.enabled:
+            return method(*args)
+        return _profiler.call(name, method, args, {})
+    return handler
+
+def instrument_handlers(cls, is_handler):
+    """Wraps every method of cls whose name passes is_handler."""
+    for attribute, method in list(vars(cls).items()):
+        if isinstance(method, types.FunctionType) and is_handler(attribute):
+            setattr(cls, attribute, instrument_handler(cls.__name__, method))
+    return cls
+
+def set_enabled(enabled, capture_profile=False):
+    if enabled:
+        _profiler.enable(capture_profile)
+        print(f"Profiling on, log: {_profiler.log_path}")
+    else:
+        _profiler.disable()
+        print("Profiling off.")
+
+def print_stats(sort='seconds'):
+    print(_profiler.report_text(sort))
@@ -0,0 +1,184 @@
+import math
+import time
+from array import array
+from mesh_data import MeshData, UVSetData
+import mesh_cleanup
+
+# Voxel Slice engine. All lattice planes of the three axes are applied to every face
+# in one pass over the flat mesh arrays, so the cost follows the number of faces and
+# the pieces they are cut into instead of faces x planes.
+# No maya import here, the engine also runs inside worker processes.
+
+class SliceResult(object):
+    """
+    The sliced mesh, the source face of every new face and the number of lattice planes used.
+
+    timings holds the seconds spent in every stage, welded_vertices and removed_faces
+    what the weld stage cleaned up.
+    """
+
+    def __init__(self, mesh, face_sources, plane_count, timings=None, welded_vertices=0, removed_faces=0):
+        self.mesh = mesh
+        self.face_sources = face_sources
+        self.plane_count = plane_count
+        self.timings = timings or {}
+        self.welded_vertices = welded_vertices
+        self.removed_faces = removed_faces
+
+
+def lattice_indices(lo, hi, grid_size, tolerance=0.0):
+    """Returns the indices k of the lattice planes k * grid_size lying strictly between lo and hi."""
+    first = int(math.floor((lo + tolerance) / grid_size)) + 1
+    last = int(math.ceil((hi - tolerance) / grid_size)) - 1
+    return range(first, last + 1)
+
+
+class _Slicer(object):
+
+    def __init__(self, mesh, grid_size, tolerance):
+        self.grid_size = grid_size
+        self.tolerance = tolerance
+        self.points = array('d', mesh.points)
+        self.us = [array('d', uv_set.us) for uv_set in mesh.uv_sets]
+        self.vs = [array('d', uv_set.vs) for uv_set in mesh.uv_sets]
+        # Edge splits are cached by (low id, high id, axis, plane) so neighbouring
+        # faces share the new vertex and uv instead of tearing the mesh apart.
+        self.vertex_cache = {}
+        self.uv_caches = [{} for _ in mesh.uv_sets]
+
+    def intersect(self, a, b, axis, k, plane):
+        if a[0] > b[0]:
+            a, b = b, a
+        pts = self.points
+        va, vb = 3 * a[0], 3 * b[0]
+        t = (plane - pts[va + axis]) / (pts[vb + axis] - pts[va + axis])
+        key = (a[0], b[0], axis, k)
+        vertex = self.vertex_cache.get(key)
+        if vertex is None:
+            vertex = len(pts) // 3
+            pts.extend([pts[va + i] + (pts[vb + i] - pts[va + i]) * t for i in range(3)])
+            pts[3 * vertex + axis] = plane
+            self.vertex_cache[key] = vertex
+
+        corner = [vertex]
+        for s, cache in enumerate(self.uv_caches):
+            ua, ub = a[s + 1], b[s + 1]
+            if ua is None or ub is None:
+                corner.append(None)
+                continue
+            uv_key = (ua, ub, axis, k)
+            uv = cache.get(uv_key)
+            if uv is None:
+                us, vs = self.us[s], self.vs[s]
+                uv = len(us)
+                us.append(us[ua] + (us[ub] - us[ua]) * t)
+                vs.append(vs[ua] + (vs[ub] - vs[ua]) * t)
+                cache[uv_key] = uv
+            corner.append(uv)
+        return tuple(corner)
+
+    def split(self, polygon, axis, k):
+        """Splits a polygon by one lattice plane, returns (below, above) or None when it is not crossed."""
+        plane = k * self.grid_size
+        tol = self.tolerance
+        pts = self.points
+        dist = [pts[3 * corner[0] + axis] - plane for corner in polygon]
+        if min(dist) >= -tol or max(dist) <= tol:
+            return None
+
+        below, above = [], []
+        n = len(polygon)
+        for i in range(n):
+            a, da = polygon[i], dist[i]
+            db = dist[(i + 1) % n]
+            if da <= tol:
+                below.append(a)
+            if da >= -tol:
+                above.append(a)
+            if (da < -tol and db > tol) or (da > tol and db < -tol):
+                corner = self.intersect(a, polygon[(i + 1) % n], axis, k, plane)
+                below.append(corner)
+                above.append(corner)
+        return below, above
+
+    def slice_polygon(self, polygon):
+        pts = self.points
+        pieces = [polygon]
+        for axis in range(3):
+            sliced = []
+            for piece in pieces:
+                coords = [pts[3 * corner[0] + axis] for corner in piece]
+                for k in lattice_indices(min(coords), max(coords), self.grid_size, self.tolerance):
+                    halves = self.split(piece, axis, k)
+                    if halves is None:
+                        continue
+                    sliced.append(halves[0])
+                    piece = halves[1]
+                sliced.append(piece)
+            pieces = sliced
+        return [piece for piece in pieces if len(piece) >= 3]
+
+
+def slice_mesh(mesh, grid_size=1.0, tolerance=None, weld_tolerance=None):
+    """
+    Slices a MeshData by the world grid lattice of the given size on all three axes.
+
+    :param mesh: MeshData with world space points.
+    :param grid_size: Distance between two lattice planes.
+    :param tolerance: Distance under which a vertex counts as lying on a plane.
+    :param weld_tolerance: Weld the sliced mesh's vertices closer than this and drop
+        the faces left without area, None skips the weld stage.
+    :return: A SliceResult.
+    """
+    if grid_size <= 0:
+        raise ValueError(f"Grid size must be positive, got {grid_size}.")
+    if tolerance is None:
+        tolerance = grid_size * 1e-6
+    start = time.perf_counter()
+
+    slicer = _Slicer(mesh, grid_size, tolerance)
+    uv_sets = mesh.uv_sets
+    uv_offsets = [0] * len(uv_sets)
+    counts, connects, face_sources = array('i'), array('i'), array('i')
+    uv_counts = [array('i') for _ in uv_sets]
+    uv_ids = [array('i') for _ in uv_sets]
+
+    offset = 0
+    for face, count in enumerate(mesh.counts):
+        # A corner is (vertex id, uv id of every uv set or None)
+        columns = [mesh.connects[offset:offset + count]]
+        for s, uv_set in enumerate(uv_sets):
+            uv_count = uv_set.uv_counts[face]
+            if uv_count == count:
+                columns.append(uv_set.uv_ids[uv_offsets[s]:uv_offsets[s] + count])
+            else:
+                columns.append([None] * count)
+            uv_offsets[s] += uv_count
+        offset += count
+
+        for piece in slicer.slice_polygon(list(zip(*columns))):
+            counts.append(len(piece))
+            connects.extend(corner[0] for corner in piece)
+            face_sources.append(face)
+            for s in range(len(uv_sets)):
+                if any(corner[s + 1] is None for corner in piece):
+                    uv_counts[s].append(0)
+                else:
+                    uv_counts[s].append(len(piece))
+                    uv_ids[s].extend(corner[s + 1] for corner in piece)
+
+    new_uv_sets = [UVSetData(uv_set.name, slicer.us[s], slicer.vs[s], uv_counts[s], uv_ids[s])
+                   for s, uv_set in enumerate(uv_sets)]
+    bbox = mesh.bounding_box()
+    plane_count = sum(len(lattice_indices(bbox[axis], bbox[axis + 3], grid_size, tolerance)) for axis in range(3))
+    result = SliceResult(MeshData(slicer.points, counts, connects, new_uv_sets), face_sources, plane_count)
+    result.timings['slice'] = time.perf_counter() - start
+    if weld_tolerance is not None:
+        start = time.perf_counter()
+        cleanup = mesh_cleanup.weld_mesh(result.mesh, weld_tolerance)
+        result.mesh = cleanup.mesh
+        result.face_sources = array('i', [face_sources[face] for face in cleanup.face_sources.tolist()])
+        result.welded_vertices = cleanup.welded_vertices
+        result.removed_faces = cleanup.removed_faces
+        result.timings['weld'] = time.perf_counter() - start
+    return result
@@ -0,0 +1,371 @@
+import itertools
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om2
+import mesh_io
+import uv_overlap
+
+# Spatial index of the world bounding boxes of the mesh transforms in the scene, for
+# laying out modular kits on the grid. Boxes live in a uniform grid hash whose cell is
+# about the size of a typical piece, so box, point and neighbor queries only look at
+# the few pieces in the cells they touch. Pieces spanning too many cells are kept in
+# a separate list that every query checks.
+# Boxes are in centimeters, the unit of the API, whatever the scene unit.
+# The index is built once per scene and kept current by Maya callbacks:
+#   - world matrix changes of a piece and edits of its mesh mark it dirty, dirty
+#     pieces are read again on the next query, the others are never looked at,
+#   - mesh nodes added or removed trigger a rescan of the mesh list on the next query,
+#   - renames, scene open, new and import mark it for a full rebuild.
+
+MAX_PIECE_CELLS = 64  # Pieces covering more hash cells go to the large list
+DEFAULT_TOLERANCE = 1e-4  # Pieces touching by less than this do not overlap
+
+def world_bounding_box(shape):
+    """Returns the world space bounding box of a mesh shape path as (min x, min y, min z, max x, max y, max z)."""
+    return path_bounding_box(mesh_io.get_dag_path(shape))
+
+def path_bounding_box(dag_path):
+    box = om2.MFnDagNode(dag_path).boundingBox.transformUsing(dag_path.inclusiveMatrix())
+    return (box.min.x, box.min.y, box.min.z, box.max.x, box.max.y, box.max.z)
+
+class SpatialIndex(object):
+    """
+    Grid hash of piece bounding boxes, a piece is a transform with a mesh shape.
+
+    :param cell_size: Size of a hash cell, by default the median piece size at build time.
+    """
+
+    def __init__(self, cell_size=None):
+        self.valid = False
+        self.fixed_cell_size = cell_size
+        self.cell_size = cell_size or 1.0
+        self.boxes = {}        # transform -> world box
+        self.shapes = {}       # transform -> mesh shape path
+        self.paths = {}        # transform -> MDagPath of the shape
+        self.cells = {}        # hash cell -> set of transforms
+        self.piece_cells = {}  # transform -> hash cells it is in
+        self.large = set()
+        self.counters = {'rebuilds': 0, 'refreshed': 0, 'invalidations': 0}
+        self._dirty = set()
+        self._rescan = False
+        self._arrays = None
+        self._callback_ids = []
+        self._piece_callbacks = {}
+
+    # --- queries -------------------------------------------------------------
+
+    def pieces(self):
+        self._ensure_valid()
+        return list(self.boxes)
+
+    def bounding_box(self, piece):
+        self._ensure_valid()
+        return self.boxes.get(self._long_name(piece))
+
+    def query_box(self, low, high, tolerance=0.0):
+        """Returns the pieces whose box intersects the box low - high by more than the tolerance."""
+        self._ensure_valid()
+        found = []
+        for piece in self._candidates(low, high):
+            box = self.boxes[piece]
+            if all(box[axis] < high[axis] - tolerance and low[axis] < box[axis + 3] - tolerance for axis in range(3)):
+                found.append(piece)
+        return found
+
+    def query_point(self, point):
+        """Returns the pieces whose box contains the point."""
+        return self.query_box(point, point, tolerance=-1e-9)
+
+    def neighbors(self, piece, distance=0.0):
+        """Returns the pieces whose box is within distance of the box of piece, touching ones included."""
+        self._ensure_valid()
+        piece = self._long_name(piece)
+        box = self.boxes[piece]
+        low = [value - distance for value in box[:3]]
+        high = [value + distance for value in box[3:]]
+        return [other for other in self.query_box(low, high, tolerance=-1e-9) if other != piece]
+
+    def overlaps(self, tolerance=DEFAULT_TOLERANCE):
+        """Returns every pair of pieces whose boxes overlap by more than the tolerance on all axes."""
+        names, bounds = self._as_arrays()
+        if len(names) < 2:
+            return []
+        return [(names[a], names[b]) for a, b in uv_overlap.sweep_and_prune(bounds, tolerance).tolist()]
+
+    def occupied_cells(self, spacing, axes=(0, 1, 2), tolerance=DEFAULT_TOLERANCE):
+        """
+        Returns the grid cells covered by at least one piece.
+
+        :param spacing: Grid cell size in centimeters, like the boxes.
+        :param axes: Axes of the cells, (0, 2) for a floor plan on the XZ plane.
+        :param tolerance: A piece only occupies cells it enters by more than this.
+        :return: (M, len(axes)) int array of cell coordinates, sorted.
+        """
+        _, bounds = self._as_arrays()
+        axes = list(axes)
+        if not len(bounds):
+            return np.zeros((0, len(axes)), dtype=np.int64)
+        low = np.floor((bounds[:, axes] + tolerance) / spacing).astype(np.int64)
+        high = np.ceil((bounds[:, [axis + 3 for axis in axes]] - tolerance) / spacing).astype(np.int64)
+        spans = np.maximum(high - low, 1)
+        counts = np.prod(spans, axis=1)
+        piece = np.repeat(np.arange(len(bounds)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = np.empty((len(piece), len(axes)), dtype=np.int64)
+        for column in range(len(axes) - 1, -1, -1):
+            cells[:, column] = low[piece, column] + local % spans[piece, column]
+            local //= spans[piece, column]
+        return np.unique(cells, axis=0)
+
+    def gaps(self, spacing, axes=(0, 2), low=None, high=None, tolerance=DEFAULT_TOLERANCE):
+        """
+        Returns the grid cells inside a region that no piece covers.
+
+        :param low: Minimum cell coordinates of the region, the occupied extent by default.
+        :param high: Maximum cell coordinates of the region (inclusive).
+        :return: (M, len(axes)) int array of free cell coordinates, sorted.
+        """
+        occupied = self.occupied_cells(spacing, axes, tolerance)
+        if not len(occupied) and (low is None or high is None):
+            return occupied
+        low = np.asarray(occupied.min(axis=0) if low is None else low, dtype=np.int64)
+        high = np.asarray(occupied.max(axis=0) if high is None else high, dtype=np.int64)
+        spans = high - low + 1
+        if np.any(spans <= 0):
+            return np.zeros((0, len(spans)), dtype=np.int64)
+        # Cells of the region as linear indices, an occupied cell clears its index
+        free = np.ones(int(np.prod(spans)), dtype=bool)
+        inside = np.all((occupied >= low) & (occupied <= high), axis=1)
+        free[np.ravel_multi_index(tuple((occupied[inside] - low).T), spans)] = False
+        return np.stack(np.unravel_index(np.flatnonzero(free), spans), axis=1) + low
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats['pieces'] = len(self.boxes)
+        stats['cells'] = len(self.cells)
+        stats['large'] = len(self.large)
+        stats['cell_size'] = self.cell_size
+        return stats
+
+    # --- building ------------------------------------------------------------
+
+    def _ensure_valid(self):
+        if not self.valid:
+            self.rebuild()
+            return
+        if self._rescan:
+            self._scan()
+        if self._dirty:
+            self._refresh()
+
+    def rebuild(self):
+        self.counters['rebuilds'] += 1
+        self._remove_piece_callbacks()
+        self._dirty = set()
+        self.boxes, self.shapes, self.paths, self.cells, self.piece_cells = {}, {}, {}, {}, {}
+        self.large = set()
+        pieces = self._mesh_pieces()
+        paths = {transform: mesh_io.get_dag_path(shape) for transform, shape in pieces.items()}
+        boxes = {transform: path_bounding_box(dag_path) for transform, dag_path in paths.items()}
+        if self.fixed_cell_size is None and boxes:
+            extents = np.array(list(boxes.values()))
+            self.cell_size = max(float(np.median((extents[:, 3:] - extents[:, :3]).max(axis=1))), 1e-3)
+        for transform, shape in pieces.items():
+            self._insert(transform, shape, paths[transform], boxes[transform])
+        self._rescan = False
+        self.valid = True
+
+    def invalidate(self, *args):
+        if self.valid:
+            self.counters['invalidations'] += 1
+        self.valid = False
+
+    def _mesh_pieces(self):
+        """Returns {transform: shape path} for every non-intermediate mesh shape path in the scene."""
+        shapes = cmds.ls(type='mesh', noIntermediate=True, long=True) or []
+        pieces = {}
+        for shape in shapes:
+            for transform in cmds.listRelatives(shape, allParents=True, fullPath=True) or []:
+                pieces.setdefault(transform, f"{transform}|{shape.rsplit('|', 1)[-1]}")
+        return pieces
+
+    def _scan(self):
+        """Adds the pieces created and drops the pieces deleted since the last query."""
+        self._rescan = False
+        pieces = self._mesh_pieces()
+        for transform in [transform for transform in self.boxes if transform not in pieces]:
+            self._remove(transform)
+        for transform, shape in pieces.items():
+            if transform not in self.boxes:
+                dag_path = mesh_io.get_dag_path(shape)
+                self._insert(transform, shape, dag_path, path_bounding_box(dag_path))
+
+    def _refresh(self):
+        """Reads the boxes of the dirty pieces again and rehashes the ones that changed."""
+        dirty, self._dirty = self._dirty, set()
+        for transform in dirty:
+            if transform not in self.paths:
+                continue  # Removed by the rescan
+            box = path_bounding_box(self.paths[transform])
+            if box != self.boxes[transform]:
+                self._unhash(transform)
+                self._hash(transform, box)
+                self.counters['refreshed'] += 1
+
+    def _insert(self, transform, shape, dag_path, box):
+        self.shapes[transform] = shape
+        self.paths[transform] = dag_path
+        self._hash(transform, box)
+        self._watch(transform, dag_path)
+
+    def _remove(self, transform):
+        self._unhash(transform)
+        self.shapes.pop(transform, None)
+        self.paths.pop(transform, None)
+        self._dirty.discard(transform)
+        callback_ids = self._piece_callbacks.pop(transform, None)
+        if callback_ids:
+            om2.MMessage.removeCallbacks(callback_ids)
+
+    def _hash(self, transform, box):
+        self.boxes[transform] = box
+        cells = self._cell_range(box[:3], box[3:])
+        if cells is None:
+            self.large.add(transform)
+            self.piece_cells[transform] = []
+        else:
+            self.piece_cells[transform] = cells
+            for cell in cells:
+                self.cells.setdefault(cell, set()).add(transform)
+        self._arrays = None
+
+    def _unhash(self, transform):
+        for cell in self.piece_cells.pop(transform, []):
+            members = self.cells[cell]
+            members.discard(transform)
+            if not members:
+                del self.cells[cell]
+        self.large.discard(transform)
+        self.boxes.pop(transform, None)
+        self._arrays = None
+
+    def _cell_range(self, low, high):
+        """Returns the hash cells a box covers, None when there are more than MAX_PIECE_CELLS."""
+        first = [int(np.floor(value / self.cell_size)) for value in low]
+        last = [int(np.floor(value / self.cell_size)) for value in high]
+        if np.prod([b - a + 1 for a, b in zip(first, last)]) > MAX_PIECE_CELLS:
+            return None
+        return list(itertools.product(*[range(a, b + 1) for a, b in zip(first, last)]))
+
+    def _candidates(self, low, high):
+        cells = self._cell_range(low, high)
+        if cells is None:
+            # A query larger than the hash is cheaper as a scan of every box
+            return list(self.boxes)
+        found = set(self.large)
+        for cell in cells:
+            found.update(self.cells.get(cell, ()))
+        return found
+
+    def _long_name(self, piece):
+        if piece in self.boxes:
+            return piece
+        return (cmds.ls(piece, long=True) or [piece])[0]
+
+    def _as_arrays(self):
+        """Returns the piece names and an (N, 6) array of their boxes, cached until a piece changes."""
+        self._ensure_valid()
+        if self._arrays is None:
+            names = list(self.boxes)
+            bounds = np.array([self.boxes[name] for name in names], dtype=np.float64).reshape(-1, 6)
+            self._arrays = (names, bounds)
+        return self._arrays
+
+    # --- callbacks -----------------------------------------------------------
+
+    def install_callbacks(self):
+        if self._callback_ids:
+            return
+        self._callback_ids = [
+            om2.MDGMessage.addNodeAddedCallback(self._on_mesh_added_or_removed, 'mesh'),
+            om2.MDGMessage.addNodeRemovedCallback(self._on_mesh_added_or_removed, 'mesh'),
+            om2.MNodeMessage.addNameChangedCallback(om2.MObject.kNullObj, self._on_renamed),
+        ]
+        for message in (om2.MSceneMessage.kAfterOpen, om2.MSceneMessage.kAfterNew,
+                        om2.MSceneMessage.kAfterImport, om2.MSceneMessage.kAfterCreateReference,
+                        om2.MSceneMessage.kAfterLoadReference, om2.MSceneMessage.kAfterUnloadReference):
+            self._callback_ids.append(om2.MSceneMessage.addCallback(message, self.invalidate))
+
+    def remove_callbacks(self):
+        if self._callback_ids:
+            om2.MMessage.removeCallbacks(self._callback_ids)
+        self._callback_ids = []
+        self._remove_piece_callbacks()
+
+    def _watch(self, transform, dag_path):
+        """Marks the piece dirty when its world matrix or its mesh changes."""
+        if not self._callback_ids or transform in self._piece_callbacks:
+            return
+        mark_dirty = lambda *args: self._dirty.add(transform)
+        self._piece_callbacks[transform] = [
+            om2.MDagMessage.addWorldMatrixModifiedCallback(dag_path, mark_dirty),
+            om2.MNodeMessage.addNodeDirtyCallback(dag_path.node(), mark_dirty),
+        ]
+
+    def _remove_piece_callbacks(self):
+        callback_ids = [callback_id for ids in self._piece_callbacks.values() for callback_id in ids]
+        if callback_ids:
+            om2.MMessage.removeCallbacks(callback_ids)
+        self._piece_callbacks = {}
+
+    def _on_mesh_added_or_removed(self, node, client_data):
+        if self.valid and node.hasFn(om2.MFn.kMesh):
+            self._rescan = True
+
+    def _on_renamed(self, node, previous_name, client_data):
+        # Pieces are keyed by long DAG names, renaming any DAG node can change them
+        if self.valid and previous_name and node.hasFn(om2.MFn.kDagNode):
+            self.invalidate()
+
+
+_index = None
+
+def get_index():
+    """Returns the scene spatial index, creating it and its callbacks on first use."""
+    global _index
+    if _index is None:
+        _index = SpatialIndex()
+        _index.install_callbacks()
+    return _index
+
+def release_index():
+    """Removes the callbacks and drops the index."""
+    global _index
+    if _index is not None:
+        _index.remove_callbacks()
+        _index = None
+
+def print_stats():
+    stats = get_index().stats()
+    print(', '.join(f"{key}: {value}" for key, value in stats.items()))
+    return stats
+
+def report_overlaps(select=True):
+    """Prints the pieces whose boxes overlap and selects them."""
+    pairs = get_index().overlaps()
+    for a, b in pairs:
+        print(f"{a} overlaps {b}")
+    pieces = list(dict.fromkeys(piece for pair in pairs for piece in pair))
+    print(f"{len(pairs)} overlapping pairs between {len(pieces)} pieces.")
+    if select and pieces:
+        cmds.select(pieces, replace=True)
+    return pairs
+
+def report_gaps(axes=(0, 2)):
+    """Prints the free grid cells inside the occupied extent of the floor plan at the current grid spacing."""
+    spacing = cmds.grid(query=True, spacing=True)  # Scene units
+    free = get_index().gaps(mesh_io.ui_to_internal(spacing), axes)
+    for cell in free[:20].tolist():
+        print(f"  free cell {cell} at {[value * spacing for value in cell]}")
+    print(f"{len(free)} free cells of {spacing} in the kit layout.")
+    return free
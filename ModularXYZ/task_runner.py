@@ -0,0 +1,325 @@
+import os
+import time
+import itertools
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+import maya.cmds as cmds
+import maya.utils
+import api_undo
+
+# Runs long toolkit operations in steps on Maya's idle queue so the UI keeps drawing.
+# An operation is written as a generator:
+#   - `yield done, total` marks a point where the runner may hand control back to
+#     Maya and updates the progress,
+#   - `result = yield Compute(function, *args)` runs pure computation (plane math,
+#     UV math, file hashing) on a worker thread and resumes with its result,
+#   - the return value of the generator is the result of the task.
+# Every tick of a task is an undo chunk of its own, opened and closed inside the tick,
+# so nothing done in Maya between two ticks lands in a chunk of the task. Cancelling a
+# task or an error undoes its chunks, newest first, while they are still on top of the
+# undo queue; API edits are undoable too, see api_undo. With undo off there is nothing
+# to roll back and the runner says so. A task that finishes with several chunks gets
+# one more chunk on top holding only a marker: undoing it, with Ctrl+Z or
+# TaskRunner.undo, takes the chunks of the task back too, so the whole task is one
+# undo step. Redo goes back through the chunks one at a time.
+# run_blocking drives the same generators to the end in one call, for scripts and
+# batch runs.
+
+TICK_SECONDS = 0.05  # Work done per idle callback before Maya gets control back
+_task_ids = itertools.count(1)
+
+class Compute(object):
+    """A pure computation a step generator hands to a worker thread."""
+
+    def __init__(self, function, *args, **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        return self.function(*self.args, **self.kwargs)
+
+def run_blocking(steps, undo_name=None):
+    """Runs a step generator to the end in this call, returns its result."""
+    if undo_name:
+        cmds.undoInfo(openChunk=True, chunkName=undo_name)
+    try:
+        value = None
+        while True:
+            request = steps.send(value)
+            value = request.run() if isinstance(request, Compute) else None
+    except StopIteration as stop:
+        return stop.value
+    finally:
+        if undo_name:
+            cmds.undoInfo(closeChunk=True)
+
+class Task(object):
+    """One queued operation and its progress."""
+
+    def __init__(self, name, steps, undo=True):
+        self.id = next(_task_ids)
+        self.name = name
+        self.steps = steps
+        self.undo = undo
+        self.state = 'pending'  # pending, running, done, cancelled, failed
+        self.done = 0
+        self.total = 0
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.future = None
+        self.chunk_name = f"ModularXYZ {name} #{self.id}"
+        self.undo_chunks = []  # Names of the chunks of this task on the undo queue, oldest first
+        self.undo_marker = None  # Name of the chunk that undoes all of them, see TaskRunner._add_undo_marker
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 0.0
+
+    def eta(self):
+        """Seconds left, estimated from the time per step so far, None before the first step."""
+        if not self.done or not self.total:
+            return None
+        return self.elapsed / self.done * (self.total - self.done)
+
+    def status_text(self):
+        text = f"{self.name}: {self.done}/{self.total}" if self.total else f"{self.name}: starting"
+        eta = self.eta()
+        if self.state == 'running' and eta is not None:
+            text += f", {eta:.0f}s left"
+        elif self.state != 'running':
+            text += f", {self.state} in {self.elapsed:.1f}s"
+        return text
+
+class TaskRunner(object):
+    """Runs queued tasks one at a time, in slices of TICK_SECONDS on the idle queue."""
+
+    def __init__(self, max_threads=None):
+        self.queue = []
+        self.current = None
+        self.listeners = []  # Called with the task whenever its progress or state changes
+        self.max_threads = max_threads or max((os.cpu_count() or 1) - 1, 1)
+        self.last_done = None  # Last task that finished with something to undo
+        self._pool = None
+        self._scheduled = False
+
+    def submit(self, name, steps, undo=True):
+        """Queues a step generator, returns its Task."""
+        task = Task(name, steps, undo)
+        self.queue.append(task)
+        self._schedule()
+        return task
+
+    def cancel(self, task=None):
+        """Cancels the given task, or the running one, and every queued task when none is given."""
+        if task is None:
+            for queued in self.queue:
+                queued.state = 'cancelled'
+                self._notify(queued)
+            self.queue = []
+            task = self.current
+        elif task in self.queue:
+            self.queue.remove(task)
+            task.state = 'cancelled'
+            self._notify(task)
+            return
+        if task is not None:
+            task.cancel_requested = True
+            if task.future is not None:
+                task.future.cancel()
+            self._schedule()
+
+    def undo(self, task):
+        """
+        Undoes the chunks of a task, newest first, and returns how many were undone.
+
+        Stops at the first chunk that is no longer on top of the undo queue, so edits
+        made in Maya after it are never undone.
+        """
+        if task.undo_marker and self._undo_top() == task.undo_marker:
+            cmds.undo()  # The marker, its deferred call finds nothing left to undo
+        undone = 0
+        for name in reversed(task.undo_chunks):
+            if self._undo_top() != name:
+                break
+            cmds.undo()
+            undone += 1
+        return undone
+
+    def can_undo(self, task):
+        """True while the last chunk of the task, or its marker, is on top of the undo queue."""
+        return bool(task.undo_chunks) and self._undo_top() in (task.undo_marker, task.undo_chunks[-1])
+
+    def busy(self):
+        return self.current is not None or bool(self.queue)
+
+    def shutdown(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    # --- stepping ----------------------------------------------------------------
+
+    def _schedule(self):
+        if not self._scheduled:
+            self._scheduled = True
+            maya.utils.executeDeferred(self._tick)
+
+    def _tick(self):
+        self._scheduled = False
+        if self.current is None:
+            if not self.queue:
+                return
+            self._start(self.queue.pop(0))
+        task = self.current
+        if task.cancel_requested:
+            self._finish(task, 'cancelled')
+        elif task.future is not None and not task.future.done():
+            return  # The worker thread schedules the next tick when it is done
+        else:
+            self._advance(task)
+        if self.current is not None or self.queue:
+            if self.current is None or self.current.future is None:
+                self._schedule()
+
+    def _start(self, task):
+        self.current = task
+        task.state = 'running'
+        task.started = time.perf_counter()
+        self._notify(task)
+
+    def _advance(self, task):
+        value = None
+        if task.future is not None:
+            future, task.future = task.future, None
+            try:
+                value = future.result()
+            except Exception as error:
+                self._fail(task, error)
+                return
+        deadline = time.perf_counter() + TICK_SECONDS
+        finished, failure = False, None
+        self._open_chunk(task)
+        try:
+            while True:
+                request = task.steps.send(value)
+                value = None
+                if isinstance(request, Compute):
+                    task.future = self._thread_pool().submit(request.run)
+                    task.future.add_done_callback(lambda future: self._schedule_from_thread())
+                    break
+                if request is not None:
+                    task.done, task.total = request
+                if time.perf_counter() > deadline or task.cancel_requested:
+                    break
+        except StopIteration as stop:
+            task.result = stop.value
+            task.done = task.total
+            finished = True
+        except Exception as error:
+            failure = error
+        finally:
+            self._close_chunk(task)
+        if failure is not None:
+            self._fail(task, failure)
+        elif finished:
+            self._finish(task, 'done')
+        else:
+            self._notify(task)
+
+    def _open_chunk(self, task):
+        if task.undo:
+            task.undo_chunks.append(f"{task.chunk_name} ({len(task.undo_chunks) + 1})")
+            cmds.undoInfo(openChunk=True, chunkName=task.undo_chunks[-1])
+
+    def _close_chunk(self, task):
+        if task.undo:
+            cmds.undoInfo(closeChunk=True)
+            # Maya drops a chunk nothing was recorded in, it is then not on top of the queue
+            if self._undo_top() != task.undo_chunks[-1]:
+                task.undo_chunks.pop()
+
+    def _add_undo_marker(self, task):
+        """Puts a chunk on top of the chunks of a finished task whose undo takes them all back."""
+        if len(task.undo_chunks) < 2 or not api_undo.undo_enabled():
+            return
+        name = f"{task.chunk_name} (all)"
+        # Undo may not run while Maya is undoing, the chunks are undone once the marker is
+        undo_all = lambda: maya.utils.executeDeferred(self.undo, task)
+        cmds.undoInfo(openChunk=True, chunkName=name)
+        try:
+            api_undo.commit(undo_all, lambda: None)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        if self._undo_top() == name:
+            task.undo_marker = name
+
+    @staticmethod
+    def _undo_top():
+        return cmds.undoInfo(query=True, undoName=True)
+
+    def _schedule_from_thread(self):
+        maya.utils.executeDeferred(self._schedule)
+
+    def _fail(self, task, error):
+        task.error = error
+        traceback.print_exception(type(error), error, error.__traceback__)
+        cmds.warning(f"{task.name} failed: {error}")
+        self._finish(task, 'failed')
+
+    def _finish(self, task, state):
+        task.steps.close()
+        task.future = None
+        task.state = state
+        task.finished = time.perf_counter()
+        if task.undo and state != 'done':
+            self._roll_back(task)
+        elif task.undo and task.undo_chunks:
+            self._add_undo_marker(task)
+            self.last_done = task
+        self.current = None
+        self._notify(task)
+        print(task.status_text())
+
+    def _roll_back(self, task):
+        if not cmds.undoInfo(query=True, state=True):
+            cmds.warning(f"{task.name} {task.state}, undo is off so its changes so far stay in the scene.")
+            return
+        left = len(task.undo_chunks) - self.undo(task)
+        if left:
+            cmds.warning(f"{task.name} {task.state}, {left} of its undo steps stay in the scene because "
+                         f"other edits were made after them.")
+
+    def _notify(self, task):
+        for listener in list(self.listeners):
+            listener(task)
+
+    def _thread_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix='ModularXYZ')
+        return self._pool
+
+
+_runner = None
+
+def get_runner():
+    global _runner
+    if _runner is None:
+        _runner = TaskRunner()
+    return _runner
+
+def release_runner():
+    global _runner
+    if _runner is not None:
+        _runner.shutdown()
+        _runner = None
@@ -0,0 +1,207 @@
+import time
+import numpy as np
+import maya.cmds as cmds
+import mesh_io
+import uv_overlap
+from mesh_cleanup import face_normals
+from mesh_data import UVSetData
+
+# Texel density for the UV ToolKit. Points and UVs of the whole selection are read in
+# bulk, world and UV areas of every face come out of one NumPy pass, and shells are
+# rescaled to a target density with one UV write per mesh.
+# Density is in texture pixels per meter; Maya's internal unit is the centimeter.
+
+CM_PER_METER = 100.0
+HISTOGRAM_BINS = 12
+
+def uv_face_areas(us, vs, uv_counts, uv_ids):
+    """Returns the UV area of every face (shoelace formula), 0 for faces without uvs."""
+    uv_counts = np.asarray(uv_counts, dtype=np.int64)
+    uv_ids = np.asarray(uv_ids, dtype=np.int64)
+    areas = np.zeros(len(uv_counts))
+    if not len(uv_ids):
+        return areas
+    starts = np.cumsum(uv_counts) - uv_counts
+    following = np.arange(len(uv_ids)) + 1
+    mapped = uv_counts > 0
+    following[(starts + uv_counts - 1)[mapped]] = starts[mapped]
+    u = np.asarray(us, dtype=np.float64)[uv_ids]
+    v = np.asarray(vs, dtype=np.float64)[uv_ids]
+    cross = u * v[following] - u[following] * v
+    areas[mapped] = np.abs(np.add.reduceat(cross, starts[mapped])) / 2.0
+    return areas
+
+class DensityData(object):
+    """
+    Face and shell areas of a batch of meshes, all meshes concatenated.
+
+    :param shapes: The mesh shapes, in order.
+    :param uv_sets: UVSetData of every shape.
+    :param world_areas: World area of every face in square centimeters.
+    :param uv_areas: UV area of every face.
+    :param face_shell: Shell of every face over the whole batch, -1 for faces without uvs.
+    :param face_offsets: Index of the first face of every shape, plus the total.
+    :param shell_offsets: Index of the first shell of every shape, plus the total.
+    """
+
+    def __init__(self, shapes, uv_sets, world_areas, uv_areas, face_shell, face_offsets, shell_offsets):
+        self.shapes = shapes
+        self.uv_sets = uv_sets
+        self.world_areas = world_areas
+        self.uv_areas = uv_areas
+        self.face_shell = face_shell
+        self.face_offsets = face_offsets
+        self.shell_offsets = shell_offsets
+
+    def face_density(self, resolution):
+        """Pixels per meter of every face, NaN for faces without area or uvs."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            density = np.sqrt(self.uv_areas / self.world_areas) * resolution * CM_PER_METER
+        density[(self.world_areas <= 0) | (self.uv_areas <= 0)] = np.nan
+        return density
+
+    def shell_density(self, resolution):
+        """Pixels per meter of every shell, from the summed areas of its faces."""
+        shell_count = self.shell_offsets[-1]
+        mapped = self.face_shell >= 0
+        world = np.bincount(self.face_shell[mapped], self.world_areas[mapped], minlength=shell_count)
+        uv = np.bincount(self.face_shell[mapped], self.uv_areas[mapped], minlength=shell_count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            density = np.sqrt(uv / world) * resolution * CM_PER_METER
+        density[(world <= 0) | (uv <= 0)] = np.nan
+        return density
+
+def read_density_data(shapes, uv_set=None):
+    """Reads the world and UV areas of every face of the shapes, shapes without uvs are skipped."""
+    kept, uv_sets, world_areas, uv_areas, face_shells = [], [], [], [], []
+    face_offsets, shell_offsets = [0], [0]
+    for shape in shapes:
+        data = mesh_io.read_uv_set(shape, uv_set)
+        if data is None or not len(data.us):
+            continue
+        mesh = mesh_io.read_mesh(shape, with_uvs=False)
+        points = np.frombuffer(mesh.points, dtype=np.float64).reshape(-1, 3)
+        world_areas.append(np.linalg.norm(face_normals(points, mesh.counts, mesh.connects), axis=1) / 2.0)
+        uv_areas.append(uv_face_areas(data.us, data.vs, data.uv_counts, data.uv_ids))
+        _, face_shell, shell_count = uv_overlap.uv_shells(data.uv_counts, data.uv_ids, len(data.us))
+        face_shells.append(np.where(face_shell >= 0, face_shell + shell_offsets[-1], -1))
+        shell_offsets.append(shell_offsets[-1] + shell_count)
+        face_offsets.append(face_offsets[-1] + mesh.num_faces)
+        kept.append(shape)
+        uv_sets.append(data)
+    if not kept:
+        return DensityData([], [], np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64), face_offsets,
+                           shell_offsets)
+    return DensityData(kept, uv_sets, np.concatenate(world_areas), np.concatenate(uv_areas),
+                       np.concatenate(face_shells), face_offsets, shell_offsets)
+
+def density_histogram(density, weights, bins=HISTOGRAM_BINS):
+    """
+    Histogram of densities on a log2 scale, so a bin is the same ratio wide everywhere.
+
+    :return: (area per bin, bin edges in px/m)
+    """
+    valid = np.isfinite(density)
+    if not valid.any():
+        return np.zeros(0), np.zeros(0)
+    log_density = np.log2(density[valid])
+    low, high = log_density.min(), log_density.max()
+    if high - low < 1e-9:
+        low, high = low - 0.5, high + 0.5
+    counts, edges = np.histogram(log_density, bins=bins, range=(low, high), weights=weights[valid])
+    return counts, np.exp2(edges)
+
+def analyze(shapes, resolution=1024, uv_set=None):
+    """
+    Texel density statistics of the shapes.
+
+    :return: Dictionary with the per-face and per-shell densities, the area weighted
+        histogram and summary values, empty when no shape has uvs.
+    """
+    data = read_density_data(shapes, uv_set)
+    if not data.shapes:
+        return {}
+    face_density = data.face_density(resolution)
+    valid = np.isfinite(face_density)
+    counts, edges = density_histogram(face_density, data.world_areas)
+    weights = data.world_areas[valid]
+    return {
+        'shapes': data.shapes,
+        'face_density': face_density,
+        'shell_density': data.shell_density(resolution),
+        'histogram': (counts, edges),
+        'min': float(np.min(face_density[valid])) if valid.any() else 0.0,
+        'max': float(np.max(face_density[valid])) if valid.any() else 0.0,
+        'mean': float(np.average(face_density[valid], weights=weights)) if weights.sum() > 0 else 0.0,
+        'median': float(np.median(face_density[valid])) if valid.any() else 0.0,
+    }
+
+def rescale_shells(data, target, resolution=1024):
+    """
+    Scales every shell about its UV bounding box center so it reaches the target density.
+
+    :param data: DensityData of the shapes to change.
+    :param target: Pixels per meter.
+    :return: New UVSetData per shape, in the order of data.shapes.
+    """
+    shell_scale = target / data.shell_density(resolution)
+    shell_scale[~np.isfinite(shell_scale)] = 1.0
+    results = []
+    for i, uv_set in enumerate(data.uv_sets):
+        face_shell = data.face_shell[data.face_offsets[i]:data.face_offsets[i + 1]]
+        uv_counts = np.asarray(uv_set.uv_counts, dtype=np.int64)
+        uv_ids = np.asarray(uv_set.uv_ids, dtype=np.int64)
+        uvs = np.stack([np.asarray(uv_set.us), np.asarray(uv_set.vs)], axis=1)
+        # Every uv belongs to the shell of the faces using it
+        uv_shell = np.full(len(uvs), -1, dtype=np.int64)
+        uv_shell[uv_ids] = np.repeat(face_shell, uv_counts)
+        used = uv_shell >= 0
+
+        shell_offset = data.shell_offsets[i]
+        shell_count = data.shell_offsets[i + 1] - shell_offset
+        local_shell = uv_shell[used] - shell_offset
+        low = np.full((shell_count, 2), np.inf)
+        high = np.full((shell_count, 2), -np.inf)
+        np.minimum.at(low, local_shell, uvs[used])
+        np.maximum.at(high, local_shell, uvs[used])
+        center = (low + high) / 2.0
+        scale = shell_scale[shell_offset:shell_offset + shell_count]
+        uvs[used] = center[local_shell] + (uvs[used] - center[local_shell]) * scale[local_shell, None]
+        results.append(UVSetData(uv_set.name, uvs[:, 0].tolist(), uvs[:, 1].tolist(), uv_set.uv_counts, uv_set.uv_ids))
+    return results
+
+def normalize_density(shapes, target, resolution=1024, uv_set=None):
+    """Rescales the shells of the shapes to the target px/m, one UV write per mesh."""
+    data = read_density_data(shapes, uv_set)
+    for shape, new_uv_set in zip(data.shapes, rescale_shells(data, target, resolution)):
+        mesh_io.write_uvs(shape, [new_uv_set])
+    return data.shapes
+
+def print_report(report, resolution):
+    counts, edges = report['histogram']
+    total = counts.sum() or 1.0
+    print(f"Texel density of {len(report['shapes'])} meshes at {resolution}px (px/m, area weighted):")
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        bar = '#' * int(round(40 * count / total))
+        print(f"  {low:10.1f} - {high:10.1f}  {100.0 * count / total:5.1f}%  {bar}")
+    print(f"  min {report['min']:.1f}  median {report['median']:.1f}  mean {report['mean']:.1f}  "
+          f"max {report['max']:.1f}")
+
+def check_selection(resolution=1024, uv_set=None):
+    """Prints the texel density histogram of the selected meshes and returns the analysis."""
+    start = time.perf_counter()
+    report = analyze(mesh_io.selected_mesh_shapes(), resolution, uv_set)
+    if not report:
+        cmds.warning("No selected mesh has UVs.")
+        return report
+    print_report(report, resolution)
+    print(f"  {len(report['face_density'])} faces in {time.perf_counter() - start:.3f}s")
+    return report
+
+def normalize_selection(target, resolution=1024, uv_set=None):
+    """Rescales every shell of the selected meshes to the target px/m."""
+    start = time.perf_counter()
+    shapes = normalize_density(mesh_io.selected_mesh_shapes(), target, resolution, uv_set)
+    print(f"Texel density set to {target} px/m at {resolution}px on {len(shapes)} meshes "
+          f"in {time.perf_counter() - start:.3f}s.")
+    return shapes
@@ -0,0 +1,282 @@
+import os
+import time
+import struct
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import maya.cmds as cmds
+import task_runner
+
+# Batch IMG2MTL. Image files are hashed and their headers read on a thread pool,
+# images already used by a file node in the scene (same path or same content) and
+# duplicates inside the batch are skipped, and the remaining shader networks are
+# created in one undo chunk, optionally sharing a single place2dTexture. As a panel
+# task the networks are created one per step, see import_images_steps. The headers
+# flag the new textures whose size is not a power of two or that have an alpha
+# channel. The color space of the new file nodes is left to Maya's color management
+# file rules unless one is asked for.
+
+HASH_CHUNK_SIZE = 1 << 20
+
+class ImageInfo(object):
+    """What the scan stage learned about one image file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.byte_size = 0
+        self.digest = None
+        self.width = None
+        self.height = None
+        self.channels = None
+        self.error = None
+
+    def notes(self):
+        """What a texture artist wants to know about the image, from its header."""
+        notes = []
+        if self.width and self.height and not (_power_of_two(self.width) and _power_of_two(self.height)):
+            notes.append(f"{self.width}x{self.height} is not a power of two")
+        if self.channels in (2, 4):
+            notes.append("has an alpha channel")
+        return notes
+
+def _power_of_two(value):
+    return value & (value - 1) == 0
+
+def hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as image_file:
+        for chunk in iter(lambda: image_file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def read_image_header(path):
+    """Returns (width, height, channels) from the file header, Nones when unknown."""
+    with open(path, 'rb') as image_file:
+        head = image_file.read(64 * 1024)
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        width, height, bit_depth, color_type = struct.unpack('>IIBB', head[16:26])
+        channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}.get(color_type)
+        return width, height, channels
+    if head.startswith(b'\xff\xd8'):
+        return _jpeg_header(head)
+    if head.startswith(b'BM'):
+        width, height = struct.unpack('<ii', head[18:26])
+        bits_per_pixel = struct.unpack('<H', head[28:30])[0]
+        return width, abs(height), max(bits_per_pixel // 8, 1)
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return _tiff_header(head)
+    if head.startswith(b'\x76\x2f\x31\x01'):
+        return _exr_header(head)
+    return None, None, None
+
+def _jpeg_header(head):
+    offset = 2
+    while offset + 9 < len(head):
+        if head[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = head[offset + 1]
+        if marker in (0xFF, 0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack('>H', head[offset + 2:offset + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width, channels = struct.unpack('>HHB', head[offset + 5:offset + 10])
+            return width, height, channels
+        offset += 2 + length
+    return None, None, None
+
+def _tiff_header(head):
+    endian = '<' if head[:2] == b'II' else '>'
+    ifd_offset = struct.unpack(endian + 'I', head[4:8])[0]
+    if ifd_offset + 2 > len(head):
+        return None, None, None
+    tags = {}
+    entry_count = struct.unpack(endian + 'H', head[ifd_offset:ifd_offset + 2])[0]
+    for i in range(entry_count):
+        entry = ifd_offset + 2 + i * 12
+        if entry + 12 > len(head):
+            break
+        tag, field_type, count = struct.unpack(endian + 'HHI', head[entry:entry + 8])
+        value_format = 'H' if field_type == 3 else 'I'
+        tags[tag] = struct.unpack(endian + value_format, head[entry + 8:entry + 8 + struct.calcsize(value_format)])[0]
+    return tags.get(256), tags.get(257), tags.get(277, 1)
+
+def _exr_header(head):
+    offset = 8
+    width = height = None
+    channels = 0
+    while offset < len(head) and head[offset] != 0:
+        name_end = head.index(b'\x00', offset)
+        type_end = head.index(b'\x00', name_end + 1)
+        name = head[offset:name_end]
+        size = struct.unpack('<i', head[type_end + 1:type_end + 5])[0]
+        value = head[type_end + 5:type_end + 5 + size]
+        if name == b'dataWindow':
+            x_min, y_min, x_max, y_max = struct.unpack('<iiii', value[:16])
+            width, height = x_max - x_min + 1, y_max - y_min + 1
+        elif name == b'channels':
+            channels = _exr_channel_count(value)
+        offset = type_end + 5 + size
+    return width, height, channels or None
+
+def _exr_channel_count(value):
+    count = 0
+    offset = 0
+    while offset < len(value) and value[offset] != 0:
+        offset = value.index(b'\x00', offset) + 1 + 16
+        count += 1
+    return count
+
+def scan_image(path, with_digest=True):
+    info = ImageInfo(path)
+    try:
+        info.byte_size = os.path.getsize(path)
+        info.width, info.height, info.channels = read_image_header(path)
+        if with_digest:
+            info.digest = hash_file(path)
+    except (OSError, struct.error, ValueError) as error:
+        info.error = str(error)
+    return info
+
+def normalize_path(path):
+    return os.path.normcase(os.path.normpath(os.path.abspath(path)))
+
+def scene_textures():
+    """Returns {normalized texture path: file node} of every file node in the scene."""
+    textures = {}
+    for file_node in cmds.ls(type='file') or []:
+        path = cmds.getAttr(file_node + '.fileTextureName')
+        if path:
+            if not os.path.isabs(path):
+                path = cmds.workspace(expandName=path)
+            textures.setdefault(normalize_path(path), file_node)
+    return textures
+
+def import_images(image_paths, share_placement=False, max_workers=8, color_space=None):
+    """
+    Creates one lambert network per new image.
+
+    :param image_paths: Image files to import.
+    :param share_placement: Drive every new file node from one place2dTexture.
+    :param max_workers: Threads used for hashing and header reading.
+    :param color_space: Color space forced on every new file node, None lets the file rules choose.
+    :return: (created [(image, shader, shading_group)], skipped [(image, reason)],
+        notes {created image: [note]}, see ImageInfo.notes, timings {stage: seconds})
+    """
+    return task_runner.run_blocking(import_images_steps(image_paths, share_placement, max_workers, color_space),
+                                    undo_name='IMG2MTL')
+
+def import_images_steps(image_paths, share_placement=False, max_workers=8, color_space=None):
+    """Step generator of import_images for task_runner, one step per created network."""
+    timings = {}
+    start = time.perf_counter()
+    textures = scene_textures()
+    timings['scene lookup'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    paths = {}
+    for path in image_paths:
+        paths.setdefault(normalize_path(path), path)
+    infos, scene_digests = yield task_runner.Compute(scan_images, list(paths.values()), list(textures), max_workers)
+    timings['hash and header'] = time.perf_counter() - start
+
+    created, skipped, notes, seen = [], [], {}, {}
+    to_create = []
+    for key, info in zip(paths, infos):
+        if info.error:
+            skipped.append((info.path, f"unreadable: {info.error}"))
+        elif key in textures:
+            skipped.append((info.path, f"already used by {textures[key]}"))
+        elif info.digest in scene_digests:
+            skipped.append((info.path, f"same content as {textures[scene_digests[info.digest]]}"))
+        elif info.digest in seen:
+            skipped.append((info.path, f"same content as {seen[info.digest]}"))
+        else:
+            seen[info.digest] = info.path
+            to_create.append(info)
+
+    start = time.perf_counter()
+    place2d = None
+    if share_placement and to_create:
+        place2d = cmds.shadingNode('place2dTexture', asUtility=True, name='place2dTextureNode')
+    for i, info in enumerate(to_create):
+        shader, shading_group = create_lambert_shader_with_texture(info.path, place2dTexture=place2d,
+                                                                   color_space=color_space)
+        created.append((info.path, shader, shading_group))
+        if info.notes():
+            notes[info.path] = info.notes()
+        yield i + 1, len(to_create)
+    timings['create networks'] = time.perf_counter() - start
+
+    return created, skipped, notes, timings
+
+def create_lambert_shader_with_texture(image_path, place2dTexture=None, color_space=None):
+    """
+    Creates a lambert -> file -> place2dTexture network and its shading group.
+
+    :param image_path: The texture file.
+    :param place2dTexture: Existing placement node to share, a new one is created when None.
+    :param color_space: Color space of the file node, kept over the file rules. None lets the file rules choose.
+    """
+    # Create Lambert shader
+    shader = cmds.shadingNode('lambert', asShader=True, name='lambert')
+
+    # Create file texture node
+    file_texture = cmds.shadingNode('file', asTexture=True, name='fileTextureNode')
+    # Set file texture attributes
+    cmds.setAttr(file_texture + '.fileTextureName', image_path, type='string')
+    if color_space:
+        cmds.setAttr(file_texture + '.ignoreColorSpaceFileRules', True)
+        cmds.setAttr(file_texture + '.colorSpace', color_space, type='string')
+
+    # Create 2D texture placement node
+    if place2dTexture is None:
+        place2dTexture = cmds.shadingNode('place2dTexture', asUtility=True, name='place2dTextureNode')
+    # Connect 2D texture placement attributes to file texture node
+    attributes = ['coverage', 'translateFrame', 'rotateFrame', 'mirrorU', 'mirrorV', 'stagger', 'wrapU', 'wrapV', 'repeatUV', 'offset', 'rotateUV', 'noiseUV', 'vertexUvOne', 'vertexUvTwo', 'vertexUvThree', 'vertexCameraOne']
+    for attr in attributes:
+        cmds.connectAttr(place2dTexture + '.' + attr, file_texture + '.' + attr, force=True)
+
+    cmds.connectAttr(place2dTexture + '.outUV', file_texture + '.uvCoord', force=True)
+    cmds.connectAttr(place2dTexture + '.outUvFilterSize', file_texture + '.uvFilterSize', force=True)
+
+    # Connect file texture to Lambert shader's color attribute
+    cmds.connectAttr(file_texture + '.outColor', shader + '.color', force=True)
+
+    # Create shading group for the Lambert shader
+    shading_group = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name='lambertShadingGroup')
+
+    # Connect the Lambert shader to the shading group
+    cmds.connectAttr(shader + '.outColor', shading_group + '.surfaceShader', force=True)
+
+    return shader, shading_group
+
+def scan_images(image_paths, scene_paths, max_workers=8):
+    """
+    Scans the images and hashes the scene textures that may share their content, on a thread pool.
+
+    :param scene_paths: Normalized paths of the textures already in the scene.
+    :return: (ImageInfo of every image, {digest: scene path})
+    """
+    new_paths = {normalize_path(path) for path in image_paths}
+    workers = max(min(max_workers, len(image_paths)), 1)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        infos = list(pool.map(scan_image, image_paths))
+        # Scene textures only need hashing when their byte size matches a new image
+        sizes = {info.byte_size for info in infos if not info.error}
+        candidates = [path for path in scene_paths if path not in new_paths and _size_or_none(path) in sizes]
+        scene_digests = {digest: path for digest, path in zip(pool.map(hash_file_or_none, candidates), candidates)
+                         if digest}
+    return infos, scene_digests
+
+def hash_file_or_none(path):
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+def _size_or_none(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
@@ -0,0 +1,287 @@
+import os
+import json
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Texture thumbnails for the Shader Toolkit list. A thumbnail is a square of
+# THUMBNAIL_SIZE pixels, 8 bit RGBA, and is looked up in three places:
+#   - a memory LRU bounded in bytes (MODULARXYZ_THUMBNAIL_MB, 64 MB by default),
+#   - an atlas file on disk holding fixed size tiles, memory-mapped, with a JSON index
+#     from texture path + mtime + size to tile; when it is full the oldest tile is reused.
+#     Several Maya sessions may share the atlas and reuse each other's tiles, so every
+#     tile starts with the key it was written for and a read that finds another key
+#     is a miss,
+#   - the texture itself, decoded on a worker thread by the decoder given to the cache.
+# Requests come from the rows the list draws. Workers take the newest request first
+# and the oldest waiting requests are dropped, so scrolling fast only loads the rows
+# the view stops on. No Qt or maya import here, the list model brings the decoder.
+
+THUMBNAIL_SIZE = 32
+TILE_BYTES = THUMBNAIL_SIZE * THUMBNAIL_SIZE * 4
+KEY_BYTES = 20  # SHA-1 digest of the texture key, in front of the pixels of a tile
+SLOT_BYTES = KEY_BYTES + TILE_BYTES
+DEFAULT_MEMORY_MB = 64
+DISK_TILES = 16384  # 64 MB of tiles at 32 pixels
+GROW_TILES = 1024  # The atlas file grows by this many tiles at a time
+MAX_PENDING = 64  # About two screens of rows
+INDEX_FLUSH_WRITES = 64  # New tiles between two index saves
+MISSING = b''  # Kept in memory for textures that could not be read, so they are not retried
+
+def default_cache_dir():
+    """The atlas lives next to the profile log unless MODULARXYZ_THUMBNAIL_CACHE points elsewhere."""
+    path = os.environ.get('MODULARXYZ_THUMBNAIL_CACHE')
+    if path:
+        return path
+    import maya.cmds as cmds
+    return os.path.join(cmds.internalVar(userAppDir=True), 'ModularXYZ', 'thumbnails')
+
+def default_memory_bytes():
+    return int(float(os.environ.get('MODULARXYZ_THUMBNAIL_MB', DEFAULT_MEMORY_MB)) * (1 << 20))
+
+def texture_key(path, stat):
+    """Disk cache key of a texture, changes when the file is written."""
+    text = f"{os.path.normcase(os.path.abspath(path))}|{stat.st_mtime_ns}|{stat.st_size}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class ThumbnailAtlas(object):
+    """Fixed size tiles in one memory-mapped file, reused oldest first. Not thread safe."""
+
+    def __init__(self, directory, capacity=DISK_TILES):
+        self.capacity = capacity
+        self.atlas_path = os.path.join(directory, 'thumbnails.atlas')
+        self.index_path = os.path.join(directory, 'thumbnails.json')
+        os.makedirs(directory, exist_ok=True)
+        self.tiles = {}  # key -> tile
+        self.owners = {}  # tile -> key
+        self.next_tile = 0  # Counts every write, the tile is next_tile % capacity
+        self._unsaved = 0
+        self._load_index()
+        self._file = open(self.atlas_path, 'r+b' if os.path.exists(self.atlas_path) else 'w+b')
+        self._map = None
+        self._map_tiles = 0
+        self._remap()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            return
+        # An index written for another tile size or capacity starts the atlas over
+        if index.get('tile_bytes') != SLOT_BYTES or index.get('capacity') != self.capacity:
+            return
+        self.tiles = {key: tile for key, tile in index['tiles'].items()}
+        self.owners = {tile: key for key, tile in self.tiles.items()}
+        self.next_tile = index['next_tile']
+
+    def _remap(self):
+        tiles = os.fstat(self._file.fileno()).st_size // SLOT_BYTES
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), tiles * SLOT_BYTES) if tiles else None
+        self._map_tiles = tiles
+
+    def read(self, key):
+        tile = self.tiles.get(key)
+        if tile is None or tile >= self._map_tiles:
+            return None
+        start = tile * SLOT_BYTES
+        stamp = bytes.fromhex(key)
+        if self._map[start:start + KEY_BYTES] != stamp:
+            return None  # Reused by another session since the index was written
+        data = self._map[start + KEY_BYTES:start + SLOT_BYTES]
+        # A writer clears the stamp before it touches the pixels, still there means they are whole
+        return data if self._map[start:start + KEY_BYTES] == stamp else None
+
+    def write(self, key, data):
+        tile = self.next_tile % self.capacity
+        self.next_tile += 1
+        previous = self.owners.pop(tile, None)
+        if previous is not None:
+            del self.tiles[previous]
+        if tile >= self._map_tiles:
+            size = min(tile + GROW_TILES, self.capacity) * SLOT_BYTES
+            # Another session may have grown the file further, shrinking it would cut its mapping
+            if os.fstat(self._file.fileno()).st_size < size:
+                self._file.truncate(size)
+            self._remap()
+        start = tile * SLOT_BYTES
+        self._map[start:start + KEY_BYTES] = bytes(KEY_BYTES)
+        self._map[start + KEY_BYTES:start + SLOT_BYTES] = data
+        self._map[start:start + KEY_BYTES] = bytes.fromhex(key)
+        self.tiles[key] = tile
+        self.owners[tile] = key
+        self._unsaved += 1
+        if self._unsaved >= INDEX_FLUSH_WRITES:
+            self.flush()
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+        index = {'tile_bytes': SLOT_BYTES, 'capacity': self.capacity, 'next_tile': self.next_tile,
+                 'tiles': self.tiles}
+        # Written aside and swapped in, a crash never leaves half an index
+        temporary = self.index_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as index_file:
+            json.dump(index, index_file)
+        os.replace(temporary, self.index_path)
+        self._unsaved = 0
+
+    def close(self):
+        self.flush()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+class ThumbnailCache(object):
+    """
+    Memory LRU over a ThumbnailAtlas, filled by worker threads.
+
+    :param decoder: Called on a worker thread with (path, size), returns size * size * 4
+        bytes of RGBA or None when the file cannot be read.
+    """
+
+    def __init__(self, decoder, cache_dir=None, memory_bytes=None, max_threads=None, disk_tiles=DISK_TILES):
+        self.decoder = decoder
+        self.memory_bytes = default_memory_bytes() if memory_bytes is None else memory_bytes
+        self.max_threads = max_threads or min(max((os.cpu_count() or 1) - 1, 1), 4)
+        self.listeners = []  # Called with the texture path from a worker thread when it is loaded
+        self.counters = {'hits': 0, 'misses': 0, 'disk_hits': 0, 'decodes': 0, 'dropped': 0, 'evicted': 0}
+        self._memory = OrderedDict()  # path -> RGBA bytes or MISSING, least recently used first
+        self._used_bytes = 0
+        self._pending = OrderedDict()  # path -> None, newest last
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._cache_dir = cache_dir
+        self._disk_tiles = disk_tiles
+        self._atlas = None
+        self._pool = None
+
+    def get(self, path):
+        """
+        Returns the thumbnail of a texture, MISSING when it cannot be read, or None
+        while it is loading; the first call queues the load.
+        """
+        with self._lock:
+            data = self._memory.get(path)
+            if data is not None:
+                self._memory.move_to_end(path)
+                self.counters['hits'] += 1
+                return data
+            self.counters['misses'] += 1
+            if path not in self._in_flight:
+                self._pending[path] = None
+                self._pending.move_to_end(path)
+                while len(self._pending) > MAX_PENDING:
+                    self._pending.popitem(last=False)
+                    self.counters['dropped'] += 1
+            self._start_workers()
+        return None
+
+    def invalidate(self, paths=None):
+        """Forgets the given thumbnails, or all, so they are looked up again on disk."""
+        with self._lock:
+            for path in list(self._memory) if paths is None else paths:
+                data = self._memory.pop(path, None)
+                if data is not None:
+                    self._used_bytes -= len(data)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats['entries'] = len(self._memory)
+            stats['memory_bytes'] = self._used_bytes
+            stats['pending'] = len(self._pending)
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._disk_lock:
+            if self._atlas is not None:
+                self._atlas.close()
+                self._atlas = None
+
+    # --- loading -----------------------------------------------------------------
+
+    def _start_workers(self):
+        """Hands the newest requests to free workers, called with _lock held."""
+        while self._pending and len(self._in_flight) < self.max_threads:
+            path = self._pending.popitem(last=True)[0]
+            self._in_flight.add(path)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix='ModularXYZThumbnail')
+            self._pool.submit(self._load, path)
+
+    def _load(self, path):
+        try:
+            data = self._read(path)
+        except Exception:
+            data = MISSING
+        with self._lock:
+            self._in_flight.discard(path)
+            self._store(path, data)
+            self._start_workers()
+        for listener in list(self.listeners):
+            listener(path)
+
+    def _read(self, path):
+        try:
+            key = texture_key(path, os.stat(path))
+        except OSError:
+            return MISSING
+        with self._disk_lock:
+            data = self._disk().read(key)
+        if data is not None:
+            self._count('disk_hits')
+            return data
+        data = self.decoder(path, THUMBNAIL_SIZE)
+        self._count('decodes')
+        if not data or len(data) != TILE_BYTES:
+            return MISSING
+        with self._disk_lock:
+            self._disk().write(key, data)
+        return data
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _disk(self):
+        if self._atlas is None:
+            self._atlas = ThumbnailAtlas(self._cache_dir or default_cache_dir(), self._disk_tiles)
+        return self._atlas
+
+    def _store(self, path, data):
+        previous = self._memory.pop(path, None)
+        if previous is not None:
+            self._used_bytes -= len(previous)
+        self._memory[path] = data
+        self._used_bytes += len(data)
+        while self._used_bytes > self.memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._used_bytes -= len(evicted)
+            self.counters['evicted'] += 1
+
+
+_cache = None
+
+def get_cache(decoder):
+    global _cache
+    if _cache is None:
+        _cache = ThumbnailCache(decoder)
+    return _cache
+
+def release_cache():
+    global _cache
+    if _cache is not None:
+        _cache.shutdown()
+        _cache = None
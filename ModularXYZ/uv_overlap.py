@@ -0,0 +1,270 @@
+import numpy as np
+import maya.cmds as cmds
+import mesh_io
+from mesh_data import component_list
+from mesh_cleanup import connected_components
+
+# UV shell overlap detection for the UV ToolKit. A UV set is read in bulk, shells
+# are the groups of faces sharing uvs, shell bounding boxes are paired by
+# sweep-and-prune along U and every candidate pair is confirmed with exact triangle
+# tests on the triangles of both shells that meet in a spatial hash. Long thin
+# triangles would fill many hash cells, they are paired by their U range instead.
+
+DEFAULT_TOLERANCE = 1e-6  # UV distance two shells may share without counting as overlap
+SAT_CHUNK_SIZE = 1 << 16  # Triangle pairs tested per NumPy batch
+MAX_HASH_CELLS = 16  # Triangles spanning more hash cells are paired without the hash
+
+def uv_shells(uv_counts, uv_ids, num_uvs):
+    """
+    Labels the UV shells of a UV set.
+
+    :return: (shell of every uv, shell of every face, number of shells). Faces without
+        uvs get shell -1.
+    """
+    uv_counts = np.asarray(uv_counts, dtype=np.int64)
+    uv_ids = np.asarray(uv_ids, dtype=np.int64)
+    starts = np.cumsum(uv_counts) - uv_counts
+    following = np.arange(len(uv_ids)) + 1
+    mapped = uv_counts > 0
+    following[(starts + uv_counts - 1)[mapped]] = starts[mapped]
+    uv_shell = connected_components(num_uvs, uv_ids, uv_ids[following] if len(uv_ids) else uv_ids)
+    face_shell = np.full(len(uv_counts), -1, dtype=np.int64)
+    face_shell[mapped] = uv_shell[uv_ids[starts[mapped]]]
+    return uv_shell, face_shell, int(uv_shell.max()) + 1 if len(uv_shell) else 0
+
+def triangulate(uv_counts, uv_ids):
+    """Fan triangulates the mapped faces, returns (triangle uv ids (N, 3), face of every triangle)."""
+    uv_counts = np.asarray(uv_counts, dtype=np.int64)
+    uv_ids = np.asarray(uv_ids, dtype=np.int64)
+    starts = np.cumsum(uv_counts) - uv_counts
+    corner_start = np.repeat(starts, uv_counts)
+    corner_count = np.repeat(uv_counts, uv_counts)
+    corners = np.arange(len(uv_ids))
+    local = corners - corner_start
+    middle = (local >= 1) & (local <= corner_count - 2)
+    triangles = np.stack([uv_ids[corner_start[middle]], uv_ids[corners[middle]], uv_ids[corners[middle] + 1]], axis=1)
+    faces = np.repeat(np.arange(len(uv_counts)), uv_counts)[middle]
+    return triangles, faces
+
+def triangles_overlap(triangles_a, triangles_b, tolerance=DEFAULT_TOLERANCE):
+    """
+    Separating axis test of triangle pairs.
+
+    :param triangles_a: (N, 3, 2) uv corners.
+    :param triangles_b: (N, 3, 2) uv corners.
+    :return: Boolean array, True where the interiors overlap by more than the tolerance.
+    """
+    overlap = np.ones(len(triangles_a), dtype=bool)
+    for triangles in (triangles_a, triangles_b):
+        for i in range(3):
+            edge = triangles[:, (i + 1) % 3] - triangles[:, i]
+            axis = np.stack([-edge[:, 1], edge[:, 0]], axis=1)
+            length = np.hypot(axis[:, 0], axis[:, 1])
+            axis /= np.where(length > 0, length, 1.0)[:, None]
+            projection_a = triangles_a[:, :, 0] * axis[:, None, 0] + triangles_a[:, :, 1] * axis[:, None, 1]
+            projection_b = triangles_b[:, :, 0] * axis[:, None, 0] + triangles_b[:, :, 1] * axis[:, None, 1]
+            overlap &= (projection_a.max(axis=1) > projection_b.min(axis=1) + tolerance) & \
+                       (projection_b.max(axis=1) > projection_a.min(axis=1) + tolerance)
+    return overlap
+
+def sweep_and_prune(bounds, tolerance=DEFAULT_TOLERANCE):
+    """
+    Pairs boxes that overlap by more than the tolerance.
+
+    :param bounds: (N, 2 * D) array of the D minimums then the D maximums, min_u,
+        min_v, max_u, max_v for UV boxes.
+    :return: (M, 2) array of box index pairs, lower index first.
+    """
+    dims = bounds.shape[1] // 2
+    # Sweep along the axis that yields the fewest candidates: every box is paired
+    # with the boxes starting before it ends
+    best = None
+    for axis in range(dims):
+        order = np.argsort(bounds[:, axis], kind='stable')
+        sorted_bounds = bounds[order]
+        ends = np.searchsorted(sorted_bounds[:, axis], sorted_bounds[:, axis + dims] - tolerance, side='left')
+        counts = np.maximum(ends - np.arange(len(order)) - 1, 0)
+        if best is None or counts.sum() < best[3].sum():
+            best = (axis, order, sorted_bounds, counts)
+    axis, order, sorted_bounds, counts = best
+    first = np.repeat(np.arange(len(order)), counts)
+    second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + first + 1
+    touching = np.ones(len(first), dtype=bool)
+    for other in range(dims):
+        if other != axis:
+            touching &= (sorted_bounds[first, other] < sorted_bounds[second, other + dims] - tolerance) & \
+                        (sorted_bounds[second, other] < sorted_bounds[first, other + dims] - tolerance)
+    pairs = np.stack([order[first[touching]], order[second[touching]]], axis=1)
+    return np.sort(pairs, axis=1)
+
+def _hash_pairs(bounds, cell_size):
+    """
+    Returns the index pairs (i < j) of the boxes that may meet: boxes sharing a spatial
+    hash cell, and boxes meeting one of the boxes spanning too many cells to be hashed.
+    """
+    low = np.floor(bounds[:, :2] / cell_size).astype(np.int64)
+    high = np.floor(bounds[:, 2:] / cell_size).astype(np.int64)
+    spans = high - low + 1
+    large = spans[:, 0].astype(np.float64) * spans[:, 1] > MAX_HASH_CELLS
+    small = np.flatnonzero(~large)
+    pairs = [small[_cell_pairs(low[small], spans[small])]]
+    if large.any():
+        large = np.flatnonzero(large)
+        pairs.append(large[sweep_and_prune(bounds[large], 0.0)])
+        pairs.append(_large_box_pairs(bounds, large, small))
+    return np.sort(np.concatenate(pairs), axis=1)
+
+def _cell_pairs(low, spans):
+    """Pairs the boxes that share a cell, each box given by its first cell and its span in cells."""
+    counts = spans[:, 0] * spans[:, 1]
+    box = np.repeat(np.arange(len(low)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    keys = ((low[box, 0] + local // spans[box, 1]) << 32) + low[box, 1] + local % spans[box, 1]
+
+    order = np.argsort(keys, kind='stable')
+    keys, box = keys[order], box[order]
+    # Pair every entry with the entries after it in the same cell
+    ends = np.searchsorted(keys, keys, side='right')
+    counts = ends - np.arange(len(keys)) - 1
+    first = np.repeat(np.arange(len(keys)), counts)
+    second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + first + 1
+    low_box, high_box = np.minimum(box[first], box[second]), np.maximum(box[first], box[second])
+    pairs = np.sort(low_box * len(low) + high_box)
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else pairs
+    return np.stack([pairs // len(low), pairs % len(low)], axis=1)
+
+def _large_box_pairs(bounds, large, small):
+    """
+    Pairs every large box with the small boxes it meets.
+
+    Small boxes are sorted by their minimum U. A small box meeting a large one starts
+    at most the widest small box before it, so each large box only looks at one run
+    of the sorted boxes; runs are checked SAT_CHUNK_SIZE candidates at a time.
+    """
+    if not len(small):
+        return np.zeros((0, 2), dtype=np.int64)
+    order = small[np.argsort(bounds[small, 0], kind='stable')]
+    starts = bounds[order, 0]
+    reach = float((bounds[small, 2] - bounds[small, 0]).max())
+    first = np.searchsorted(starts, bounds[large, 0] - reach, side='left')
+    counts = np.searchsorted(starts, bounds[large, 2], side='right') - first
+    pairs = []
+    chunk_start = 0
+    while chunk_start < len(large):
+        # At least one large box per chunk, however long its run
+        chunk_end = max(int(np.searchsorted(np.cumsum(counts[chunk_start:]), SAT_CHUNK_SIZE, side='right')), 1)
+        chunk = slice(chunk_start, chunk_start + chunk_end)
+        chunk_counts = counts[chunk]
+        big = np.repeat(large[chunk], chunk_counts)
+        offsets = np.arange(chunk_counts.sum()) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        other = order[np.repeat(first[chunk], chunk_counts) + offsets]
+        meet = (bounds[big, 0] <= bounds[other, 2]) & (bounds[other, 0] <= bounds[big, 2]) & \
+               (bounds[big, 1] <= bounds[other, 3]) & (bounds[other, 1] <= bounds[big, 3])
+        pairs.append(np.stack([big[meet], other[meet]], axis=1))
+        chunk_start += chunk_end
+    return np.concatenate(pairs)
+
+class ShellOverlaps(object):
+    """
+    Overlapping shells of one UV set.
+
+    :param face_shell: Shell of every face, -1 for faces without uvs.
+    :param pairs: Set of (shell, shell) pairs that overlap, lower shell first.
+    """
+
+    def __init__(self, face_shell, pairs):
+        self.face_shell = face_shell
+        self.pairs = pairs
+
+    def offending_shells(self):
+        return sorted({shell for pair in self.pairs for shell in pair})
+
+    def offending_faces(self):
+        """Returns the faces of every shell that overlaps another shell."""
+        return np.flatnonzero(np.isin(self.face_shell, self.offending_shells())).tolist()
+
+def find_shell_overlaps(us, vs, uv_counts, uv_ids, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds the overlapping shells of one UV set.
+
+    Shells overlap when the interiors of their triangles intersect, shells that
+    only touch along an edge or a corner do not. Overlaps inside a single shell
+    (folds) are not reported.
+    """
+    uvs = np.stack([np.asarray(us, dtype=np.float64), np.asarray(vs, dtype=np.float64)], axis=1)
+    uv_shell, face_shell, shell_count = uv_shells(uv_counts, uv_ids, len(uvs))
+    if shell_count < 2:
+        return ShellOverlaps(face_shell, set())
+
+    triangles = triangulate(uv_counts, uv_ids)[0]
+    corners = uvs[triangles]
+    triangle_shell = uv_shell[triangles[:, 0]]
+    triangle_bounds = np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+
+    shell_bounds = np.empty((shell_count, 4))
+    shell_bounds[:, :2] = np.inf
+    shell_bounds[:, 2:] = -np.inf
+    np.minimum.at(shell_bounds[:, :2], triangle_shell, triangle_bounds[:, :2])
+    np.maximum.at(shell_bounds[:, 2:], triangle_shell, triangle_bounds[:, 2:])
+
+    # Broad phase: only triangles of shells whose boxes meet another shell go on
+    shell_pairs = sweep_and_prune(shell_bounds, tolerance)
+    if not len(shell_pairs):
+        return ShellOverlaps(face_shell, set())
+    candidates = np.zeros(shell_count, dtype=bool)
+    candidates[shell_pairs.ravel()] = True
+    triangles = np.flatnonzero(candidates[triangle_shell])
+    bounds = triangle_bounds[triangles]
+
+    # Cells about the size of a typical triangle
+    cell_size = max(float(np.median((bounds[:, 2:] - bounds[:, :2]).max(axis=1))), 1e-9)
+    triangle_pairs = triangles[_hash_pairs(bounds, cell_size)]
+    shells = triangle_shell[triangle_pairs]
+    bounds_a, bounds_b = triangle_bounds[triangle_pairs[:, 0]], triangle_bounds[triangle_pairs[:, 1]]
+    keep = (shells[:, 0] != shells[:, 1]) & \
+           (bounds_a[:, 0] < bounds_b[:, 2] - tolerance) & (bounds_b[:, 0] < bounds_a[:, 2] - tolerance) & \
+           (bounds_a[:, 1] < bounds_b[:, 3] - tolerance) & (bounds_b[:, 1] < bounds_a[:, 3] - tolerance)
+    triangle_pairs, shells = triangle_pairs[keep], shells[keep]
+
+    pairs = set()
+    for start in range(0, len(triangle_pairs), SAT_CHUNK_SIZE):
+        chunk, chunk_shells = triangle_pairs[start:start + SAT_CHUNK_SIZE], shells[start:start + SAT_CHUNK_SIZE]
+        overlap = triangles_overlap(corners[chunk[:, 0]], corners[chunk[:, 1]], tolerance)
+        pairs.update(map(tuple, np.sort(chunk_shells[overlap], axis=1).tolist()))
+    return ShellOverlaps(face_shell, pairs)
+
+def shape_overlaps(shape, uv_set=None, tolerance=DEFAULT_TOLERANCE):
+    """Returns the ShellOverlaps of a mesh shape, None when it has no UVs."""
+    data = mesh_io.read_uv_set(shape, uv_set)
+    if data is None or not len(data.us):
+        return None
+    return find_shell_overlaps(data.us, data.vs, data.uv_counts, data.uv_ids, tolerance)
+
+def find_overlaps(shapes, uv_set=None, tolerance=DEFAULT_TOLERANCE):
+    """Returns {shape: ShellOverlaps} for the shapes that have overlapping shells."""
+    overlaps = {}
+    for shape in shapes:
+        result = shape_overlaps(shape, uv_set, tolerance)
+        if result is not None and result.pairs:
+            overlaps[shape] = result
+    return overlaps
+
+def report_overlaps(select=False, uv_set=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    Prints the overlapping shells of the selected meshes without changing any UV.
+
+    :param select: Select the faces of the overlapping shells.
+    :return: {shape: ShellOverlaps} of the meshes with overlaps.
+    """
+    shapes = mesh_io.selected_mesh_shapes()
+    overlaps = find_overlaps(shapes, uv_set, tolerance)
+    for shape, result in overlaps.items():
+        print(f"{shape}: {len(result.pairs)} overlapping shell pairs, "
+              f"{len(result.offending_faces())} faces in {len(result.offending_shells())} shells")
+    print(f"{len(overlaps)} of {len(shapes)} meshes have overlapping UV shells.")
+    if select:
+        faces = []
+        for shape, result in overlaps.items():
+            faces.extend(component_list(shape, result.offending_faces()))
+        cmds.select(faces, replace=True)
+    return overlaps
@@ -0,0 +1,225 @@
+import time
+import numpy as np
+import maya.cmds as cmds
+import mesh_io
+import uv_overlap
+from mesh_data import UVSetData
+
+# Lightmap UV packing for the UV ToolKit. The shells of the box mapped UV set are
+# packed by their bounding rectangles into the 0-1 square of a second UV set with a
+# skyline packer. Sizes are whole pixels of the target resolution, every shell keeps
+# its relative scale and is surrounded by the requested pixel padding. The largest
+# scale that still fits is found by bisection, so the result only depends on the input.
+
+LIGHTMAP_UV_SET = 'lightmap'
+SCALE_PRECISION = 0.01  # Bisection stops when the scale is known within 1%
+
+class Skyline(object):
+    """
+    Bottom-left skyline packer over an integer width x height bin.
+
+    The skyline is a list of [x, y, width] segments covering the bin width.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.segments = [[0, 0, width]]
+
+    def insert(self, width, height):
+        """Places a rectangle where its top is lowest (then leftmost), returns (x, y) or None."""
+        best = None
+        for index in range(len(self.segments)):
+            y = self._fit(index, width, height)
+            if y is not None and (best is None or (y, self.segments[index][0]) < best[:2]):
+                best = (y, self.segments[index][0], index)
+        if best is None:
+            return None
+        y, x, index = best
+        self._add_level(index, x, y + height, width)
+        return x, y
+
+    def _fit(self, index, width, height):
+        x = self.segments[index][0]
+        if x + width > self.width:
+            return None
+        # The rectangle rests on the highest segment below it
+        y = 0
+        remaining = width
+        while remaining > 0:
+            y = max(y, self.segments[index][1])
+            if y + height > self.height:
+                return None
+            remaining -= self.segments[index][2]
+            index += 1
+        return y
+
+    def _add_level(self, index, x, y, width):
+        self.segments.insert(index, [x, y, width])
+        # Shrink or drop the segments now covered by the new one
+        index += 1
+        while index < len(self.segments):
+            segment = self.segments[index]
+            covered = x + width - segment[0]
+            if covered <= 0:
+                break
+            if covered < segment[2]:
+                segment[0] += covered
+                segment[2] -= covered
+                break
+            del self.segments[index]
+        # Merge neighbours at the same height
+        index = 0
+        while index < len(self.segments) - 1:
+            if self.segments[index][1] == self.segments[index + 1][1]:
+                self.segments[index][2] += self.segments[index + 1][2]
+                del self.segments[index + 1]
+            else:
+                index += 1
+
+def pack_rectangles(sizes, bin_size):
+    """
+    Packs integer (width, height) rectangles into a bin_size x bin_size square.
+
+    Rectangles are placed tallest first, ties broken by width and then by index.
+
+    :return: List of (x, y) per rectangle, None when they do not all fit.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0], i))
+    skyline = Skyline(bin_size, bin_size)
+    positions = [None] * len(sizes)
+    for i in order:
+        position = skyline.insert(*sizes[i])
+        if position is None:
+            return None
+        positions[i] = position
+    return positions
+
+def pack_shells(extents, resolution=512, padding=4, rotate=True):
+    """
+    Finds the largest common scale at which the shell rectangles fit the texture.
+
+    :param extents: (N, 2) width and height of every shell in UV units.
+    :param resolution: Texture size in pixels.
+    :param padding: Pixels between two shells and between a shell and the border.
+    :param rotate: Lay shells taller than wide on their side.
+    :return: (pixels per UV unit, (N, 2) pixel position of every shell, N rotated flags)
+    """
+    extents = np.asarray(extents, dtype=np.float64)
+    rotated = extents[:, 1] > extents[:, 0] if rotate else np.zeros(len(extents), dtype=bool)
+    extents = np.where(rotated[:, None], extents[:, ::-1], extents)
+    bin_size = resolution - padding
+    if bin_size <= 0:
+        raise ValueError(f"Padding of {padding} pixels leaves no room in a {resolution} pixel texture")
+
+    def attempt(scale):
+        sizes = np.maximum(np.ceil(extents * scale), 1).astype(int) + padding
+        return pack_rectangles([tuple(size) for size in sizes.tolist()], bin_size)
+
+    # The shells can not cover more than the whole texture, start the bisection there
+    area = float(np.sum(extents[:, 0] * extents[:, 1]))
+    high = bin_size / np.sqrt(area) if area > 0 else float(bin_size)
+    high = min(high, bin_size / max(float(extents.max()), 1e-12))
+    low = 0.0
+    positions = attempt(low)
+    if positions is None:
+        raise ValueError(f"{len(extents)} shells do not fit a {resolution} pixel texture with {padding} pixels padding")
+    while high - low > high * SCALE_PRECISION:
+        middle = (low + high) / 2.0
+        result = attempt(middle)
+        if result is None:
+            high = middle
+        else:
+            low, positions = middle, result
+    return low, np.asarray(positions, dtype=np.float64) + padding, rotated
+
+def lightmap_uvs(us, vs, uv_counts, uv_ids, resolution=512, padding=4, rotate=True):
+    """
+    Packs the shells of a UV set into the 0-1 square.
+
+    :return: us, vs of the packed set, the face assignment is the one of the input.
+    """
+    us = np.asarray(us, dtype=np.float64)
+    vs = np.asarray(vs, dtype=np.float64)
+    uv_shell, face_shell, shell_count = uv_overlap.uv_shells(uv_counts, uv_ids, len(us))
+    if not shell_count:
+        return us, vs
+    shell_min = np.stack([np.full(shell_count, np.inf), np.full(shell_count, np.inf)], axis=1)
+    shell_max = -shell_min
+    uvs = np.stack([us, vs], axis=1)
+    np.minimum.at(shell_min, uv_shell, uvs)
+    np.maximum.at(shell_max, uv_shell, uvs)
+
+    scale, positions, rotated = pack_shells(shell_max - shell_min, resolution, padding, rotate)
+    local = (uvs - shell_min[uv_shell]) * scale
+    turned = rotated[uv_shell]
+    # A rotated shell turns a quarter clockwise: u takes v, v takes the flipped u
+    width = (shell_max - shell_min)[uv_shell, 0] * scale
+    local = np.where(turned[:, None], np.stack([local[:, 1], width - local[:, 0]], axis=1), local)
+    packed = (local + positions[uv_shell]) / resolution
+    return packed[:, 0], packed[:, 1]
+
+def pack_lightmaps(shapes, resolution=512, padding=4, uv_set=LIGHTMAP_UV_SET, source_uv_set=None, rotate=True):
+    """
+    Writes a packed lightmap UV set on every mesh shape.
+
+    :param shapes: Mesh shapes.
+    :param resolution: Lightmap size in pixels.
+    :param padding: Pixels around every shell.
+    :param uv_set: Name of the UV set to write, it is created when missing.
+    :param source_uv_set: UV set whose shells are packed, the current set by default.
+    :return: The shapes that got a lightmap set.
+    """
+    packed = []
+    for shape in shapes:
+        source = mesh_io.read_uv_set(shape, source_uv_set)
+        if source is None or not len(source.us):
+            cmds.warning(f"{shape} has no UVs to pack, box map it first.")
+            continue
+        us, vs = lightmap_uvs(source.us, source.vs, source.uv_counts, source.uv_ids, resolution, padding, rotate)
+        mesh_io.write_uvs(shape, [UVSetData(uv_set, us.tolist(), vs.tolist(), source.uv_counts, source.uv_ids)])
+        packed.append(shape)
+    return packed
+
+def pack_lightmap_selection(resolution=512, padding=4, uv_set=LIGHTMAP_UV_SET):
+    """Packs a lightmap UV set on every mesh of the selection."""
+    start = time.perf_counter()
+    shapes = pack_lightmaps(mesh_io.selected_mesh_shapes(), resolution, padding, uv_set)
+    print(f"Lightmap UV set '{uv_set}' packed on {len(shapes)} meshes at {resolution}px with {padding}px padding "
+          f"in {time.perf_counter() - start:.3f}s.")
+    return shapes
+
+def benchmark_pack(resolution=512, padding=4, repeat=3):
+    """
+    Times pack_lightmaps against polyLayoutUV on copies of the selected meshes.
+
+    :return: Best time in seconds of each path.
+    """
+    original_selection = cmds.ls(selection=True, long=True)
+    shapes = mesh_io.selected_mesh_shapes()
+    transforms = list(dict.fromkeys(cmds.listRelatives(shapes, parent=True, fullPath=True) or []))
+    if not transforms:
+        cmds.warning("Select the meshes to benchmark.")
+        return {}
+
+    def layout(copy_shapes):
+        for shape in copy_shapes:
+            cmds.polyLayoutUV(shape, scale=1, layout=2, percentageSpace=padding * 100.0 / resolution)
+
+    results = {}
+    for label, run in (('polyLayoutUV', layout), ('skyline', lambda copy_shapes: pack_lightmaps(
+            copy_shapes, resolution, padding, uv_set=mesh_io.current_uv_set(copy_shapes[0])))):
+        timings = []
+        for _ in range(repeat):
+            copies = cmds.duplicate(transforms)
+            copy_shapes = cmds.ls(copies, dag=True, type='mesh', noIntermediate=True, long=True)
+            start = time.perf_counter()
+            run(copy_shapes)
+            timings.append(time.perf_counter() - start)
+            cmds.delete(copies)
+        results[label] = min(timings)
+
+    cmds.select(original_selection, replace=True)
+    print(f"Packing {len(shapes)} meshes: polyLayoutUV {results['polyLayoutUV']:.3f}s, "
+          f"skyline {results['skyline']:.3f}s")
+    return results
@@ -0,0 +1,193 @@
+import time
+import numpy as np
+import maya.cmds as cmds
+import mesh_io
+import mesh_fingerprint
+import task_runner
+from mesh_data import UVSetData
+from mesh_cleanup import face_normals
+
+# Triplanar box mapping for the UV ToolKit. Points and topology of the whole selection
+# are read in bulk, the projection axis and world scale UVs of every face are computed
+# in one NumPy pass and each mesh gets its UVs back with a single bulk set. As a
+# panel task the meshes are mapped in chunks, see box_map_steps.
+
+BOX_MAP_CHUNK = 32  # Meshes per step when box mapping as a task
+
+def box_map_uvs(points, counts, connects, scale=(1.0, 1.0, 1.0)):
+    """
+    Computes triplanar box mapped UVs.
+
+    Each face is projected along the world axis its normal points to the most, one
+    UV tile covers scale world units on each axis. Corners share a uv when they share
+    a vertex and a projection plane, so every projection plane forms its own shells.
+
+    :param points: (N, 3) array of world space points, in centimeters like the API reads them.
+    :param counts: Vertex count of every face.
+    :param connects: Vertex ids of every face, face after face.
+    :param scale: Centimeters per UV tile along X, Y and Z.
+    :return: us, vs, uv_counts, uv_ids
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    connects = np.asarray(connects, dtype=np.int64)
+    normals = face_normals(points, counts, connects)
+    axis = np.argmax(np.abs(normals), axis=1)
+    positive = normals[np.arange(len(normals)), axis] >= 0
+
+    face_of_corner = np.repeat(np.arange(len(counts)), counts)
+    corner_axis = axis[face_of_corner]
+    corner_positive = positive[face_of_corner]
+    sign = np.where(corner_positive, 1.0, -1.0)
+    x, y, z = (points[connects] / np.asarray(scale, dtype=np.float64)).T
+
+    # Looking down each axis: +X sees -Z to the right, +Y sees -Z upwards, +Z sees +X to the right
+    u = np.select([corner_axis == 0, corner_axis == 1], [-sign * z, x], sign * x)
+    v = np.select([corner_axis == 0, corner_axis == 1], [y, -sign * z], y)
+
+    keys = connects * 6 + corner_axis * 2 + corner_positive
+    _, first, uv_ids = np.unique(keys, return_index=True, return_inverse=True)
+    return u[first], v[first], counts, uv_ids.reshape(-1)
+
+def box_map_meshes(shapes, scale=(1.0, 1.0, 1.0), incremental=False):
+    """
+    Box maps the current UV set of several mesh shapes in one NumPy pass.
+
+    :param shapes: Mesh shapes.
+    :param scale: World units per UV tile along X, Y and Z, in the scene linear unit.
+    :param incremental: Skip the meshes whose geometry, scale and UVs did not change
+        since they were last box mapped, see mesh_fingerprint.
+    :return: The shapes that were skipped.
+    """
+    return task_runner.run_blocking(box_map_steps(shapes, scale, incremental, chunk_size=None))
+
+def box_map_steps(shapes, scale=(1.0, 1.0, 1.0), incremental=False, chunk_size=BOX_MAP_CHUNK):
+    """
+    Step generator of box_map_meshes for task_runner, chunk_size meshes per step.
+
+    Meshes are read and written on the main thread, the UV math of every chunk runs
+    on a worker thread. chunk_size None maps all meshes in one pass. A mesh that gets
+    new UVs loses its construction history, which would overwrite them; meshes with
+    deformers are skipped with a warning instead.
+    """
+    store = mesh_fingerprint.get_store()
+    # The points are read in centimeters, the scale comes in the scene unit
+    scale = tuple(mesh_io.ui_to_internal(float(value)) for value in scale)
+    settings = scale
+    chunk_size = chunk_size or max(len(shapes), 1)
+    skipped = []
+    for chunk_start in range(0, len(shapes), chunk_size):
+        chunk = shapes[chunk_start:chunk_start + chunk_size]
+        mapped, meshes, fingerprints, histories = [], [], [], []
+        for shape in chunk:
+            history, deformed = mesh_io.read_history(shape)
+            if deformed:
+                cmds.warning(f"{shape} has deformers that box mapping would delete, it is skipped.")
+                skipped.append(shape)
+                continue
+            mesh = mesh_io.read_mesh(shape, with_uvs=False)
+            fingerprint = mesh_fingerprint.geometry_fingerprint(mesh)
+            if incremental:
+                current = mesh_io.read_uv_set(shape)
+                if current is not None and store.is_current('box_map', shape, fingerprint, settings,
+                                                            mesh_fingerprint.uv_fingerprint(current)):
+                    skipped.append(shape)
+                    continue
+            mapped.append(shape)
+            meshes.append(mesh)
+            fingerprints.append(fingerprint)
+            histories.append(history)
+        if meshes:
+            uv_sets = yield task_runner.Compute(box_map_uv_sets, meshes, scale)
+            for shape, uv_set, fingerprint, history in zip(mapped, uv_sets, fingerprints, histories):
+                mesh_io.bake_history(shape, history)
+                uv_set.name = mesh_io.current_uv_set(shape)
+                mesh_io.write_uvs(shape, [uv_set])
+                store.record('box_map', shape, fingerprint, settings, mesh_fingerprint.uv_fingerprint(uv_set))
+        yield chunk_start + len(chunk), len(shapes)
+    return skipped
+
+def box_map_uv_sets(meshes, scale=(1.0, 1.0, 1.0)):
+    """Box maps several MeshData in one NumPy pass, returns one unnamed UVSetData per mesh."""
+    vertex_offsets = np.cumsum([0] + [mesh.num_vertices for mesh in meshes])
+    corner_offsets = np.cumsum([0] + [len(mesh.connects) for mesh in meshes])
+    points = np.concatenate([np.frombuffer(mesh.points, dtype=np.float64) for mesh in meshes]).reshape(-1, 3)
+    counts = np.concatenate([np.frombuffer(mesh.counts, dtype=np.int32) for mesh in meshes])
+    connects = np.concatenate([np.frombuffer(mesh.connects, dtype=np.int32).astype(np.int64) + offset
+                               for mesh, offset in zip(meshes, vertex_offsets)])
+
+    us, vs, counts, uv_ids = box_map_uvs(points, counts, connects, scale)
+
+    # uv ids are sorted by vertex id, so the uvs of every mesh form one contiguous block
+    uv_vertex = np.empty(len(us), dtype=np.int64)
+    uv_vertex[uv_ids] = connects
+    uv_offsets = np.searchsorted(uv_vertex, vertex_offsets)
+    uv_sets = []
+    face_offset = 0
+    for i, mesh in enumerate(meshes):
+        start, end = uv_offsets[i], uv_offsets[i + 1]
+        uv_sets.append(UVSetData(None, us[start:end].tolist(), vs[start:end].tolist(),
+                                 counts[face_offset:face_offset + mesh.num_faces].tolist(),
+                                 (uv_ids[corner_offsets[i]:corner_offsets[i + 1]] - start).tolist()))
+        face_offset += mesh.num_faces
+    return uv_sets
+
+def box_map_selection(scale=(1.0, 1.0, 1.0), incremental=True):
+    """
+    Box maps every mesh of the current selection, returns the mapped shapes.
+
+    With incremental, meshes unchanged since their last box map with the same scale
+    are skipped and reported, like the meshes with deformers.
+    """
+    return task_runner.run_blocking(box_map_selection_steps(scale, incremental, chunk_size=None))
+
+def box_map_selection_steps(scale=(1.0, 1.0, 1.0), incremental=True, chunk_size=BOX_MAP_CHUNK, selection=None):
+    """
+    Step generator of box_map_selection.
+
+    :param selection: The selection when the task was asked for, see
+        mesh_io.selected_mesh_shapes; read when the task starts when None.
+    """
+    shapes = mesh_io.selected_mesh_shapes(selection)
+    skipped = yield from box_map_steps(shapes, scale, incremental, chunk_size)
+    if skipped:
+        print(f"Skipped {len(skipped)} unchanged or deformed meshes: {', '.join(skipped[:10])}"
+              f"{' ...' if len(skipped) > 10 else ''}")
+    skipped = set(skipped)
+    return [shape for shape in shapes if shape not in skipped]
+
+def auto_projection_box_map(objects, scale=(1.0, 1.0, 1.0)):
+    """The former box map path, one polyAutoProjection per object. Kept for benchmarking."""
+    sx, sy, sz = scale
+    for obj in objects:
+        cmds.polyAutoProjection(obj, lm=0, cm=0, l=0, sc=1, o=1, p=6, ps=0.2, ws=1, sx=sx, sy=sy, sz=sz, ch=False)
+
+def benchmark_box_map(scale=(4.0, 4.0, 4.0), repeat=3):
+    """
+    Times the NumPy box map against polyAutoProjection on copies of the selected meshes.
+
+    :return: Best time in seconds of each path.
+    """
+    original_selection = cmds.ls(selection=True, long=True)
+    shapes = mesh_io.selected_mesh_shapes()
+    transforms = list(dict.fromkeys(cmds.listRelatives(shapes, parent=True, fullPath=True) or []))
+    if not transforms:
+        cmds.warning("Select the meshes to benchmark.")
+        return {}
+
+    results = {}
+    for label, run in (('polyAutoProjection', auto_projection_box_map), ('numpy', box_map_meshes)):
+        timings = []
+        for _ in range(repeat):
+            copies = cmds.duplicate(transforms)
+            copy_shapes = cmds.ls(copies, dag=True, type='mesh', noIntermediate=True, long=True)
+            start = time.perf_counter()
+            run(copy_shapes, scale)
+            timings.append(time.perf_counter() - start)
+            cmds.delete(copies)
+        results[label] = min(timings)
+
+    cmds.select(original_selection, replace=True)
+    faces = sum(cmds.polyEvaluate(shape, face=True) for shape in shapes)
+    print(f"Box map of {len(shapes)} meshes / {faces} faces: "
+          f"polyAutoProjection {results['polyAutoProjection']:.3f}s, numpy {results['numpy']:.3f}s")
+    return results
@@ -0,0 +1,44 @@
+# Headless Voxel Slice, run with mayapy:
+#
+#     mayapy voxel_slice_batch.py --grid-size 0.25 --workers 8 wall_kit.mb floor_kit.mb
+#
+# Every mesh of each scene is sliced with the plane math spread over a process pool,
+# then the scene is saved in place (or into --output-dir).
+
+import argparse
+import os
+
+def slice_scene(scene_path, grid_size, max_workers=None, output_dir=None, weld=True):
+    import maya.cmds as cmds
+    import grid_slice
+
+    cmds.file(scene_path, open=True, force=True)
+    meshes = cmds.ls(type='mesh', noIntermediate=True, long=True) or []
+    transforms = sorted(set(cmds.listRelatives(meshes, parent=True, fullPath=True) or []))
+    cmds.select(transforms, replace=True)
+    grid_slice.grid_slice(grid_size, parallel=True, max_workers=max_workers, weld=weld)
+
+    if output_dir:
+        cmds.file(rename=os.path.join(output_dir, os.path.basename(scene_path)))
+    cmds.file(save=True, force=True)
+    print(f"Sliced {len(transforms)} meshes in '{scene_path}'.")
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Voxel Slice every mesh of the given Maya scenes.')
+    parser.add_argument('scenes', nargs='+', help='Maya scene files')
+    parser.add_argument('--grid-size', type=float, default=1.0, help='distance between two cut planes')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--output-dir', default=None, help='save sliced scenes here instead of in place')
+    parser.add_argument('--no-weld', action='store_true', help='skip the weld and degenerate face cleanup')
+    options = parser.parse_args(args)
+
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    try:
+        for scene_path in options.scenes:
+            slice_scene(scene_path, options.grid_size, options.workers, options.output_dir, not options.no_weld)
+    finally:
+        maya.standalone.uninitialize()
+
+if __name__ == '__main__':
+    main()
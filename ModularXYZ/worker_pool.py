@@ -0,0 +1,32 @@
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Process pools for the pure computation engines. Inside an interactive Maya session
+# sys.executable is the Maya GUI binary, so workers are started with mayapy instead.
+
+def mayapy_executable():
+    """Returns the Python interpreter worker processes should be started with."""
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith('mayapy') or 'maya' not in name:
+        return sys.executable
+    maya_location = os.environ.get('MAYA_LOCATION')
+    if maya_location:
+        candidate = os.path.join(maya_location, 'bin', 'mayapy.exe' if os.name == 'nt' else 'mayapy')
+        if os.path.exists(candidate):
+            return candidate
+    return sys.executable
+
+def worker_count(jobs, max_workers=None):
+    """Number of workers for a batch of jobs, leaving one core to Maya by default."""
+    if max_workers is None:
+        max_workers = max((os.cpu_count() or 1) - 1, 1)
+    return max(min(jobs, max_workers), 1)
+
+def create_process_pool(max_workers, initializer=None, initargs=()):
+    """Creates a spawn based ProcessPoolExecutor that runs on mayapy, initializer runs once per worker."""
+    context = multiprocessing.get_context('spawn')
+    context.set_executable(mayapy_executable())
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=initializer,
+                               initargs=initargs)
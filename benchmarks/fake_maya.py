@@ -0,0 +1,1306 @@
+"""
+Headless, recordable stand-in for maya.cmds and the part of maya.api.OpenMaya used by ModularXYZ.
+
+The fake keeps an in-memory scene (meshes, materials, shading groups, file nodes,
+selection and grid state) and counts every command and API call, so the toolkit
+can be timed outside of Maya.
+
+    fake = fake_maya.install()
+    fake.new_scene()
+    fake.scene.add_box_mesh('wall1', divisions=8)
+    import UVboxmap
+"""
+
+import re
+import sys
+import copy
+import time
+import types
+import threading
+from collections import Counter
+
+MATERIAL_TYPES = {'lambert', 'blinn', 'phong', 'standardSurface', 'aiStandardSurface', 'surfaceShader'}
+DAG_TYPES = {'transform', 'mesh', 'locator', 'camera'}
+WHOLE = None
+
+_COMPONENT = re.compile(r'^(?P<node>[^.]+)\.(?P<kind>\w+)\[(?P<start>\d+)(?::(?P<end>\d+))?\]$')
+
+
+def short_name(name):
+    return name.split('|')[-1]
+
+
+class FakeNode(object):
+
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.attrs = {}
+        self.translate = [0.0, 0.0, 0.0]
+        # Mesh shapes only
+        self.points = []
+        self.counts = []
+        self.connects = []
+        self.uv_sets = {}
+        self.current_uv_set = 'map1'
+        self.instance_parents = []  # extra transforms a shape is instanced under
+        # Shading groups only: shape name -> set of faces or WHOLE
+        self.members = {}
+
+
+class FakeScene(object):
+    """The in-memory scene."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.nodes = {}
+        self.selection = []
+        self.grid = {'spacing': 5.0, 'size': 12.0}
+        self.linear_unit = 1.0  # Centimeters per scene unit, 100.0 for a scene in meters
+        self.connections = {}  # destination plug -> source plug
+        self.node_plugs = {}  # node -> destination plugs of the connections it is part of
+        self.file_dialog_result = None
+
+    # --- naming ---------------------------------------------------------------
+
+    def unique_name(self, name):
+        base = name.rstrip('0123456789') or name
+        if name not in self.nodes:
+            return name
+        index = 1
+        while f"{base}{index}" in self.nodes:
+            index += 1
+        return f"{base}{index}"
+
+    def node(self, name):
+        return self.nodes.get(short_name(name.split('.', 1)[0]))
+
+    def long_name(self, name):
+        node = self.node(name)
+        if node is None or name.startswith('|'):
+            return name
+        path = ''
+        while node is not None:
+            if node.type in ('transform', 'mesh'):
+                path = '|' + node.name + path
+            else:
+                return node.name
+            node = self.nodes.get(node.parent) if node.parent else None
+        return path
+
+    def children(self, name):
+        return [node for node in self.nodes.values() if node.parent == name or name in node.instance_parents]
+
+    def descendants(self, name):
+        result = []
+        for child in self.children(name):
+            result.append(child)
+            result.extend(self.descendants(child.name))
+        return result
+
+    def transform_of(self, shape):
+        return self.nodes[shape.parent] if shape.parent else shape
+
+    def world_translate(self, shape):
+        """Sum of the translations of the transforms above a shape, the fake has no rotation or scale."""
+        total = [0.0, 0.0, 0.0]
+        node = self.transform_of(shape)
+        while node is not None:
+            total = [t + n for t, n in zip(total, node.translate)]
+            node = self.nodes.get(node.parent) if node.parent else None
+        return total
+
+    def moved(self, transform):
+        """Fires the world matrix callbacks of a transform and the shapes under it."""
+        for node in [transform] + self.children(transform.name):
+            self.recorder.fire_node('world_matrix', node.name, FakeMObject(self, node.name), 0)
+
+    # --- building -------------------------------------------------------------
+
+    def create_node(self, name, node_type, parent=None):
+        name = self.unique_name(name)
+        node = FakeNode(name, node_type, parent)
+        self.nodes[name] = node
+        self.recorder.fire('node_added', FakeMObject(self, name))
+        return node
+
+    def add_mesh(self, name, points, counts, connects, translate=(0.0, 0.0, 0.0), uvs=None):
+        transform = self.create_node(name, 'transform')
+        transform.translate = list(translate)
+        shape = self.create_node(transform.name + 'Shape', 'mesh', parent=transform.name)
+        shape.points, shape.counts, shape.connects = list(points), list(counts), list(connects)
+        if uvs:
+            shape.uv_sets['map1'] = uvs
+        else:
+            shape.uv_sets['map1'] = {'us': [], 'vs': [], 'uv_counts': [0] * len(counts), 'uv_ids': []}
+        return transform.name, shape.name
+
+    def add_box_mesh(self, name, divisions=4, size=2.0, translate=(0.0, 0.0, 0.0)):
+        points, counts, connects = box_mesh(divisions, size)
+        return self.add_mesh(name, points, counts, connects, translate)
+
+    def add_material(self, name, material_type='lambert'):
+        material = self.create_node(name, material_type)
+        shading_group = self.create_node(material.name + 'SG', 'shadingEngine')
+        self.connect(material.name + '.outColor', shading_group.name + '.surfaceShader')
+        return material.name, shading_group.name
+
+    def connect(self, source, destination):
+        previous = self.connections.get(destination)
+        if previous == source:
+            return
+        if previous:
+            self.disconnect(previous, destination)
+        self.connections[destination] = source
+        for plug in (source, destination):
+            self.node_plugs.setdefault(plug.split('.', 1)[0], set()).add(destination)
+        self.recorder.fire('connection', FakePlug(self, source), FakePlug(self, destination), True)
+
+    def disconnect(self, source, destination):
+        if self.connections.get(destination) == source:
+            del self.connections[destination]
+            for plug in (source, destination):
+                self.node_plugs.get(plug.split('.', 1)[0], set()).discard(destination)
+            self.recorder.fire('connection', FakePlug(self, source), FakePlug(self, destination), False)
+
+    def node_connections(self, node_name):
+        """Returns the (destination plug, source plug) connections a node is part of."""
+        return [(destination, self.connections[destination])
+                for destination in sorted(self.node_plugs.get(node_name, ()))]
+
+    def reindex_connections(self):
+        self.node_plugs = {}
+        for destination, source in self.connections.items():
+            for plug in (source, destination):
+                self.node_plugs.setdefault(plug.split('.', 1)[0], set()).add(destination)
+
+    # --- shading --------------------------------------------------------------
+
+    def shading_groups(self):
+        return [node for node in self.nodes.values() if node.type == 'shadingEngine']
+
+    def assign(self, shading_group, members):
+        """Mimics sets -forceElement: members leave every other shading group."""
+        for member in members:
+            shape, faces = self.parse_member(member)
+            if shape is None:
+                continue
+            for other in self.shading_groups():
+                if other.name != shading_group and shape.name in other.members:
+                    self._remove_faces(other, shape, faces)
+            group = self.nodes[shading_group]
+            joined = shape.name not in group.members
+            current = group.members.get(shape.name, set())
+            if faces is WHOLE or current is WHOLE:
+                group.members[shape.name] = WHOLE
+            else:
+                group.members[shape.name] = current | faces
+            if joined:
+                self.recorder.fire('connection', FakePlug(self, shape.name + '.instObjGroups[0]'),
+                                   FakePlug(self, group.name + '.dagSetMembers[0]'), True)
+
+    def _remove_faces(self, group, shape, faces):
+        current = group.members[shape.name]
+        if faces is WHOLE:
+            remaining = set()
+        elif current is WHOLE:
+            remaining = set(range(len(shape.counts))) - faces
+        else:
+            remaining = current - faces
+        if remaining:
+            group.members[shape.name] = remaining
+        else:
+            del group.members[shape.name]
+            self.recorder.fire('connection', FakePlug(self, shape.name + '.instObjGroups[0]'),
+                               FakePlug(self, group.name + '.dagSetMembers[0]'), False)
+
+    def parse_member(self, member):
+        """Returns (mesh shape node, set of faces or WHOLE) for an object or face component."""
+        match = _COMPONENT.match(short_name(member) if '.' not in member else member.split('|')[-1])
+        if match:
+            if match.group('kind') != 'f':
+                return None, None
+            shape = self.mesh_shape(match.group('node'))
+            start = int(match.group('start'))
+            end = int(match.group('end') or start)
+            return shape, set(range(start, end + 1))
+        return self.mesh_shape(member), WHOLE
+
+    def mesh_shape(self, name):
+        node = self.node(name)
+        if node is None:
+            return None
+        if node.type == 'mesh':
+            return node
+        shapes = [child for child in self.children(node.name) if child.type == 'mesh']
+        return shapes[0] if shapes else None
+
+    def member_strings(self, group):
+        members = []
+        for shape_name, faces in group.members.items():
+            shape = self.nodes[shape_name]
+            if faces is WHOLE:
+                members.append(shape.name)
+                continue
+            transform = self.transform_of(shape).name
+            for start, end in _ranges(faces):
+                members.append(f"{transform}.f[{start}:{end}]" if end != start else f"{transform}.f[{start}]")
+        return members
+
+    def face_shading(self, shape):
+        groups, indices = [], [-1] * len(shape.counts)
+        for group in self.shading_groups():
+            faces = group.members.get(shape.name, set())
+            if faces == set():
+                continue
+            index = len(groups)
+            groups.append(group.name)
+            for face in (range(len(shape.counts)) if faces is WHOLE else faces):
+                indices[face] = index
+        return groups, indices
+
+    # --- geometry -------------------------------------------------------------
+
+    def world_points(self, shape):
+        tx, ty, tz = self.world_translate(shape)
+        pts = shape.points
+        return [(pts[i] + tx, pts[i + 1] + ty, pts[i + 2] + tz) for i in range(0, len(pts), 3)]
+
+
+def box_mesh(divisions=4, size=2.0):
+    """Points, counts and connects of a box whose six sides are divisions x divisions quads."""
+    points, counts, connects = [], [], []
+    half = size / 2.0
+    step = size / divisions
+    for axis in range(3):
+        for sign in (-1.0, 1.0):
+            base = len(points) // 3
+            for i in range(divisions + 1):
+                for j in range(divisions + 1):
+                    point = [0.0, 0.0, 0.0]
+                    point[axis] = sign * half
+                    point[(axis + 1) % 3] = -half + i * step
+                    point[(axis + 2) % 3] = -half + j * step
+                    points.extend(point)
+            for i in range(divisions):
+                for j in range(divisions):
+                    a = base + i * (divisions + 1) + j
+                    quad = [a, a + divisions + 1, a + divisions + 2, a + 1]
+                    counts.append(4)
+                    connects.extend(quad if sign > 0 else quad[::-1])
+    return points, counts, connects
+
+
+def _ranges(indices):
+    ranges = []
+    for index in sorted(indices):
+        if ranges and index == ranges[-1][1] + 1:
+            ranges[-1][1] = index
+        else:
+            ranges.append([index, index])
+    return ranges
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+# --- maya.cmds --------------------------------------------------------------------
+
+class FakeCmds(object):
+    """Implementations of the maya.cmds commands used by ModularXYZ."""
+
+    def __init__(self, fake):
+        self.fake = fake
+
+    @property
+    def scene(self):
+        return self.fake.scene
+
+    def ls(self, *args, selection=False, sl=False, long=False, type=None, objectsOnly=False, dag=False,
+           noIntermediate=False, materials=False, flatten=False, uuid=False, showType=False, defaultNodes=False,
+           referencedNodes=False, **kwargs):
+        scene = self.scene
+        if selection or sl:
+            items = list(scene.selection)
+        elif args:
+            items = _as_list(args[0])
+        else:
+            items = [node.name for node in scene.nodes.values()]
+
+        if objectsOnly:
+            items = [scene.node(item).name for item in items if scene.node(item)]
+        if dag and args:
+            expanded = []
+            for item in items:
+                node = scene.node(item)
+                if node is not None:
+                    expanded.append(node.name)
+                    expanded.extend(child.name for child in scene.descendants(node.name))
+            items = expanded
+        if flatten:
+            flat = []
+            for item in items:
+                match = _COMPONENT.match(item.split('|')[-1])
+                if match and match.group('end'):
+                    node = item.rsplit('.', 1)[0]
+                    for index in range(int(match.group('start')), int(match.group('end')) + 1):
+                        flat.append(f"{node}.{match.group('kind')}[{index}]")
+                else:
+                    flat.append(item)
+            items = flat
+        if defaultNodes or referencedNodes:
+            # The fake scene has neither default nor referenced nodes
+            return []
+        types_wanted = set(_as_list(type))
+        if 'dagNode' in types_wanted:
+            types_wanted |= DAG_TYPES
+        if types_wanted or materials:
+            filtered = []
+            for item in items:
+                node = scene.node(item)
+                if node is None or '.' in item.split('|')[-1]:
+                    continue
+                if (types_wanted and node.type in types_wanted) or (materials and node.type in MATERIAL_TYPES):
+                    filtered.append(item)
+            items = filtered
+        if uuid:
+            return [f"uuid-{scene.node(item).name}" for item in items if scene.node(item)]
+        if showType:
+            return [value for item in dict.fromkeys(items) if scene.node(item)
+                    for value in (item, scene.node(item).type)]
+        if long:
+            items = [scene.long_name(item) if '.' not in item.split('|')[-1] else
+                     scene.long_name(item.rsplit('.', 1)[0]) + '.' + item.rsplit('.', 1)[1] for item in items]
+        return list(dict.fromkeys(items))
+
+    def listRelatives(self, nodes=None, shapes=False, children=False, parent=False, fullPath=False,
+                      noIntermediate=False, type=None, allDescendents=False, allParents=False, **kwargs):
+        scene = self.scene
+        result = []
+        for name in _as_list(nodes):
+            node = scene.node(name)
+            if node is None:
+                continue
+            if parent:
+                related = [scene.nodes[node.parent]] if node.parent else []
+            elif allParents:
+                related = [scene.nodes[name] for name in [node.parent] + node.instance_parents if name]
+            elif allDescendents:
+                related = scene.descendants(node.name)
+            else:
+                related = scene.children(node.name)
+                if shapes:
+                    related = [child for child in related if child.type == 'mesh']
+            if type:
+                related = [child for child in related if child.type in _as_list(type)]
+            if fullPath and not (parent or allParents) and name.startswith('|'):
+                # Keep instance paths: children are listed under the path that was given
+                result.extend(f"{name}|{child.name}" for child in related)
+            else:
+                result.extend(scene.long_name(child.name) if fullPath else child.name for child in related)
+        return list(dict.fromkeys(result)) or None
+
+    def objectType(self, name, isType=None):
+        node = self.scene.node(name)
+        if node is None:
+            raise RuntimeError(f"No object matches name: {name}")
+        return node.type == isType if isType else node.type
+
+    def objExists(self, name):
+        node = self.scene.node(name)
+        if node is not None and '.' in name.split('|')[-1]:
+            return name.split('.', 1)[1] in node.attrs
+        return node is not None
+
+    def listHistory(self, *args, **kwargs):
+        return []
+
+    def delete(self, *nodes, constructionHistory=False, **kwargs):
+        if constructionHistory:
+            return
+        shading_groups = None
+        for name in [item for group in nodes for item in _as_list(group)]:
+            node = self.scene.node(name)
+            if node is None:
+                continue
+            # Only DAG nodes have children and set memberships
+            dag = node.type in DAG_TYPES
+            for doomed in [node] + (self.scene.descendants(node.name) if dag else []):
+                self.scene.nodes.pop(doomed.name, None)
+                for destination, source in self.scene.node_connections(doomed.name):
+                    self.scene.disconnect(source, destination)
+                if dag:
+                    shading_groups = shading_groups or self.scene.shading_groups()
+                    for group in shading_groups:
+                        group.members.pop(doomed.name, None)
+                self.fake.recorder.fire('node_removed', FakeMObject(self.scene, doomed.name, doomed.type))
+
+    def select(self, items=None, replace=True, clear=False, add=False, **kwargs):
+        if clear:
+            self.scene.selection = []
+        elif add:
+            self.scene.selection.extend(_as_list(items))
+        else:
+            self.scene.selection = _as_list(items)
+
+    def sets(self, *members, query=False, edit=False, forceElement=None, renderable=False,
+             noSurfaceShader=False, empty=False, name=None, size=False, **kwargs):
+        scene = self.scene
+        if query:
+            group = scene.node(members[0])
+            return scene.member_strings(group) or None
+        if edit and forceElement:
+            scene.assign(scene.node(forceElement).name, [item for group in members for item in _as_list(group)])
+            return None
+        return scene.create_node(name or 'set', 'shadingEngine' if renderable else 'objectSet').name
+
+    def listSets(self, object=None, type=None, **kwargs):
+        scene = self.scene
+        shape, faces = scene.parse_member(object)
+        if shape is None:
+            return None
+        groups = []
+        for group in scene.shading_groups():
+            group_faces = group.members.get(shape.name, set())
+            if group_faces is WHOLE or faces is WHOLE and group_faces or (faces and group_faces & faces):
+                groups.append(group.name)
+        return groups or None
+
+    def listConnections(self, items, type=None, source=True, destination=True, connections=False,
+                        plugs=False, **kwargs):
+        scene = self.scene
+        result = []
+        for item in _as_list(items):
+            node_name = short_name(item.split('.', 1)[0])
+            attribute = item.split('.', 1)[1] if '.' in item else None
+            found = []  # (plug on this node, plug on the other node)
+            for destination_plug, source_plug in scene.node_connections(node_name):
+                if source and destination_plug.split('.', 1)[0] == node_name and \
+                        (attribute is None or destination_plug.split('.', 1)[1] == attribute):
+                    found.append((destination_plug, source_plug))
+                if destination and source_plug.split('.', 1)[0] == node_name and \
+                        (attribute is None or source_plug.split('.', 1)[1] == attribute):
+                    found.append((source_plug, destination_plug))
+            node = scene.node(node_name)
+            if node is not None and attribute is None:
+                # Set membership is tracked on the shading groups, not as plain connections
+                if node.type == 'mesh':
+                    found.extend((f"{node.name}.instObjGroups", f"{group.name}.dagSetMembers")
+                                 for group in scene.shading_groups() if node.name in group.members)
+                elif node.type == 'shadingEngine':
+                    found.extend((f"{node.name}.dagSetMembers", f"{member}.instObjGroups")
+                                 for member in node.members)
+            if type:
+                found = [pair for pair in found if scene.node(pair[1].split('.', 1)[0]) and
+                         scene.node(pair[1].split('.', 1)[0]).type in _as_list(type)]
+            for own_plug, other_plug in found:
+                other = other_plug if plugs else other_plug.split('.', 1)[0]
+                if connections:
+                    result.extend((own_plug, other))
+                else:
+                    result.append(other)
+        return result or None
+
+    def shadingNode(self, node_type, asShader=False, asTexture=False, asUtility=False, name=None, **kwargs):
+        return self.scene.create_node(name or node_type, node_type).name
+
+    def setAttr(self, plug, *values, type=None, **kwargs):
+        node_name, attribute = plug.split('.', 1)
+        node = self.scene.node(node_name)
+        if attribute == 'translate':
+            node.translate = list(values)
+            self.scene.moved(node)
+            return
+        node.attrs[attribute] = values[0] if len(values) == 1 else list(values)
+
+    def listAttr(self, node, **kwargs):
+        return sorted(self.scene.node(node).attrs) or None
+
+    def getAttr(self, plug, **kwargs):
+        node_name, attribute = plug.split('.', 1)
+        node = self.scene.node(node_name)
+        if attribute == 'translate':
+            return [tuple(node.translate)]
+        return node.attrs.get(attribute)
+
+    def connectAttr(self, source, destination, force=False, **kwargs):
+        self.scene.connect(source, destination)
+
+    def rename(self, old_name, new_name):
+        scene = self.scene
+        node = scene.node(old_name)
+        new_name = scene.unique_name(new_name)
+        del scene.nodes[node.name]
+        previous = node.name
+        node.name = new_name
+        scene.nodes[new_name] = node
+        for child in scene.children(previous):
+            child.parent = new_name
+        for group in scene.shading_groups():
+            if previous in group.members:
+                group.members[new_name] = group.members.pop(previous)
+        scene.connections = {_rename_plug(destination, previous, new_name): _rename_plug(source, previous, new_name)
+                             for destination, source in scene.connections.items()}
+        scene.reindex_connections()
+        self.fake.recorder.fire('name_changed', FakeMObject(scene, new_name), previous)
+        return new_name
+
+    def grid(self, spacing=None, size=None, query=False, **kwargs):
+        if query:
+            return self.scene.grid['spacing'] if spacing else self.scene.grid['size']
+        if spacing is not None:
+            self.scene.grid['spacing'] = spacing
+        if size is not None:
+            self.scene.grid['size'] = size
+
+    def polyEvaluate(self, name, uv=False, face=False, vertex=False, **kwargs):
+        shape = self.scene.mesh_shape(name)
+        if uv:
+            return len(shape.uv_sets.get(shape.current_uv_set, {}).get('us', []))
+        if face:
+            return len(shape.counts)
+        return len(shape.points) // 3
+
+    def polyAutoProjection(self, *args, **kwargs):
+        pass
+
+    def polyLayoutUV(self, *args, **kwargs):
+        pass
+
+    def polyCut(self, *args, **kwargs):
+        pass
+
+    def exactWorldBoundingBox(self, name, **kwargs):
+        points = self.scene.world_points(self.scene.mesh_shape(name))
+        xs, ys, zs = zip(*points)
+        return [min(xs), min(ys), min(zs), max(xs), max(ys), max(zs)]
+
+    def polyCube(self, name='pCube', **kwargs):
+        transform, shape = self.scene.add_box_mesh(name, divisions=1, size=1.0)
+        return [transform, 'polyCube1']
+
+    def polySphere(self, name='pSphere', **kwargs):
+        # A subdivided box has the face count of a default sphere closely enough
+        transform, shape = self.scene.add_box_mesh(name, divisions=8, size=1.0)
+        return [transform, 'polySphere1']
+
+    def group(self, *items, empty=False, name=None, world=False, parent=None, **kwargs):
+        parent = self.scene.node(parent).name if parent else None
+        return self.scene.create_node(name or 'group', 'transform', parent=parent).name
+
+    def addAttr(self, node, longName=None, dataType=None, **kwargs):
+        self.scene.node(node).attrs.setdefault(longName, None)
+
+    def instance(self, source, name=None, **kwargs):
+        node = self.scene.node(source)
+        copy = self.scene.create_node(name or node.name, 'transform', parent=node.parent)
+        copy.translate = list(node.translate)
+        copy.attrs = dict(node.attrs)
+        for child in self.scene.children(node.name):
+            child.instance_parents.append(copy.name)
+        return [copy.name]
+
+    def move(self, x, y, z, name=None, relative=False, **kwargs):
+        node = self.scene.node(name)
+        if relative:
+            node.translate = [node.translate[0] + x, node.translate[1] + y, node.translate[2] + z]
+        else:
+            node.translate = [x, y, z]
+        self.scene.moved(node)
+
+    def parent(self, child, new_parent, add=False, shape=False, **kwargs):
+        node = self.scene.node(child)
+        transform = self.scene.node(new_parent)
+        if add:
+            node.instance_parents.append(transform.name)
+        else:
+            node.parent = transform.name
+        return [f"{self.scene.long_name(transform.name)}|{node.name}"]
+
+    def xform(self, name, query=False, worldSpace=False, translation=None, matrix=False, rotatePivot=False,
+              pivots=None, **kwargs):
+        node = self.scene.node(name)
+        if query:
+            if rotatePivot:
+                # The pivot is an offset from the translation
+                return [t + p for t, p in zip(node.translate, node.attrs.get('pivot', (0.0, 0.0, 0.0)))]
+            return list(node.translate)
+        if translation is not None:
+            node.translate = list(translation)
+            self.scene.moved(node)
+        if pivots is not None:
+            node.attrs['pivot'] = tuple(p - t for p, t in zip(pivots, node.translate))
+
+    def duplicate(self, names, **kwargs):
+        copies = []
+        for name in _as_list(names):
+            node = self.scene.node(name)
+            shape = self.scene.mesh_shape(name)
+            transform, _ = self.scene.add_mesh(node.name, shape.points, shape.counts, shape.connects, node.translate)
+            copies.append(transform)
+        return copies
+
+    def undoInfo(self, *args, query=False, state=None, undoName=False, openChunk=False, closeChunk=False,
+                 chunkName='', **kwargs):
+        if query and state:
+            return self.fake.undo_enabled
+        if query and undoName:
+            return self.fake.undo_queue[-1].name if self.fake.undo_queue else ''
+        if not query and state is not None:
+            self.fake.undo_enabled = state
+        if openChunk:
+            self.fake.undo_chunks.append(FakeUndoChunk(chunkName))
+        if closeChunk and self.fake.undo_chunks:
+            chunk = self.fake.undo_chunks.pop()
+            if chunk.commands:
+                self.fake.record_undo(chunk)
+
+    def undo(self, *args, **kwargs):
+        if self.fake.undo_queue:
+            self.fake.undo_queue.pop().undoIt()
+
+    def pluginInfo(self, name, query=False, loaded=False, **kwargs):
+        return name in self.fake.plugins
+
+    def loadPlugin(self, path, quiet=False, **kwargs):
+        """Runs initializePlugin of a plugin module that is already imported."""
+        name = path.replace('\\', '/').split('/')[-1].rsplit('.', 1)[0]
+        sys.modules[name].initializePlugin(name)
+        self.fake.plugins.add(name)
+
+    def refresh(self, *args, **kwargs):
+        pass
+
+    def warning(self, message):
+        self.fake.messages.append(('warning', message))
+
+    def error(self, message):
+        self.fake.messages.append(('error', message))
+        raise RuntimeError(message)
+
+    def fileDialog2(self, *args, **kwargs):
+        return self.scene.file_dialog_result
+
+    def workspace(self, expandName=None, **kwargs):
+        return expandName
+
+    def deleteUI(self, *args, **kwargs):
+        raise RuntimeError("No UI in the fake Maya")
+
+
+def _rename_plug(plug, previous, new_name):
+    node, attribute = plug.split('.', 1)
+    return f"{new_name}.{attribute}" if node == previous else plug
+
+
+# --- maya.api.OpenMaya --------------------------------------------------------------
+
+class FakeMObject(object):
+    kNullObj = None
+
+    def __init__(self, scene, name, node_type=None):
+        self.scene = scene
+        self.name = name
+        node = scene.node(name)
+        self.type = node_type or (node.type if node else None)
+
+    def hasFn(self, kind):
+        if kind == FakeMFn.kShadingEngine:
+            return self.type == 'shadingEngine'
+        if kind == FakeMFn.kMesh:
+            return self.type == 'mesh'
+        if kind == FakeMFn.kDagNode:
+            return self.type in ('transform', 'mesh')
+        return False
+
+    def isNull(self):
+        return False
+
+
+class FakePlug(object):
+    """A plug of the fake scene, its value is the attrs entry of the node, lists are compounds."""
+
+    def __init__(self, scene, plug, value=None, child=False):
+        self.scene = scene
+        self.plug = plug
+        self._value = value
+        self._child = child
+
+    def node(self):
+        return FakeMObject(self.scene, self.plug.split('.', 1)[0])
+
+    def partialName(self, useLongNames=False, **kwargs):
+        return self.plug.split('.', 1)[1]
+
+    def value(self):
+        if self._child:
+            return self._value
+        node_name, attribute = self.plug.split('.', 1)
+        return self.scene.node(node_name).attrs.get(attribute)
+
+    @property
+    def isCompound(self):
+        return isinstance(self.value(), (list, tuple))
+
+    def numChildren(self):
+        return len(self.value())
+
+    def child(self, index):
+        return FakePlug(self.scene, f"{self.plug}{index}", self.value()[index], child=True)
+
+    def attribute(self):
+        return FakeAttribute(self.value())
+
+    def asBool(self):
+        return bool(self.value())
+
+    def asInt(self):
+        return int(self.value())
+
+    def asDouble(self):
+        return float(self.value())
+
+    def asString(self):
+        return str(self.value())
+
+
+class FakeAttribute(object):
+    """The attribute MObject of a plug, its kind follows the Python type of the value."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def hasFn(self, kind):
+        if kind == FakeMFn.kNumericAttribute:
+            return isinstance(self.value, (bool, int, float))
+        if kind == FakeMFn.kTypedAttribute:
+            return isinstance(self.value, str)
+        return False
+
+
+class FakeMFn(object):
+    kShadingEngine = 'kShadingEngine'
+    kMesh = 'kMesh'
+    kDagNode = 'kDagNode'
+    kNumericAttribute = 'kNumericAttribute'
+    kTypedAttribute = 'kTypedAttribute'
+    kEnumAttribute = 'kEnumAttribute'
+    kUnitAttribute = 'kUnitAttribute'
+
+
+class FakeMSpace(object):
+    kObject = 'kObject'
+    kWorld = 'kWorld'
+
+
+class FakeMPoint(object):
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x, self.y, self.z = x, y, z
+
+    def __mul__(self, matrix):
+        tx, ty, tz = matrix.translation
+        return FakeMPoint(self.x + tx, self.y + ty, self.z + tz)
+
+    def __sub__(self, other):
+        return FakeMPoint(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    # Sequence of x, y, z, w like the real MPoint, so NumPy can read point arrays
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, 1.0)[index]
+
+
+class FakeMeshData(object):
+    """A mesh data object filled by MFnMesh.copy, a deep copy of the fields of a mesh node."""
+    FIELDS = ('points', 'counts', 'connects', 'uv_sets', 'current_uv_set')
+
+    def __init__(self):
+        self.mesh = {}
+
+
+class FakeUndoChunk(object):
+    """Commands recorded between openChunk and closeChunk, undone as one."""
+
+    def __init__(self, name):
+        self.name = name
+        self.commands = []
+
+    def undoIt(self):
+        for command in reversed(self.commands):
+            command.undoIt()
+
+
+class FakeBoundingBox(object):
+
+    def __init__(self, low, high):
+        self.min, self.max = low, high
+
+    def transformUsing(self, matrix):
+        self.min, self.max = self.min * matrix, self.max * matrix
+        return self
+
+
+class FakeMatrix(object):
+    """Translation only, enough for the fake transforms."""
+
+    def __init__(self, translation):
+        self.translation = translation
+
+
+def _build_openmaya(fake):
+    recorder = fake.recorder
+
+    class MSelectionList(object):
+
+        def __init__(self):
+            self.items = []
+
+        def add(self, name):
+            self.items.append(name)
+
+        def getDagPath(self, index):
+            return MDagPath(fake.scene.node(self.items[index]).name)
+
+        def getDependNode(self, index):
+            return FakeMObject(fake.scene, fake.scene.node(self.items[index]).name)
+
+    class MDagPath(object):
+
+        def __init__(self, name):
+            self.name = name
+
+        def fullPathName(self):
+            return fake.scene.long_name(self.name)
+
+        def instanceNumber(self):
+            return 0
+
+        def isInstanced(self):
+            return bool(fake.scene.nodes[self.name].instance_parents)
+
+        def node(self):
+            return FakeMObject(fake.scene, self.name)
+
+        def transform(self):
+            return FakeMObject(fake.scene, fake.scene.transform_of(fake.scene.nodes[self.name]).name)
+
+        def inclusiveMatrix(self):
+            node = fake.scene.nodes[self.name]
+            return FakeMatrix(tuple(fake.scene.world_translate(node)))
+
+        def inclusiveMatrixInverse(self):
+            node = fake.scene.nodes[self.name]
+            tx, ty, tz = fake.scene.world_translate(node)
+            return FakeMatrix((-tx, -ty, -tz))
+
+    class MFnMesh(object):
+
+        def __init__(self, dag_path=None):
+            self.shape = fake.scene.mesh_shape(dag_path.name) if dag_path is not None else None
+
+        def dagPath(self):
+            return MDagPath(self.shape.name)
+
+        def copy(self, source, data):
+            shape = fake.scene.mesh_shape(source.name)
+            data.mesh = copy.deepcopy({key: getattr(shape, key) for key in FakeMeshData.FIELDS})
+            return data
+
+        def copyInPlace(self, data):
+            for key, value in copy.deepcopy(data.mesh).items():
+                setattr(self.shape, key, value)
+            recorder.fire_node('dirty', self.shape.name, FakeMObject(fake.scene, self.shape.name))
+
+        @property
+        def numColorSets(self):
+            return 0
+
+        def getCreaseEdges(self):
+            raise RuntimeError('(kFailure): No creases')
+
+        def getCreaseVertices(self):
+            raise RuntimeError('(kFailure): No creases')
+
+        def getPoints(self, space=FakeMSpace.kObject):
+            if space == FakeMSpace.kWorld:
+                return [FakeMPoint(*point) for point in fake.scene.world_points(self.shape)]
+            pts = self.shape.points
+            return [FakeMPoint(pts[i], pts[i + 1], pts[i + 2]) for i in range(0, len(pts), 3)]
+
+        def setPoints(self, points, space=FakeMSpace.kObject):
+            points = [point if isinstance(point, FakeMPoint) else FakeMPoint(*point[:3]) for point in points]
+            if space == FakeMSpace.kWorld:
+                inverse = MDagPath(self.shape.name).inclusiveMatrixInverse()
+                points = [point * inverse for point in points]
+            self.shape.points = [c for point in points for c in (point.x, point.y, point.z)]
+            recorder.fire_node('dirty', self.shape.name, FakeMObject(fake.scene, self.shape.name))
+
+        def getVertices(self):
+            return list(self.shape.counts), list(self.shape.connects)
+
+        def getUVSetNames(self):
+            return list(self.shape.uv_sets)
+
+        def currentUVSetName(self):
+            return self.shape.current_uv_set
+
+        def getUVs(self, uv_set=''):
+            data = self.shape.uv_sets[uv_set or self.shape.current_uv_set]
+            return list(data['us']), list(data['vs'])
+
+        def getAssignedUVs(self, uv_set=''):
+            data = self.shape.uv_sets[uv_set or self.shape.current_uv_set]
+            return list(data['uv_counts']), list(data['uv_ids'])
+
+        def createUVSet(self, uv_set):
+            self.shape.uv_sets[uv_set] = {'us': [], 'vs': [], 'uv_counts': [0] * len(self.shape.counts), 'uv_ids': []}
+            return uv_set
+
+        def clearUVs(self, uv_set=''):
+            data = self.shape.uv_sets[uv_set or self.shape.current_uv_set]
+            data.update(us=[], vs=[], uv_counts=[0] * len(self.shape.counts), uv_ids=[])
+
+        def setUVs(self, us, vs, uv_set=''):
+            data = self.shape.uv_sets[uv_set or self.shape.current_uv_set]
+            data['us'], data['vs'] = list(us), list(vs)
+
+        def assignUVs(self, uv_counts, uv_ids, uv_set=''):
+            data = self.shape.uv_sets[uv_set or self.shape.current_uv_set]
+            data['uv_counts'], data['uv_ids'] = list(uv_counts), list(uv_ids)
+
+        def createInPlace(self, points, counts, connects):
+            self.shape.points = [c for point in points for c in (point.x, point.y, point.z)]
+            self.shape.counts, self.shape.connects = list(counts), list(connects)
+            recorder.fire_node('dirty', self.shape.name, FakeMObject(fake.scene, self.shape.name))
+            for uv_set in self.shape.uv_sets.values():
+                uv_set.update(us=[], vs=[], uv_counts=[0] * len(self.shape.counts), uv_ids=[])
+            return self
+
+        def updateSurface(self):
+            pass
+
+        def getConnectedShaders(self, instance):
+            groups, indices = fake.scene.face_shading(self.shape)
+            return [FakeMObject(fake.scene, group) for group in groups], indices
+
+        @property
+        def numPolygons(self):
+            return len(self.shape.counts)
+
+        @property
+        def numVertices(self):
+            return len(self.shape.points) // 3
+
+    class MFnMeshData(object):
+
+        def create(self):
+            return FakeMeshData()
+
+    class MDistance(object):
+
+        @staticmethod
+        def uiToInternal(value):
+            return value * fake.scene.linear_unit
+
+        @staticmethod
+        def internalToUI(value):
+            return value / fake.scene.linear_unit
+
+    class MPxCommand(object):
+        pass
+
+    class MFnPlugin(object):
+        """Registers commands straight into the fake maya.cmds, their undo goes to FakeMaya.undo_queue."""
+
+        def __init__(self, plugin, vendor=None, version=None):
+            self.plugin = plugin
+
+        def registerCommand(self, name, command_class):
+            def command(*args, **kwargs):
+                instance = command_class()
+                instance.doIt(args)
+                if fake.undo_enabled and instance.isUndoable():
+                    instance.name = name
+                    fake.record_undo(instance)
+            setattr(fake.cmds, name, _counted(name, command, fake.recorder.commands))
+
+        def deregisterCommand(self, name):
+            delattr(fake.cmds, name)
+
+    class MFnDependencyNode(object):
+
+        def __init__(self, mobject=None):
+            self.mobject = mobject
+
+        def name(self):
+            return self.mobject.name
+
+        @property
+        def typeName(self):
+            return self.mobject.type
+
+        @staticmethod
+        def classification(type_name):
+            return 'shader/surface' if type_name in MATERIAL_TYPES else ''
+
+        def findPlug(self, attribute, want_networked_plug):
+            return FakePlug(fake.scene, f"{self.mobject.name}.{attribute}")
+
+    class MFnNumericData(object):
+        kBoolean, kInt, kDouble = 'kBoolean', 'kInt', 'kDouble'
+        kFloat = 'kFloat'
+
+    class MFnNumericAttribute(object):
+
+        def __init__(self, attribute):
+            self.attribute = attribute
+
+        def numericType(self):
+            value = self.attribute.value
+            if isinstance(value, bool):
+                return MFnNumericData.kBoolean
+            return MFnNumericData.kInt if isinstance(value, int) else MFnNumericData.kDouble
+
+    class MFnData(object):
+        kString = 'kString'
+
+    class MFnTypedAttribute(object):
+
+        def __init__(self, attribute):
+            self.attribute = attribute
+
+        def attrType(self):
+            return MFnData.kString
+
+    class MFnDagNode(MFnDependencyNode):
+
+        def fullPathName(self):
+            return fake.scene.long_name(self.mobject.name)
+
+        def getAllPaths(self):
+            return [MDagPath(self.mobject.name)]
+
+        @property
+        def boundingBox(self):
+            pts = fake.scene.mesh_shape(self.mobject.name).points
+            xs, ys, zs = pts[0::3], pts[1::3], pts[2::3]
+            return FakeBoundingBox(FakeMPoint(min(xs), min(ys), min(zs)), FakeMPoint(max(xs), max(ys), max(zs)))
+
+    def _add(kind):
+        def add_callback(*args):
+            function = [arg for arg in args if callable(arg)][0]
+            return recorder.add_callback(kind, function)
+        return add_callback
+
+    def _add_node(kind):
+        # Node messages take the MObject or MDagPath of the node first
+        def add_callback(target, function, *args):
+            return recorder.add_callback(kind, function, target.name)
+        return add_callback
+
+    om2 = types.ModuleType('maya.api.OpenMaya')
+    om2.MSelectionList = MSelectionList
+    om2.MDagPath = MDagPath
+    om2.MFnMesh = MFnMesh
+    om2.MFnMeshData = MFnMeshData
+    om2.MDistance = MDistance
+    om2.MPxCommand = MPxCommand
+    om2.MFnPlugin = MFnPlugin
+    om2.MFnDependencyNode = MFnDependencyNode
+    om2.MFnDagNode = MFnDagNode
+    om2.MFnNumericData = MFnNumericData
+    om2.MFnNumericAttribute = MFnNumericAttribute
+    om2.MFnData = MFnData
+    om2.MFnTypedAttribute = MFnTypedAttribute
+    om2.MObject = FakeMObject
+    om2.MFn = FakeMFn
+    om2.MSpace = FakeMSpace
+    om2.MPoint = FakeMPoint
+    om2.MPointArray = list
+    om2.MIntArray = list
+    om2.MFloatArray = list
+    om2.MDGMessage = types.SimpleNamespace(addNodeAddedCallback=_add('node_added'),
+                                           addNodeRemovedCallback=_add('node_removed'),
+                                           addConnectionCallback=_add('connection'))
+    om2.MNodeMessage = types.SimpleNamespace(addNameChangedCallback=_add('name_changed'),
+                                             addNodeDirtyCallback=_add_node('dirty'))
+    om2.MDagMessage = types.SimpleNamespace(addWorldMatrixModifiedCallback=_add_node('world_matrix'))
+    om2.MSceneMessage = types.SimpleNamespace(addCallback=_add('scene'), kAfterOpen=1, kAfterNew=2, kAfterImport=3,
+                                              kAfterCreateReference=4, kAfterLoadReference=5,
+                                              kAfterUnloadReference=6)
+    om2.MMessage = types.SimpleNamespace(removeCallbacks=recorder.remove_callbacks)
+    return om2
+
+
+# --- recording and installation -------------------------------------------------------
+
+class Recorder(object):
+    """Counts commands and API calls and dispatches the fake callbacks."""
+
+    def __init__(self):
+        self.commands = Counter()
+        self.api_calls = Counter()
+        self.callbacks = {}
+        self._next_id = 1
+
+    def reset(self):
+        self.commands.clear()
+        self.api_calls.clear()
+
+    def add_callback(self, kind, function, node=None):
+        """Registers a callback, node limits it to the messages of one node."""
+        callback_id = self._next_id
+        self._next_id += 1
+        self.callbacks[callback_id] = (kind, function, node)
+        return callback_id
+
+    def remove_callbacks(self, callback_ids):
+        for callback_id in callback_ids:
+            self.callbacks.pop(callback_id, None)
+
+    def fire(self, kind, *args):
+        for callback_kind, function, node in list(self.callbacks.values()):
+            if callback_kind == kind and node is None:
+                function(*args, None)
+
+    def fire_node(self, kind, node_name, *args):
+        for callback_kind, function, node in list(self.callbacks.values()):
+            if callback_kind == kind and node == node_name:
+                function(*args, None)
+
+
+def _recording_module(name, target, counter):
+    """Builds a module whose public callables count each call before delegating to target."""
+    module = types.ModuleType(name)
+    for attribute in dir(target):
+        if attribute.startswith('_'):
+            continue
+        value = getattr(target, attribute)
+        if callable(value) and not isinstance(value, type):
+            setattr(module, attribute, _counted(attribute, value, counter))
+        elif isinstance(value, type):
+            setattr(module, attribute, _counted_class(attribute, value, counter))
+        else:
+            setattr(module, attribute, value)
+    return module
+
+
+def _counted(name, function, counter):
+    def wrapper(*args, **kwargs):
+        counter[name] += 1
+        return function(*args, **kwargs)
+    wrapper.__name__ = name
+    return wrapper
+
+
+def _counted_class(name, cls, counter):
+    if cls in (list, FakeMPoint):
+        return cls
+
+    class Counted(cls):
+        def __getattribute__(self, attribute):
+            value = super(Counted, self).__getattribute__(attribute)
+            if callable(value) and not attribute.startswith('_'):
+                counter[f"{name}.{attribute}"] += 1
+            return value
+
+    Counted.__name__ = cls.__name__
+    return Counted
+
+
+class FakeMaya(object):
+    """The installed fake: holds the current scene, the recorder and the fake modules."""
+
+    def __init__(self):
+        self.recorder = Recorder()
+        self.messages = []
+        self.scene = FakeScene(self.recorder)
+        self.cmds = _recording_module('maya.cmds', FakeCmds(self), self.recorder.commands)
+        self.om2 = _recording_module('maya.api.OpenMaya', _build_openmaya(self), self.recorder.api_calls)
+        self._saved_modules = {}
+        self.undo_enabled = False  # Undo is off unless a benchmark turns it on
+        self.undo_queue = []  # Commands of loaded plugins and closed chunks, cmds.undo takes the last one back
+        self.undo_chunks = []  # Open chunks, innermost last
+        self.plugins = set()
+        self.deferred = []
+        self._deferred_lock = threading.Lock()
+
+    def record_undo(self, command):
+        """Puts an undoable command into the innermost open chunk, or on the undo queue."""
+        (self.undo_chunks[-1].commands if self.undo_chunks else self.undo_queue).append(command)
+
+    def execute_deferred(self, function, *args):
+        """maya.utils.executeDeferred: queues a callable for run_idle, from any thread."""
+        with self._deferred_lock:
+            self.deferred.append((function, args))
+
+    def run_idle(self, until=None, timeout=None):
+        """
+        Runs the deferred callables like Maya's idle queue.
+
+        Returns once the queue is empty and until() (when given) is true, waiting for
+        worker threads to queue more in between, or raises after timeout seconds.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            with self._deferred_lock:
+                batch, self.deferred = self.deferred, []
+            if batch:
+                for function, args in batch:
+                    function(*args)
+            elif until is None or until():
+                return
+            elif deadline is not None and time.perf_counter() > deadline:
+                raise RuntimeError('Timed out waiting for the idle queue.')
+            else:
+                time.sleep(0.0005)
+
+    def new_scene(self):
+        """Replaces the scene, like File > New, and fires the scene callbacks."""
+        self.scene = FakeScene(self.recorder)
+        self.messages = []
+        self.undo_queue = []
+        self.undo_chunks = []
+        self.recorder.fire('scene')
+        self.recorder.reset()
+        return self.scene
+
+    def install(self):
+        maya = types.ModuleType('maya')
+        maya.__path__ = []
+        api = types.ModuleType('maya.api')
+        api.__path__ = []
+        api.OpenMaya = self.om2
+        maya.cmds = self.cmds
+        maya.api = api
+        maya.OpenMayaUI = types.ModuleType('maya.OpenMayaUI')
+        maya.utils = types.ModuleType('maya.utils')
+        maya.utils.executeDeferred = self.execute_deferred
+        modules = {'maya': maya, 'maya.cmds': self.cmds, 'maya.api': api,
+                   'maya.api.OpenMaya': self.om2, 'maya.OpenMayaUI': maya.OpenMayaUI, 'maya.utils': maya.utils}
+        for name, module in modules.items():
+            self._saved_modules[name] = sys.modules.get(name)
+            sys.modules[name] = module
+        return self
+
+    def uninstall(self):
+        for name, module in self._saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        self._saved_modules = {}
+
+
+def install():
+    """Installs a FakeMaya as the maya package and returns it."""
+    return FakeMaya().install()
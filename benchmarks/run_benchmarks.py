@@ -0,0 +1,677 @@
+"""
+Benchmarks of the ModularXYZ toolkit operations against the fake Maya backend.
+
+Every case builds a scene of the requested size, then times one toolkit operation
+and reports wall time, the number of maya.cmds commands and OpenMaya API calls it
+issued, and its peak Python memory (tracemalloc).
+
+    python benchmarks/run_benchmarks.py --size small medium
+    python benchmarks/run_benchmarks.py --save-baseline baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json --tolerance 0.25
+
+With --baseline the run exits with status 1 when a case got slower than the
+tolerance allows or issues more commands than in the baseline.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import importlib
+import tracemalloc
+import contextlib
+import io
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), 'ModularXYZ'))
+
+import fake_maya
+
+FAKE = fake_maya.install()
+
+# Modules imported by the startup case. ModularXYZ and material_list_model need PySide2.
+TOOLKIT_MODULES = ['mesh_data', 'mesh_io', 'mesh_cleanup', 'slice_engine', 'worker_pool', 'grid_slice',
+                   'grid_functions', 'mesh_fingerprint', 'uv_projection', 'uv_overlap', 'uv_packer', 'texel_density',
+                   'UVboxmap', 'customboxmapuv', 'duplicate_index', 'grid_snap', 'spatial_index', 'material_cache',
+                   'material_index', 'texture_import', 'material_functions', 'material_dedupe', 'profiling',
+                   'task_runner', 'thumbnail_cache', 'material_samples', 'material_report', 'voxel_slice_batch']
+QT_MODULES = ['material_list_model', 'ModularXYZ']
+
+SIZES = {
+    'small': {'objects': 10, 'divisions': 4, 'materials': 5, 'selected_faces': 40},
+    'medium': {'objects': 50, 'divisions': 8, 'materials': 20, 'selected_faces': 400},
+    'large': {'objects': 200, 'divisions': 16, 'materials': 50, 'selected_faces': 4000},
+}
+
+
+# --- scene building ----------------------------------------------------------------
+
+class BenchScene(object):
+    """Names of what build_scene created."""
+
+    def __init__(self, transforms, shapes, materials):
+        self.transforms = transforms
+        self.shapes = shapes
+        self.materials = materials
+
+
+def build_scene(size):
+    """
+    Builds size['objects'] subdivided boxes in a row.
+
+    Every box is assigned to one material and its first faces to the next one, so
+    shading groups have whole object and face range members.
+    """
+    scene = FAKE.new_scene()
+    materials = []
+    for i in range(size['materials']):
+        material, _ = scene.add_material(f"benchMaterial{i}")
+        materials.append(material)
+    transforms, shapes = [], []
+    for i in range(size['objects']):
+        transform, shape = scene.add_box_mesh(f"benchBox{i}", divisions=size['divisions'], size=2.0,
+                                              translate=(i * 3.0 + 0.25, 0.35, 0.15))
+        transforms.append(transform)
+        shapes.append(shape)
+        scene.assign(materials[i % len(materials)] + 'SG', [shape])
+        scene.assign(materials[(i + 1) % len(materials)] + 'SG', [f"{transform}.f[0:{size['divisions'] - 1}]"])
+    FAKE.recorder.reset()
+    return BenchScene(transforms, shapes, materials)
+
+
+def build_kit_layout(size):
+    """Lays out size['objects'] * 100 unit boxes on a square floor grid, every tenth one shifted into its neighbour."""
+    scene = FAKE.new_scene()
+    count = size['objects'] * 100
+    side = math.ceil(math.sqrt(count))
+    transforms = []
+    for i in range(count):
+        shift = 0.5 if i % 10 == 0 else 0.0
+        transform, _ = scene.add_box_mesh(f"kitPiece{i}", divisions=1, size=1.0,
+                                          translate=(i % side + 0.5 + shift, 0.5, i // side + 0.5))
+        transforms.append(scene.long_name(transform))
+    FAKE.recorder.reset()
+    return transforms
+
+
+def build_texture_library(size, copies=4):
+    """
+    Builds size['materials'] * 100 lambert/file/place2dTexture networks, every texture imported copies times.
+
+    With the default of 4, three networks in four are copies. The boxes of build_scene
+    are spread over the materials.
+    """
+    import material_functions
+    bench = build_scene(size)
+    count = size['materials'] * 100
+    for i in range(count):
+        texture = f"/textures/kit_{i % (count // copies)}.png"
+        _, shading_group = material_functions.create_lambert_shader_with_texture(texture)
+        if i < len(bench.shapes):
+            FAKE.scene.assign(shading_group, [bench.shapes[i]])
+    FAKE.recorder.reset()
+    return bench
+
+
+def selected_faces(bench, size):
+    """Every other face, spread evenly over the objects, as unflattened selection items."""
+    per_object = max(size['selected_faces'] // len(bench.transforms), 1)
+    faces = []
+    for transform in bench.transforms:
+        faces.extend(f"{transform}.f[{index}]" for index in range(0, per_object * 2, 2))
+    return faces[:size['selected_faces']]
+
+
+# --- cases ---------------------------------------------------------------------------
+# A case takes the size and returns the operation to time; everything it does before
+# returning is setup and is not measured.
+
+def case_startup(size):
+    for name in TOOLKIT_MODULES + QT_MODULES:
+        module = sys.modules.pop(name, None)
+        if name == 'material_cache' and module is not None:
+            module.release_cache()
+        elif name == 'spatial_index' and module is not None:
+            module.release_index()
+    modules = list(TOOLKIT_MODULES)
+    try:
+        importlib.import_module('PySide2')
+        modules.extend(QT_MODULES)
+    except ImportError:
+        pass
+    FAKE.new_scene()
+
+    def run():
+        for name in modules:
+            importlib.import_module(name)
+        if FAKE.recorder.commands or FAKE.recorder.api_calls:
+            raise AssertionError(f"Importing the toolkit touched the scene: {dict(FAKE.recorder.commands)}")
+    return run
+
+
+def case_grid_slice(size):
+    import grid_slice
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return lambda: grid_slice.grid_slice(0.3)
+
+
+def case_grid_slice_no_weld(size):
+    import grid_slice
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return lambda: grid_slice.grid_slice(0.3, weld=False)
+
+
+def case_grid_slice_task(size):
+    import grid_slice
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return lambda: run_task('Voxel Slice', grid_slice.grid_slice_steps(0.3))
+
+
+def case_boxmap(size):
+    import UVboxmap
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return UVboxmap.boxmap4X4
+
+
+def case_boxmap_repeat(size):
+    import UVboxmap
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    with contextlib.redirect_stdout(io.StringIO()):
+        UVboxmap.boxmap4X4()
+    # Only one mesh changed since the first click
+    FAKE.scene.nodes[bench.shapes[0]].points[0] += 0.01
+    FAKE.recorder.reset()
+    return UVboxmap.boxmap4X4
+
+
+def run_task(name, steps):
+    """Submits a step generator to the task runner and runs the idle queue until it is done."""
+    import task_runner
+    runner = task_runner.get_runner()
+    task = runner.submit(name, steps)
+    FAKE.run_idle(until=lambda: not runner.busy())
+    if task.state != 'done':
+        raise AssertionError(f"Task {name} ended {task.state}: {task.error}")
+    return task
+
+
+def case_boxmap_task(size):
+    # BoxMap4X4 as a panel task: chunked on the idle queue, UV math on a worker thread
+    import UVboxmap
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return lambda: run_task('BoxMap4X4', UVboxmap.boxmap_steps(4))
+
+
+def case_custom_boxmap(size):
+    import customboxmapuv
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return lambda: customboxmapuv.customboxmapuv(2, 3, 4)
+
+
+def case_overlap_clean(size):
+    import UVboxmap
+    import uv_projection
+    bench = build_scene(size)
+    # Opposite box sides get mirrored, overlapping box mapped shells
+    uv_projection.box_map_meshes(bench.shapes, (4.0, 4.0, 4.0))
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return UVboxmap.OverlapClean
+
+
+def case_overlap_report(size):
+    import uv_overlap
+    import uv_projection
+    bench = build_scene(size)
+    uv_projection.box_map_meshes(bench.shapes, (4.0, 4.0, 4.0))
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return uv_overlap.report_overlaps
+
+
+def case_lightmap_pack(size):
+    import uv_packer
+    import uv_projection
+    bench = build_scene(size)
+    uv_projection.box_map_meshes(bench.shapes, (1.0, 1.0, 1.0))
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return uv_packer.pack_lightmap_selection
+
+
+def case_texel_density(size):
+    import texel_density
+    import uv_projection
+    bench = build_scene(size)
+    uv_projection.box_map_meshes(bench.shapes, (1.0, 1.0, 1.0))
+    FAKE.recorder.reset()
+
+    def run():
+        texel_density.analyze(bench.shapes, 1024)
+        texel_density.normalize_density(bench.shapes, 512.0, 1024)
+    return run
+
+
+def case_find_duplicates(size):
+    import duplicate_index
+    bench = build_scene(size)
+    FAKE.recorder.reset()
+    return lambda: duplicate_index.DuplicateIndex(bench.shapes).duplicate_groups()
+
+
+def case_instance_duplicates(size):
+    import duplicate_index
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return duplicate_index.instance_duplicates_selection
+
+
+def case_boxmap_instanced(size):
+    import duplicate_index
+    import UVboxmap
+    bench = build_scene(size)
+    FAKE.cmds.select(bench.transforms)
+    with contextlib.redirect_stdout(io.StringIO()):
+        duplicate_index.instance_duplicates_selection()
+    FAKE.recorder.reset()
+    return lambda: UVboxmap.boxmap(4)
+
+
+def case_snap_vertices(size):
+    import grid_snap
+    bench = build_scene(size)
+    FAKE.cmds.grid(spacing=0.25)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return grid_snap.snap_vertices_selection
+
+
+def case_snap_boundary(size):
+    import grid_snap
+    bench = build_scene(size)
+    FAKE.cmds.grid(spacing=0.25)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return lambda: grid_snap.snap_vertices_selection(boundary_only=True, tolerance=0.1)
+
+
+def case_snap_pivots(size):
+    import grid_snap
+    bench = build_scene(size)
+    FAKE.cmds.grid(spacing=0.25)
+    FAKE.cmds.select(bench.transforms)
+    FAKE.recorder.reset()
+    return grid_snap.snap_pivots_selection
+
+
+def case_spatial_build(size):
+    import spatial_index
+    spatial_index.release_index()
+    build_kit_layout(size)
+    return lambda: spatial_index.get_index().pieces()
+
+
+def case_spatial_queries(size):
+    import spatial_index
+    spatial_index.release_index()
+    transforms = build_kit_layout(size)
+    index = spatial_index.get_index()
+    index.pieces()
+    probes = transforms[::max(len(transforms) // 1000, 1)]
+
+    def run():
+        for transform in probes:
+            index.neighbors(transform)
+            index.query_point(index.bounding_box(transform)[:3])
+    return run
+
+
+def case_spatial_queries_commands(size):
+    # Commands that move nothing between the queries must not make the index read its boxes again
+    import spatial_index
+    spatial_index.release_index()
+    transforms = build_kit_layout(size)
+    index = spatial_index.get_index()
+    index.pieces()
+    probes = transforms[::max(len(transforms) // 1000, 1)]
+
+    def run():
+        for transform in probes:
+            FAKE.cmds.ls(selection=True)
+            index.neighbors(transform)
+        if index.counters['refreshed'] or index.counters['rebuilds'] != 1:
+            raise AssertionError(f"Queries read boxes again: {index.stats()}")
+    return run
+
+
+def case_spatial_overlaps(size):
+    import spatial_index
+    spatial_index.release_index()
+    transforms = build_kit_layout(size)
+    index = spatial_index.get_index()
+    index.pieces()
+    moved = transforms[::100]
+
+    def run():
+        # Moving pieces dirties them, the next query refreshes only those
+        for transform in moved:
+            FAKE.cmds.move(0.25, 0, 0, transform, relative=True)
+        index.overlaps()
+        index.gaps(0.5)
+    return run
+
+
+def case_fetch_materials(size):
+    import material_functions
+    bench = build_scene(size)
+    FAKE.cmds.select(selected_faces(bench, size))
+    FAKE.recorder.reset()
+    return material_functions.fetch_materials_selection
+
+
+def case_list_materials(size):
+    import material_functions
+    import material_cache
+    build_scene(size)
+    material_cache.get_cache().invalidate()
+    FAKE.recorder.reset()
+    return material_functions.list_all_materials
+
+
+def case_assign_materials(size):
+    import material_functions
+    bench = build_scene(size)
+    faces = selected_faces(bench, size)
+    assignments = {}
+    for i, face in enumerate(faces):
+        assignments.setdefault(bench.materials[i % len(bench.materials)], []).append(face)
+    FAKE.recorder.reset()
+    return lambda: material_functions.assign_materials(assignments)
+
+
+def case_dedupe_report(size):
+    import material_dedupe
+    build_texture_library(size)
+    return lambda: material_dedupe.merge_duplicate_materials(dry_run=True)
+
+
+def case_dedupe_report_unique(size):
+    # No copies: only texture paths are read, attribute values never are
+    import material_dedupe
+    build_texture_library(size, copies=1)
+    return lambda: material_dedupe.merge_duplicate_materials(dry_run=True)
+
+
+def case_dedupe_merge(size):
+    import material_dedupe
+    build_texture_library(size)
+    return material_dedupe.merge_duplicate_materials
+
+
+def case_material_swatches(size):
+    # What the list does when scrolled from top to bottom: one resolver call per block of rows
+    import material_functions
+    import material_cache
+    build_texture_library(size, copies=1)
+    names = material_cache.get_cache().all_materials()
+    return lambda: [material_functions.material_swatches(names[start:start + 64])
+                    for start in range(0, len(names), 64)]
+
+
+def case_thumbnail_scroll(size):
+    # Scrolls a screen of 30 rows at a time over size['materials'] * 100 textures with a
+    # decoder standing in for QImage; the second pass is served by the atlas on disk
+    import tempfile
+    import thumbnail_cache
+    folder = tempfile.mkdtemp()
+    paths = []
+    for i in range(size['materials'] * 100):
+        paths.append(os.path.join(folder, f"kit_{i}.png"))
+        with open(paths[-1], 'wb') as image:
+            image.write(i.to_bytes(4, 'little'))
+
+    def decode(path, edge):
+        return os.path.basename(path).encode().ljust(edge * edge * 4, b'\0')
+
+    def scroll():
+        cache = thumbnail_cache.ThumbnailCache(decode, cache_dir=os.path.join(folder, 'cache'))
+        for start in range(0, len(paths), 30):
+            for path in paths[start:start + 30]:
+                cache.get(path)
+        while cache.stats()['pending'] or cache._in_flight:
+            time.sleep(0.001)
+        cache.shutdown()
+    return lambda: (scroll(), scroll())
+
+
+def case_sample_board(size):
+    import material_samples
+    import material_cache
+    build_texture_library(size, copies=1)
+    names = material_cache.get_cache().all_materials()
+    return lambda: material_samples.build_sample_board(names, 'cube', spacing=0.25)
+
+
+def case_sample_board_update(size):
+    # The board already shows every material; a tenth is dropped, a tenth added and the rest stays
+    import material_samples
+    import material_cache
+    build_texture_library(size, copies=1)
+    names = material_cache.get_cache().all_materials()
+    tenth = len(names) // 10
+    with contextlib.redirect_stdout(io.StringIO()):
+        material_samples.build_sample_board(names[tenth:len(names) - tenth], 'sphere', spacing=0.25)
+    return lambda: material_samples.build_sample_board(names[2 * tenth:], 'sphere', spacing=0.25)
+
+
+def case_usage_report(size):
+    import material_report
+    build_scene(size)
+    return material_report.usage_report
+
+
+def case_usage_report_faces(size):
+    # Face counts only, no point reads
+    import material_report
+    build_scene(size)
+    return lambda: material_report.usage_report(with_area=False)
+
+
+def case_grid_spacing(size):
+    import grid_functions
+    FAKE.new_scene()
+
+    def run():
+        for _ in range(size['objects']):
+            grid_functions.grid_up()
+            grid_functions.grid_down()
+    return run
+
+
+def case_grid_spacing_profiled(size):
+    # grid_spacing with profiling on, the difference is the instrumentation overhead
+    import tempfile
+    import profiling
+    import grid_functions
+    FAKE.new_scene()
+    os.environ['MODULARXYZ_PROFILE_LOG'] = os.path.join(tempfile.mkdtemp(), 'profile.jsonl')
+
+    def run():
+        profiler = profiling.get_profiler()
+        profiler.enable()
+        try:
+            for _ in range(size['objects']):
+                grid_functions.grid_up()
+                grid_functions.grid_down()
+        finally:
+            profiler.disable()
+            profiler.clear()
+    return run
+
+
+CASES = {
+    'startup': case_startup,
+    'grid_slice': case_grid_slice,
+    'grid_slice_no_weld': case_grid_slice_no_weld,
+    'grid_slice_task': case_grid_slice_task,
+    'boxmap': case_boxmap,
+    'boxmap_repeat': case_boxmap_repeat,
+    'boxmap_task': case_boxmap_task,
+    'custom_boxmap': case_custom_boxmap,
+    'overlap_clean': case_overlap_clean,
+    'overlap_report': case_overlap_report,
+    'lightmap_pack': case_lightmap_pack,
+    'texel_density': case_texel_density,
+    'find_duplicates': case_find_duplicates,
+    'instance_duplicates': case_instance_duplicates,
+    'boxmap_instanced': case_boxmap_instanced,
+    'snap_vertices': case_snap_vertices,
+    'snap_boundary': case_snap_boundary,
+    'snap_pivots': case_snap_pivots,
+    'spatial_build': case_spatial_build,
+    'spatial_queries': case_spatial_queries,
+    'spatial_queries_commands': case_spatial_queries_commands,
+    'spatial_overlaps': case_spatial_overlaps,
+    'fetch_materials': case_fetch_materials,
+    'list_materials': case_list_materials,
+    'assign_materials': case_assign_materials,
+    'dedupe_report': case_dedupe_report,
+    'dedupe_report_unique': case_dedupe_report_unique,
+    'dedupe_merge': case_dedupe_merge,
+    'material_swatches': case_material_swatches,
+    'thumbnail_scroll': case_thumbnail_scroll,
+    'sample_board': case_sample_board,
+    'sample_board_update': case_sample_board_update,
+    'usage_report': case_usage_report,
+    'usage_report_faces': case_usage_report_faces,
+    'grid_spacing': case_grid_spacing,
+    'grid_spacing_profiled': case_grid_spacing_profiled,
+}
+
+
+# --- running -----------------------------------------------------------------------
+
+def run_case(case, size, repeat=3):
+    """
+    Runs one case repeat times, every time on a fresh scene.
+
+    :return: {'seconds': best wall time, 'commands': ..., 'api_calls': ..., 'peak_kb': ...}
+    """
+    best = None
+    peak = 0
+    for _ in range(repeat):
+        operation = case(size)
+        FAKE.recorder.reset()
+        tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            operation()
+        elapsed = time.perf_counter() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = elapsed if best is None else min(best, elapsed)
+    return {'seconds': round(best, 6),
+            'commands': sum(FAKE.recorder.commands.values()),
+            'api_calls': sum(FAKE.recorder.api_calls.values()),
+            'peak_kb': round(peak / 1024.0, 1)}
+
+
+def run_benchmarks(case_names, size_names, repeat=3, overrides=None):
+    """Returns {'case/size': result} for every requested case and size."""
+    results = {}
+    for size_name in size_names:
+        size = dict(SIZES[size_name], **(overrides or {}))
+        for case_name in case_names:
+            results[f"{case_name}/{size_name}"] = run_case(CASES[case_name], size, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compares results with a baseline.
+
+    :return: List of (key, message) for every case that got slower than the tolerance
+        allows or that issues more commands or API calls than before.
+    """
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if result['seconds'] > previous['seconds'] * (1.0 + tolerance):
+            regressions.append((key, f"time {previous['seconds']:.4f}s -> {result['seconds']:.4f}s"))
+        for counter in ('commands', 'api_calls'):
+            if result[counter] > previous[counter]:
+                regressions.append((key, f"{counter} {previous[counter]} -> {result[counter]}"))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    print(f"{'case':<32}{'seconds':>12}{'commands':>10}{'api calls':>11}{'peak KB':>10}{'vs baseline':>13}")
+    for key, result in results.items():
+        change = ''
+        if baseline and key in baseline and baseline[key]['seconds']:
+            change = f"{result['seconds'] / baseline[key]['seconds'] - 1.0:+.0%}"
+        print(f"{key:<32}{result['seconds']:>12.4f}{result['commands']:>10}{result['api_calls']:>11}"
+              f"{result['peak_kb']:>10.1f}{change:>13}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--case', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--size', nargs='+', choices=list(SIZES), default=['small'])
+    parser.add_argument('--objects', type=int, help="Override the object count of the sizes.")
+    parser.add_argument('--divisions', type=int, help="Override the box subdivisions (faces = 6 * divisions^2).")
+    parser.add_argument('--materials', type=int, help="Override the material count of the sizes.")
+    parser.add_argument('--selected-faces', type=int, help="Override the selected face count of the sizes.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', help="JSON results to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown, 0.25 is 25%%.")
+    parser.add_argument('--save-baseline', help="Write the results to this JSON file.")
+    options = parser.parse_args(args)
+
+    overrides = {key: value for key, value in (('objects', options.objects), ('divisions', options.divisions),
+                                               ('materials', options.materials),
+                                               ('selected_faces', options.selected_faces)) if value}
+    # startup first, it needs the toolkit modules to be imported from scratch
+    case_names = sorted(options.case, key=lambda name: name != 'startup')
+    results = run_benchmarks(case_names, options.size, options.repeat, overrides)
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+
+    if options.save_baseline:
+        with open(options.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline written to {options.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline, options.tolerance)
+        for key, message in regressions:
+            print(f"REGRESSION {key}: {message}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
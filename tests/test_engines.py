@@ -0,0 +1,112 @@
+"""
+Behaviour of the pure NumPy engines on small hand built meshes and UV sets.
+
+The engines do not use maya, uv_overlap and uv_packer only import it for their
+scene level functions, so nearly empty maya modules are enough to import them.
+"""
+
+import os
+import sys
+import types
+import importlib
+
+import numpy as np
+import pytest
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ModularXYZ')
+ENGINES = ['mesh_data', 'mesh_cleanup', 'slice_engine', 'uv_overlap', 'uv_packer']
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Imports the engines against nearly empty maya modules, returns them as attributes."""
+    maya = types.ModuleType('maya')
+    maya.__path__ = []
+    api = types.ModuleType('maya.api')
+    api.__path__ = []
+    maya.cmds = types.ModuleType('maya.cmds')
+    maya.api = api
+    api.OpenMaya = types.ModuleType('maya.api.OpenMaya')
+    api.OpenMaya.MPxCommand = object  # Subclassed by api_undo, which mesh_io imports
+    for module in (maya, maya.cmds, api, api.OpenMaya):
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+    for name in ENGINES + ['mesh_io', 'api_undo']:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.syspath_prepend(PACKAGE_DIR)
+    return types.SimpleNamespace(**{name: importlib.import_module(name) for name in ENGINES})
+
+
+def mesh_area(engines, mesh):
+    points = np.frombuffer(mesh.points, dtype=np.float64).reshape(-1, 3)
+    normals = engines.mesh_cleanup.face_normals(points, np.asarray(mesh.counts, dtype=np.int64),
+                                                np.asarray(mesh.connects, dtype=np.int64))
+    return float(np.linalg.norm(normals, axis=1).sum() / 2.0)
+
+
+def test_weld_keeps_area_of_concave_face(engines):
+    # An L shaped face of area 3 with a doubled corner closer than the tolerance
+    points = [0, 0, 0, 2, 0, 0, 2, 0, 1, 1, 0, 1, 1, 0, 2, 1e-7, 0, 2, 0, 0, 2]
+    mesh = engines.mesh_data.MeshData(points, [7], range(7))
+    result = engines.mesh_cleanup.weld_mesh(mesh, 1e-4)
+    assert list(result.mesh.counts) == [6]
+    assert result.welded_vertices == 1
+    assert mesh_area(engines, result.mesh) == pytest.approx(3.0)
+
+
+def test_weld_splits_pinched_face_into_two_loops(engines):
+    # A bow tie: the face passes through the origin twice, once through a copy of it
+    points = [0, 0, 0, 1, 0, 0, 1, 0, 1, 1e-7, 0, 0, -1, 0, 0, -1, 0, -1]
+    mesh = engines.mesh_data.MeshData(points, [6], range(6))
+    result = engines.mesh_cleanup.weld_mesh(mesh, 1e-4)
+    assert sorted(result.mesh.counts) == [3, 3]
+    assert result.face_sources.tolist() == [0, 0]
+    assert mesh_area(engines, result.mesh) == pytest.approx(1.0)
+
+
+def test_weld_keeps_back_face_and_drops_repeated_face(engines):
+    points = [0, 0, 0, 1, 0, 0, 1, 0, 1, 0, 0, 1]
+    mesh = engines.mesh_data.MeshData(points, [4, 4, 4], [0, 1, 2, 3, 3, 2, 1, 0, 2, 3, 0, 1])
+    result = engines.mesh_cleanup.weld_mesh(mesh, 1e-4)
+    assert result.face_sources.tolist() == [0, 1]
+    assert result.removed_faces == 1
+
+
+def test_slice_keeps_area(engines):
+    # A 2 x 2 floor tile cut by a lattice of 1 makes four faces
+    points = [0, 0, 0, 2, 0, 0, 2, 0, 2, 0, 0, 2]
+    mesh = engines.mesh_data.MeshData(points, [4], [0, 1, 2, 3])
+    result = engines.slice_engine.slice_mesh(mesh, grid_size=1.0, weld_tolerance=1e-4)
+    assert result.mesh.num_faces == 4
+    assert mesh_area(engines, result.mesh) == pytest.approx(4.0)
+
+
+def square_shells(offsets):
+    """One unit square UV shell per (u, v) offset."""
+    us, vs = [], []
+    for u, v in offsets:
+        us.extend([u, u + 1, u + 1, u])
+        vs.extend([v, v, v + 1, v + 1])
+    return us, vs, [4] * len(offsets), list(range(4 * len(offsets)))
+
+
+def test_overlapping_shells_are_found(engines):
+    overlaps = engines.uv_overlap.find_shell_overlaps(*square_shells([(0, 0), (0.5, 0.5), (3, 0)]))
+    assert overlaps.pairs == {(0, 1)}
+    assert overlaps.offending_faces() == [0, 1]
+
+
+def test_touching_shells_do_not_overlap(engines):
+    overlaps = engines.uv_overlap.find_shell_overlaps(*square_shells([(0, 0), (1, 0), (0, 1)]))
+    assert overlaps.pairs == set()
+
+
+def test_packed_rectangles_do_not_overlap(engines):
+    sizes = [tuple(size) for size in np.random.RandomState(7).randint(4, 60, size=(40, 2)).tolist()]
+    positions = engines.uv_packer.pack_rectangles(sizes, 256)
+    assert positions is not None
+    boxes = [(x, y, x + width, y + height) for (x, y), (width, height) in zip(positions, sizes)]
+    for box in boxes:
+        assert box[0] >= 0 and box[1] >= 0 and box[2] <= 256 and box[3] <= 256
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            assert a[2] <= b[0] or b[2] <= a[0] or a[3] <= b[1] or b[3] <= a[1]
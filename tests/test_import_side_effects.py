@@ -0,0 +1,96 @@
+"""
+Importing a ModularXYZ module must not touch the scene.
+
+Every module is imported on its own against a maya.cmds that records each command
+it is asked to run, with PySide2 and shiboken2 stand-ins for the panel modules.
+The test fails when any command runs during an import.
+"""
+
+import os
+import sys
+import glob
+import types
+import importlib
+
+import pytest
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ModularXYZ')
+MODULES = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(PACKAGE_DIR, '*.py')))
+QT_MODULES = ['PySide2', 'PySide2.QtWidgets', 'PySide2.QtCore', 'PySide2.QtGui', 'shiboken2']
+
+
+class _AnyMeta(type):
+    """Class attributes, operators and calls of a stand-in class all give stand-ins again."""
+
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Any
+
+    def __or__(cls, other):
+        return _Any
+
+    def __add__(cls, other):
+        return _Any
+
+
+class _Any(metaclass=_AnyMeta):
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+class _ClassModule(types.ModuleType):
+    """Every attribute is a new class that can be subclassed, like QWidget or MPxCommand."""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return type(name, (_Any,), {})
+
+
+class _RecordingCommands(types.ModuleType):
+    """maya.cmds whose commands only record their name."""
+
+    def __init__(self, name, calls):
+        super(_RecordingCommands, self).__init__(name)
+        self._calls = calls
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        def command(*args, **kwargs):
+            self._calls.append(name)
+        return command
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """Installs the stand-ins, returns the list the commands run are recorded in."""
+    calls = []
+    maya = types.ModuleType('maya')
+    maya.__path__ = []
+    api = types.ModuleType('maya.api')
+    api.__path__ = []
+    maya.cmds = _RecordingCommands('maya.cmds', calls)
+    maya.api = api
+    api.OpenMaya = _ClassModule('maya.api.OpenMaya')
+    maya.OpenMayaUI = _RecordingCommands('maya.OpenMayaUI', calls)
+    maya.utils = _RecordingCommands('maya.utils', calls)
+    stand_ins = {'maya': maya, 'maya.cmds': maya.cmds, 'maya.api': api, 'maya.api.OpenMaya': api.OpenMaya,
+                 'maya.OpenMayaUI': maya.OpenMayaUI, 'maya.utils': maya.utils}
+    stand_ins.update((name, _ClassModule(name)) for name in QT_MODULES)
+    for name, module in stand_ins.items():
+        monkeypatch.setitem(sys.modules, name, module)
+    # Modules imported by an earlier test would not be imported again
+    for name in MODULES:
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    monkeypatch.syspath_prepend(PACKAGE_DIR)
+    return calls
+
+
+@pytest.mark.parametrize('module_name', MODULES)
+def test_import_runs_no_command(commands, module_name):
+    importlib.import_module(module_name)
+    assert commands == [], f"Importing {module_name} ran maya commands: {commands}"